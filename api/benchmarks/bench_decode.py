@@ -0,0 +1,100 @@
+"""
+Benchmark: per-document decode cost of repository reads on a large poll.
+
+Builds the vote documents a 100k-vote poll returns from MongoDB and decodes
+them the way ``PollRepository.get_votes_for_poll`` does, comparing:
+
+- per-document validation (the original decode path)
+- ``model_construct`` without validation, for reference
+- ``decode_many``, validation with garbage collection paused
+
+Run with: cd api && python benchmarks/bench_decode.py [--votes 100000] [--options 10]
+"""
+
+import argparse
+import gc
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from bson import ObjectId
+
+# Ensure api/ is in path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models.polls import RankedChoice, VoteInDB
+from repositories.decoders import decode_many, decode_vote
+
+
+def make_vote_docs(n_votes: int, n_options: int, poll_id: str) -> list[dict]:
+    """Build raw vote documents shaped like the votes collection."""
+    now = datetime.utcnow()
+    return [
+        {
+            "_id": ObjectId(),
+            "poll_id": poll_id,
+            "user_id": f"user-{i}",
+            "rankings": [
+                {"option_id": str((i + j) % n_options), "rank": j + 1}
+                for j in range(n_options)
+            ],
+            "submitted_at": now,
+        }
+        for i in range(n_votes)
+    ]
+
+
+def per_document(docs: list[dict]) -> list[VoteInDB]:
+    """The original decode path: validate one document at a time."""
+    votes = []
+    for doc in docs:
+        doc["id"] = str(doc.pop("_id"))
+        votes.append(VoteInDB(**doc))
+    return votes
+
+
+def constructed(docs: list[dict]) -> list[VoteInDB]:
+    """Build models with model_construct, skipping validation."""
+    votes = []
+    for doc in docs:
+        doc["id"] = str(doc.pop("_id"))
+        doc["rankings"] = [RankedChoice.model_construct(**r) for r in doc["rankings"]]
+        votes.append(VoteInDB.model_construct(**doc))
+    return votes
+
+
+def batched(docs: list[dict]) -> list[VoteInDB]:
+    """The repository decode path."""
+    return decode_many(decode_vote, docs)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark repository decode cost.")
+    parser.add_argument("--votes", type=int, default=100_000)
+    parser.add_argument("--options", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{args.votes} votes x {args.options} options")
+    baseline = None
+    for name, decode in (
+        ("per-document", per_document),
+        ("model_construct", constructed),
+        ("decode_many", batched),
+    ):
+        docs = make_vote_docs(args.votes, args.options, str(ObjectId()))
+        gc.collect()
+
+        start = time.perf_counter()
+        votes = decode(docs)
+        per_doc = (time.perf_counter() - start) / len(votes)
+
+        baseline = baseline or per_doc
+        print(f"{name:<18}{per_doc * 1e6:>9.2f} us/doc{baseline / per_doc:>8.2f}x")
+
+        del docs, votes
+        gc.collect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Benchmark: per-request cost of resolving the poll and auth services.
+
+Drives an in-process FastAPI app on the memory backend with raw ASGI calls
+(no HTTP client), so the time measured is routing plus dependency
+resolution. Each route returns an empty response after resolving:
+
+- none: no dependencies, the floor every request pays
+- per-request: the services built on every request, as before the
+  service container: get_database (an async generator) -> repositories
+  -> PollService and AuthService
+- container: the services looked up on app.state.services
+  (dependencies.ServiceContainer, built once at startup)
+
+Run with: cd api && python benchmarks/bench_dependencies.py [--requests 20000]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+os.environ["REPOSITORY_BACKEND"] = "memory"
+
+# Ensure api/ is in path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi import Depends, FastAPI, Response
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from core import database
+from core.database import get_database
+from dependencies import ServiceContainer, get_auth_service, get_poll_service
+from repositories.memory_repository import MemoryPollRepository, MemoryUserRepository
+from services.auth_service import AuthService
+from services.poll_service import PollService
+
+
+# The dependency chain as it was, one new object of each per request
+async def build_poll_repository(
+    db: AsyncIOMotorDatabase = Depends(get_database),
+) -> MemoryPollRepository:
+    return MemoryPollRepository(db)
+
+
+async def build_user_repository(
+    db: AsyncIOMotorDatabase = Depends(get_database),
+) -> MemoryUserRepository:
+    return MemoryUserRepository(db)
+
+
+async def build_poll_service(
+    poll_repository: MemoryPollRepository = Depends(build_poll_repository),
+) -> PollService:
+    return PollService(poll_repository)
+
+
+async def build_auth_service(
+    user_repository: MemoryUserRepository = Depends(build_user_repository),
+) -> AuthService:
+    return AuthService(user_repository)
+
+
+async def make_app() -> FastAPI:
+    app = FastAPI()
+    database._memory_database = database.MemoryDatabase()
+    app.state.services = await ServiceContainer.create(database.current_database())
+
+    @app.get("/none")
+    async def none() -> Response:
+        return Response()
+
+    @app.get("/per-request")
+    async def per_request(
+        poll_service: PollService = Depends(build_poll_service),
+        auth_service: AuthService = Depends(build_auth_service),
+    ) -> Response:
+        return Response()
+
+    @app.get("/container")
+    async def container(
+        poll_service: PollService = Depends(get_poll_service),
+        auth_service: AuthService = Depends(get_auth_service),
+    ) -> Response:
+        return Response()
+
+    return app
+
+
+async def call(app: FastAPI, path: str) -> None:
+    """Send one GET through the ASGI interface."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+
+    async def receive() -> dict:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: dict) -> None:
+        if message["type"] == "http.response.start" and message["status"] != 200:
+            raise RuntimeError(f"{path} answered {message['status']}")
+
+    await app(scope, receive, send)
+
+
+async def measure(app: FastAPI, path: str, requests: int, rounds: int) -> float:
+    """Median time per request in microseconds."""
+    for _ in range(1000):
+        await call(app, path)
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(requests):
+            await call(app, path)
+        samples.append((time.perf_counter() - started) / requests * 1e6)
+    return statistics.median(samples)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    app = await make_app()
+    floor = None
+    for path in ("/none", "/per-request", "/container"):
+        elapsed = await measure(app, path, args.requests, args.rounds)
+        floor = floor or elapsed
+        print(f"  {path.lstrip('/'):<12} {elapsed:7.1f} us/request  (+{elapsed - floor:5.1f} us)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
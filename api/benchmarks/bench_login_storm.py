@@ -0,0 +1,124 @@
+"""
+Benchmark: unrelated request latency during a login storm.
+
+Runs the API in-process on the memory backend, with an ASGI client on the
+same event loop, as in one worker. While ``--logins`` clients log in back
+to back, ``--readers`` clients each fetch a poll every ``--interval`` ms. Read latency
+is measured from when each read was due. Compares:
+
+- inline: bcrypt on the event loop (the original behaviour)
+- pool: bcrypt on core.security.password_pool
+
+Run with: cd api && python benchmarks/bench_login_storm.py [--seconds 5] [--logins 16]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+os.environ["REPOSITORY_BACKEND"] = "memory"
+
+# Ensure api/ is in path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from httpx import ASGITransport, AsyncClient
+
+from core import database, security
+from dependencies import ServiceContainer
+from main import app
+
+
+class InlinePool(security.PasswordPool):
+    """Runs bcrypt directly on the event loop, like the original code."""
+
+    async def run(self, fn, *args):
+        return fn(*args)
+
+
+def percentile(samples: list[float], p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+async def run_storm(seconds: float, logins: int, readers: int, interval: float) -> dict:
+    database._memory_database = database.MemoryDatabase()
+    app.state.services = await ServiceContainer.create(database.current_database())
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        credentials = {"identifier": "storm@example.com", "password": "stormpass123"}
+        await client.post("/auth/register", json={
+            "email": credentials["identifier"],
+            "username": "storm",
+            "password": credentials["password"],
+        })
+        token = (await client.post("/auth/login", json=credentials)).json()["access_token"]
+        response = await client.post(
+            "/polls",
+            headers={"Authorization": f"Bearer {token}"},
+            json={"title": "Storm", "options": [{"id": "1", "label": "A"}, {"id": "2", "label": "B"}]},
+        )
+        poll_id = response.json()["id"]
+
+        deadline = time.perf_counter() + seconds
+        completed_logins = 0
+        latencies: list[float] = []
+
+        async def login_client() -> None:
+            nonlocal completed_logins
+            while time.perf_counter() < deadline:
+                response = await client.post("/auth/login", json=credentials)
+                if response.status_code == 200:
+                    completed_logins += 1
+
+        async def reader_client() -> None:
+            # Reads are due every interval and latency counts from when a read
+            # was due, so time spent waiting for a blocked loop is included
+            due = time.perf_counter()
+            while due < deadline:
+                await asyncio.sleep(max(0.0, due - time.perf_counter()))
+                await client.get(f"/polls/{poll_id}")
+                latencies.append(time.perf_counter() - due)
+                due += interval
+
+        await asyncio.gather(
+            *(reader_client() for _ in range(readers)),
+            *(login_client() for _ in range(logins)),
+        )
+
+    return {
+        "logins_per_s": completed_logins / seconds,
+        "reads": len(latencies),
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--logins", type=int, default=16, help="Concurrent login clients")
+    parser.add_argument("--readers", type=int, default=4, help="Concurrent poll readers")
+    parser.add_argument("--interval", type=float, default=50.0, help="ms between a reader's reads")
+    args = parser.parse_args()
+
+    pool = security.password_pool
+    print(f"bcrypt pool: {pool.workers} workers, queue {pool.max_queue}")
+    print(f"{'mode':<8} {'logins/s':>9} {'reads':>7} {'p50 ms':>8} {'p99 ms':>8}")
+    for mode, mode_pool in [
+        ("inline", InlinePool(pool.workers, pool.max_queue)),
+        ("pool", pool),
+    ]:
+        security.password_pool = mode_pool
+        result = asyncio.run(run_storm(args.seconds, args.logins, args.readers, args.interval / 1000))
+        print(
+            f"{mode:<8} {result['logins_per_s']:>9.1f} {result['reads']:>7} "
+            f"{result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f}"
+        )
+    print(f"pool stats: {pool.stats()}")
+
+
+if __name__ == "__main__":
+    main()
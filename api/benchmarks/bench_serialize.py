@@ -0,0 +1,132 @@
+"""
+Benchmark: response encoding time for large poll listings and results.
+
+Encodes a 500-poll listing (``list[PollResponse]``) and the results of a
+1000-option poll (``PollResults``) the ways an endpoint can, comparing:
+
+- fastapi-dict: FastAPI's response-model pass without the JSON fast path
+  (FastAPI releases before it, or routes with a response_class): validate
+  the return value, dump it to dicts, then json.dumps
+- fastapi-json: the same pass with FastAPI's dump_json fast path:
+  validate, then serialize to JSON in pydantic-core
+- ModelJSONResponse: core/responses.py, which the listing, detail and
+  results endpoints return; one pydantic-core call, no validation
+
+Run with: cd api && python benchmarks/bench_serialize.py [--polls 500] [--options 1000]
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable
+
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+# Ensure api/ is in path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.responses import ModelJSONResponse
+from models.polls import OptionResult, PollOption, PollResponse, PollResults, PollStatus
+
+
+def make_polls(n_polls: int) -> list[PollResponse]:
+    """Build a poll listing shaped like list_user_polls returns."""
+    now = datetime.utcnow()
+    return [
+        PollResponse(
+            id=f"{i:024x}",
+            title=f"Poll {i}",
+            description="Which one is best?",
+            options=[PollOption(id=str(j), label=f"Option {j}") for j in range(5)],
+            status=PollStatus.OPEN,
+            owner_id=f"{i % 50:024x}",
+            created_at=now,
+            closes_at=None,
+            vote_count=i * 3,
+        )
+        for i in range(n_polls)
+    ]
+
+
+def make_results(n_options: int) -> PollResults:
+    """Build the results of a poll with many options."""
+    return PollResults(
+        poll_id="0" * 24,
+        title="Big poll",
+        total_votes=100_000,
+        results=[
+            OptionResult(option_id=str(i), label=f"Option {i}", score=n_options - i + 0.5, rank=i + 1)
+            for i in range(n_options)
+        ],
+        calculated_at=datetime.utcnow(),
+    )
+
+
+def run(coroutine: Any) -> Any:
+    """Run a coroutine that never suspends, without an event loop."""
+    try:
+        coroutine.send(None)
+    except StopIteration as stop:
+        return stop.value
+    raise RuntimeError("coroutine suspended")
+
+
+def encoders(annotation: Any) -> dict[str, Callable[[Any], bytes]]:
+    """The encodings compared, for a route returning ``annotation``."""
+    field = create_model_field(name="Response", type_=annotation, mode="serialization")
+
+    def fastapi_dict(content: Any) -> bytes:
+        data = run(serialize_response(field=field, response_content=content))
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def fastapi_json(content: Any) -> bytes:
+        return run(serialize_response(field=field, response_content=content, dump_json=True))
+
+    def model_json(content: Any) -> bytes:
+        return ModelJSONResponse(content).body
+
+    return {
+        "fastapi-dict": fastapi_dict,
+        "fastapi-json": fastapi_json,
+        "ModelJSONResponse": model_json,
+    }
+
+
+def measure(encode: Callable[[Any], bytes], content: Any, rounds: int) -> float:
+    """Median encoding time in milliseconds."""
+    encode(content)
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        encode(content)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--polls", type=int, default=500)
+    parser.add_argument("--options", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    cases = [
+        (f"{args.polls}-poll listing", list[PollResponse], make_polls(args.polls)),
+        (f"{args.options}-option results", PollResults, make_results(args.options)),
+    ]
+    for name, annotation, content in cases:
+        print(f"{name}:")
+        baseline = None
+        for label, encode in encoders(annotation).items():
+            elapsed = measure(encode, content, args.rounds)
+            baseline = baseline or elapsed
+            print(f"  {label:<18} {elapsed:8.3f} ms  ({baseline / elapsed:4.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
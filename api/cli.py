@@ -0,0 +1,168 @@
+"""
+Command-line maintenance tasks for rankstuff.io.
+
+Run with: cd api && uv run python cli.py <command> [options]
+"""
+
+import argparse
+import asyncio
+from pathlib import Path
+
+from fastapi import HTTPException
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from core.config import settings
+from core.database import close_database_connection, current_database
+from dependencies import get_poll_repository
+from repositories.poll_repository import PollRepository
+
+
+async def pack_ballots(args: argparse.Namespace) -> None:
+    """Convert rankings-format votes to packed ballots, poll by poll."""
+    client = AsyncIOMotorClient(settings.mongodb_url)
+    try:
+        repository = PollRepository(client[settings.mongodb_database], packed_ballots=True)
+        if args.poll:
+            poll_ids = args.poll
+        else:
+            poll_ids = [str(doc["_id"]) async for doc in repository.collection.find({}, {"_id": 1})]
+
+        total = 0
+        for poll_id in poll_ids:
+            converted = await repository.pack_votes(poll_id, batch_size=args.batch_size)
+            total += converted
+            if converted:
+                print(f"{poll_id}: packed {converted} votes")
+        print(f"Packed {total} votes across {len(poll_ids)} polls")
+    finally:
+        client.close()
+
+
+async def archive_poll(args: argparse.Namespace) -> None:
+    """Write a closed poll's ballots to an archive file."""
+    from services.archive_service import ArchiveService
+
+    try:
+        repository = await get_poll_repository(current_database())
+        service = ArchiveService(repository, settings.archive_dir)
+        try:
+            archive = await service.archive_poll(args.poll_id, prune=args.prune)
+        except HTTPException as exc:
+            raise SystemExit(f"{args.poll_id}: {exc.detail}")
+        pruned = ", votes pruned" if archive.pruned else ""
+        print(f"{args.poll_id}: archived {archive.vote_count} votes to {archive.path}{pruned}")
+    finally:
+        await close_database_connection()
+
+
+async def tally_poll(args: argparse.Namespace) -> None:
+    """Print the standings of an archived poll."""
+    from services.archive_service import ArchiveService
+    from services.tally import TallyAlgorithm
+
+    try:
+        repository = await get_poll_repository(current_database())
+        poll = await repository.get_by_id(args.poll_id)
+        if poll is None or poll.archive is None:
+            raise SystemExit(f"{args.poll_id}: no archived poll with this ID")
+
+        service = ArchiveService(repository, settings.archive_dir)
+        standings = await service.tally(poll, TallyAlgorithm(args.algorithm))
+        labels = {opt.id: opt.label for opt in poll.options}
+        for place, (option_id, score) in enumerate(standings, start=1):
+            print(f"{place:>3}. {labels.get(option_id, option_id)}  {score:g}")
+    finally:
+        await close_database_connection()
+
+
+async def import_votes(args: argparse.Namespace) -> None:
+    """Import ballots from a BLT or CSV election file into a poll."""
+    from services.vote_import import VoteImportFormat, VoteImportService
+
+    path = Path(args.file)
+    try:
+        import_format = VoteImportFormat(args.format or path.suffix.lstrip(".").lower())
+    except ValueError:
+        raise SystemExit(f"{path}: unknown file format, pass --format blt or csv")
+    import_id = args.import_id or path.name
+
+    async def read_chunks():
+        with open(path, "rb") as file:
+            while chunk := file.read(1 << 20):
+                yield chunk
+
+    def show_progress(report) -> None:
+        print(f"\r{report.imported} imported, {report.skipped} skipped, "
+              f"{report.rejected} rejected", end="", flush=True)
+
+    try:
+        repository = await get_poll_repository(current_database())
+        service = VoteImportService(repository)
+        try:
+            report = await service.import_votes(
+                args.poll_id,
+                read_chunks(),
+                import_format,
+                import_id,
+                on_progress=show_progress,
+            )
+        except HTTPException as exc:
+            raise SystemExit(f"{args.poll_id}: {exc.detail}")
+        show_progress(report)
+        print()
+        for message in [*report.errors, *report.warnings]:
+            print(f"  {message}")
+        if not report.complete:
+            raise SystemExit(f"{path}: import stopped early; run it again to resume")
+    finally:
+        await close_database_connection()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="rankstuff.io maintenance tasks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    pack = commands.add_parser(
+        "pack-ballots",
+        help="Migrate stored votes to the packed ballot format (MongoDB)",
+    )
+    pack.add_argument("--poll", action="append", help="Poll ID to migrate (repeatable; default: all)")
+    pack.add_argument("--batch-size", type=int, default=1000)
+    pack.set_defaults(handler=pack_ballots)
+
+    archive = commands.add_parser(
+        "archive-poll",
+        help="Write a closed poll's ballots to an archive file",
+    )
+    archive.add_argument("poll_id")
+    archive.add_argument("--prune", action="store_true", help="Delete the archived votes from the database")
+    archive.set_defaults(handler=archive_poll)
+
+    tally = commands.add_parser("tally", help="Tally an archived poll")
+    tally.add_argument("poll_id")
+    tally.add_argument(
+        "--algorithm",
+        choices=["borda", "plurality", "instant_runoff"],
+        default="borda",
+    )
+    tally.set_defaults(handler=tally_poll)
+
+    importer = commands.add_parser(
+        "import-votes",
+        help="Import ballots from a BLT or CSV election file (resumable)",
+    )
+    importer.add_argument("poll_id")
+    importer.add_argument("file")
+    importer.add_argument("--format", choices=["blt", "csv"], help="Default: the file extension")
+    importer.add_argument(
+        "--import-id",
+        help="Name of the import, reused to resume it (default: the file name)",
+    )
+    importer.set_defaults(handler=import_votes)
+
+    args = parser.parse_args()
+    asyncio.run(args.handler(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Process-local caches with cross-worker invalidation.
+
+Caches register for the collection whose documents they are derived
+from. Invalidation events (from the MongoDB change stream watcher, see
+``repositories/change_stream.py``) evict the changed document's key from
+every cache registered for its collection.
+
+While the change stream is live, entries only expire after
+``cache_ttl_seconds`` as a backstop. Without a live stream (standalone
+MongoDB, SQLite with several workers, or a broken stream) other workers'
+writes go unnoticed, so entries expire after ``cache_fallback_ttl_seconds``.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Generic, Hashable, TypeVar
+
+from .config import settings
+
+V = TypeVar("V")
+
+_MISSING = object()
+
+# collection name -> caches derived from its documents
+_registry: dict[str, list["TTLCache"]] = {}
+_stream_live = False
+
+
+class TTLCache(Generic[V]):
+    """Size-bounded LRU cache whose entries expire after the current TTL."""
+
+    def __init__(self, name: str, max_size: int = 10_000, ttl: float | None = None):
+        """
+        Create a cache.
+
+        Args:
+            name: Cache name, for logs and debugging.
+            max_size: Entries kept before the least recently used is evicted.
+            ttl: Upper bound on entry lifetime, below the global TTLs.
+        """
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[float, V]] = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> V | Any:
+        """Get a cached value, or default if missing or expired."""
+        entry = self._entries.get(key, _MISSING)
+        if entry is _MISSING:
+            return default
+        stored_at, value = entry
+        ttl = current_ttl() if self.ttl is None else min(self.ttl, current_ttl())
+        if time.monotonic() - stored_at > ttl:
+            del self._entries[key]
+            return default
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: V) -> None:
+        """Cache a value."""
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        """Evict a key."""
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Evict every entry."""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def current_ttl() -> float:
+    """Entry lifetime, depending on whether invalidation events are arriving."""
+    if _stream_live:
+        return settings.cache_ttl_seconds
+    return settings.cache_fallback_ttl_seconds
+
+
+def register_cache(collection: str, cache: TTLCache) -> TTLCache:
+    """
+    Register a cache for invalidation by changes to a collection.
+
+    Args:
+        collection: Collection the cached values are derived from.
+        cache: The cache.
+
+    Returns:
+        The cache, so it can be registered where it is defined.
+    """
+    _registry.setdefault(collection, []).append(cache)
+    return cache
+
+
+def publish_invalidation(collection: str, key: Hashable | None) -> None:
+    """
+    Evict a changed document from the caches registered for its collection.
+
+    Args:
+        collection: The changed document's collection.
+        key: The cache key of the changed document, or None to clear
+            every cache registered for the collection.
+    """
+    for cache in _registry.get(collection, ()):
+        if key is None:
+            cache.clear()
+        else:
+            cache.invalidate(key)
+
+
+def invalidate_all() -> None:
+    """Clear every registered cache, e.g. after invalidation events were missed."""
+    for caches in _registry.values():
+        for cache in caches:
+            cache.clear()
+
+
+def set_stream_live(live: bool) -> None:
+    """Record whether the change stream is delivering invalidation events."""
+    global _stream_live
+    _stream_live = live
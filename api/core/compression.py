@@ -0,0 +1,257 @@
+"""
+Response compression - gzip or brotli, above a size threshold.
+
+Small responses go out as-is: below ``compression_minimum_size`` the
+encoding overhead isn't worth the bytes saved. Larger JSON, CSV and text
+responses are compressed with the best encoding the client accepts;
+brotli needs the ``brotli`` package (``pip install rankstuff-api[compression]``),
+otherwise gzip is used.
+
+Responses with a strong ETag that may be cached (closed polls and their
+results, see ``services/poll_service.py``) never change for that ETag, so
+their compressed variants are kept per ETag and encoding: a hot closed
+poll's results are compressed once per worker rather than per request.
+"""
+
+import gzip
+import zlib
+from collections import OrderedDict
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # optional, see the module docstring
+    brotli = None
+
+# Media types worth compressing; everything the API returns is one of them
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "text/",
+)
+
+
+def available_encodings() -> tuple[str, ...]:
+    """Encodings this process can produce, most preferred first."""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate_encoding(accept_encoding: str, encodings: tuple[str, ...]) -> str | None:
+    """
+    Pick the response encoding from an Accept-Encoding header.
+
+    Args:
+        accept_encoding: The request's Accept-Encoding header.
+        encodings: Encodings available, most preferred first.
+
+    Returns:
+        The accepted encoding with the highest quality (ties going to the
+        earlier of ``encodings``), or None to send the identity encoding.
+    """
+    qualities: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        name, _, value = params.partition("=")
+        if name.strip().lower() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        qualities[coding] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body: bytes, encoding: str, gzip_level: int, brotli_quality: int) -> bytes:
+    """Compress a whole body."""
+    if encoding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+class _StreamCompressor:
+    """Incremental compressor for streamed bodies, flushing every chunk."""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=brotli_quality)
+        else:
+            # wbits 31: gzip container
+            self._compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, chunk: bytes, final: bool) -> bytes:
+        if self.encoding == "br":
+            data = self._compressor.process(chunk)
+            return data + (self._compressor.finish() if final else self._compressor.flush())
+        data = self._compressor.compress(chunk)
+        return data + self._compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+def _weaken_etag(headers: MutableHeaders) -> None:
+    """Make a strong ETag weak, as for a compressed variant."""
+    etag = headers.get("etag")
+    if etag and not etag.startswith("W/"):
+        headers["etag"] = f"W/{etag}"
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses above a size threshold.
+
+    Responses that are already encoded, partial, or of a non-compressible
+    type pass through untouched. Compressed responses get
+    ``Content-Encoding`` and ``Vary: Accept-Encoding``, and their strong
+    ETag is made weak: the bytes differ from the identity encoding, while
+    conditional requests still match it (the services compare ETags weakly).
+    Whenever the request negotiates an encoding, ETags are made weak the
+    same way on small uncompressed responses and on 304s, so a client
+    revalidating a compressed copy gets back the validator it stored.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 5,
+        cache_size: int = 256,
+    ):
+        """
+        Args:
+            app: The wrapped ASGI application.
+            minimum_size: Bytes below which responses aren't compressed.
+            gzip_level: zlib compression level, 1-9.
+            brotli_quality: brotli quality, 0-11.
+            cache_size: Compressed variants of cacheable responses kept, 0 disables.
+        """
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.cache_size = cache_size
+        self.encodings = available_encodings()
+        # (path, ETag, encoding) -> compressed body
+        self._variants: OrderedDict[tuple[str, str, str], bytes] = OrderedDict()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(
+            Headers(scope=scope).get("accept-encoding", ""), self.encodings
+        )
+        start: Message | None = None
+        stream: _StreamCompressor | None = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start, stream, passthrough
+
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if not self._compressible(message["status"], headers):
+                    if message["status"] == 304 and encoding is not None:
+                        # Matches the ETag of the compressed 200
+                        mutable = MutableHeaders(raw=message["headers"])
+                        mutable.add_vary_header("Accept-Encoding")
+                        _weaken_etag(mutable)
+                    passthrough = True
+                    await send(message)
+                    return
+                # Held back until the body shows whether to compress
+                start = message
+                MutableHeaders(raw=start["headers"]).add_vary_header("Accept-Encoding")
+                return
+
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if stream is not None:
+                message["body"] = stream.compress(body, final=not more_body)
+                await send(message)
+                return
+
+            if start is None:
+                # Body already started uncompressed
+                await send(message)
+                return
+            headers = MutableHeaders(raw=start["headers"])
+
+            if encoding is None or (len(body) < self.minimum_size and not more_body):
+                if encoding is not None:
+                    _weaken_etag(headers)
+                await send(start)
+                start = None
+                await send(message)
+                return
+
+            if more_body:
+                stream = _StreamCompressor(encoding, self.gzip_level, self.brotli_quality)
+                message["body"] = stream.compress(body, final=False)
+                if "content-length" in headers:
+                    del headers["content-length"]
+            else:
+                message["body"] = self._compress_body(scope["path"], headers, body, encoding)
+                headers["content-length"] = str(len(message["body"]))
+
+            headers["content-encoding"] = encoding
+            _weaken_etag(headers)
+            await send(start)
+            start = None
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
+
+    def _compressible(self, status: int, headers: Headers) -> bool:
+        if status < 200 or status in (204, 206, 304):
+            return False
+        if "content-encoding" in headers:
+            return False
+        media_type = headers.get("content-type", "").partition(";")[0].strip().lower()
+        return media_type.startswith(COMPRESSIBLE_TYPES) or media_type.endswith("+json")
+
+    def _compress_body(self, path: str, headers: MutableHeaders, body: bytes, encoding: str) -> bytes:
+        """Compress a whole body, reusing the variant cached for its ETag."""
+        key = self._variant_key(path, headers, encoding)
+        if key is None:
+            return compress(body, encoding, self.gzip_level, self.brotli_quality)
+
+        compressed = self._variants.get(key)
+        if compressed is None:
+            compressed = compress(body, encoding, self.gzip_level, self.brotli_quality)
+            self._variants[key] = compressed
+            if len(self._variants) > self.cache_size:
+                self._variants.popitem(last=False)
+        self._variants.move_to_end(key)
+        return compressed
+
+    def _variant_key(self, path: str, headers: MutableHeaders, encoding: str) -> tuple[str, str, str] | None:
+        """Cache key of a response's compressed variant, or None if it mustn't be cached."""
+        if not self.cache_size:
+            return None
+        etag = headers.get("etag")
+        if not etag or etag.startswith("W/"):
+            return None
+        cache_control = headers.get("cache-control", "").lower()
+        if "max-age" not in cache_control or "no-cache" in cache_control or "no-store" in cache_control:
+            return None
+        return path, etag, encoding
@@ -2,6 +2,8 @@
 Application configuration using Pydantic Settings.
 """
 
+from typing import Literal
+
 from pydantic_settings import BaseSettings
 
 
@@ -12,14 +14,96 @@ class Settings(BaseSettings):
     app_name: str = "rankstuff.io"
     debug: bool = False
 
+    # Storage backend: "mongodb", "sqlite" for single-node installs,
+    # or "memory" for tests and benchmarks
+    repository_backend: Literal["mongodb", "sqlite", "memory"] = "mongodb"
+
     # MongoDB
     mongodb_url: str = "mongodb://localhost:27017"
     mongodb_database: str = "rankstuff"
+    # Connections each worker opens at startup and keeps open
+    mongodb_min_pool_size: int = 0
+    # Store new votes as packed option-index ballots (see repositories/ballots.py)
+    mongodb_packed_ballots: bool = False
+    # Store new votes in bucket documents of up to N ballots (0 disables)
+    mongodb_vote_bucket_size: int = 0
+
+    # SQLite
+    sqlite_path: str = "rankstuff.db"
+    sqlite_pool_size: int = 4
+
+    # Ballot archives of closed polls (see repositories/ballot_archive.py)
+    archive_dir: str = "archives"
+
+    # Close polls at their closes_at deadline (one worker at a time holds the lease)
+    poll_scheduler_enabled: bool = True
+    poll_scheduler_interval_seconds: float = 30.0
+    poll_scheduler_lease_seconds: float = 90.0
+
+    # Polls returned by one GET /polls:batch request
+    poll_batch_max_ids: int = 100
+    # Votes read and encoded per chunk of GET /polls/{id}/votes/export
+    vote_export_batch_size: int = 1000
+    # Ballots validated and written per bulk insert when importing election
+    # files (see services/vote_import.py)
+    vote_import_batch_size: int = 1000
+    # Highest weight (repeat count) of one ballot line in an imported file
+    vote_import_max_weight: int = 10000
+
+    # Cache-Control max-age of closed polls and their results, which never change
+    closed_poll_max_age_seconds: int = 86400
+    # nginx micro-cache lifetime of open and draft poll reads, and the nginx
+    # base URLs refreshed when a poll changes status (see services/edge_cache.py)
+    poll_micro_cache_seconds: int = 1
+    edge_cache_purge_urls: list[str] = []
+
+    # Compress responses of at least N bytes with gzip, or brotli when the
+    # client accepts it and the brotli package is installed; compressed
+    # variants of up to N cacheable responses are kept (see core/compression.py)
+    compression_minimum_size: int = 1024
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 5
+    compression_cache_size: int = 256
+
+    # Process-local caches (see core/cache.py): entry lifetime while MongoDB
+    # change streams deliver invalidations, and without them
+    cache_ttl_seconds: float = 300.0
+    cache_fallback_ttl_seconds: float = 5.0
+    change_streams_enabled: bool = True
+
+    # Per-worker warmup before serving (see warmup.py)
+    warmup_enabled: bool = True
+    warmup_open_polls: int = 1000
+    # Warn when a worker takes longer than this to import and start (0 disables)
+    startup_budget_seconds: float = 5.0
 
     # JWT Authentication
     jwt_secret_key: str = "your-secret-key-change-in-production"
     jwt_algorithm: str = "HS256"
     jwt_access_token_expire_minutes: int = 60
+    # Embed the user's profile in access tokens and trust it instead of
+    # reading the user per request; deactivated users are refused through
+    # the revocation list
+    jwt_stateless_claims: bool = False
+    # Deactivated users, reloaded every N seconds and refused by stateless
+    # claims and /auth/verify (see services/revocation_list.py)
+    revocation_refresh_seconds: float = 30.0
+
+    # Authenticated user lookups cached per process (invalidated on user
+    # changes), and decoded tokens cached until they expire
+    principal_cache_ttl_seconds: float = 30.0
+    principal_cache_size: int = 10_000
+    token_cache_size: int = 10_000
+
+    # bcrypt threads per worker process, and hashes allowed to wait for one
+    password_hash_workers: int = 2
+    password_hash_max_queue: int = 64
+    # bcrypt cost of new hashes: the highest taking at most the target time,
+    # measured at startup, unless pinned (keep it pinned when workers run on
+    # different hardware, or logins rehash back and forth between costs)
+    password_hash_target_ms: float = 250.0
+    password_hash_min_rounds: int = 10
+    password_hash_rounds: int = 0
 
     # CORS
     cors_origins: list[str] = ["http://localhost:3000", "http://localhost:4200", "https://rankstuff.io"]
@@ -2,40 +2,328 @@
 MongoDB database connection and session management.
 """
 
-from typing import AsyncGenerator
+from __future__ import annotations
 
-from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+import asyncio
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, AsyncGenerator, Callable, TypeVar
 
 from .config import settings
 
+if TYPE_CHECKING:
+    from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+
+T = TypeVar("T")
+
 # Global client instance
 _client: AsyncIOMotorClient | None = None
 
 
-async def get_database() -> AsyncGenerator[AsyncIOMotorDatabase, None]:
+class MemoryCollection:
     """
-    Dependency that provides a MongoDB database instance.
+    In-memory stand-in for a MongoDB collection.
 
-    Yields:
-        AsyncIOMotorDatabase: The MongoDB database instance.
+    Documents are keyed by their string ID. Repositories keep their own
+    secondary indexes in ``indexes``, one dict per indexed field.
+    """
+
+    def __init__(self):
+        self.documents: dict[str, dict] = {}
+        self.indexes: dict[str, dict] = {}
+
+    def index(self, name: str) -> dict:
+        """Get (creating if needed) the secondary index with the given name."""
+        return self.indexes.setdefault(name, {})
+
+
+class MemoryDatabase:
+    """In-memory stand-in for a MongoDB database."""
+
+    def __init__(self):
+        self._collections: dict[str, MemoryCollection] = {}
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        return self._collections.setdefault(name, MemoryCollection())
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    email TEXT NOT NULL,
+    username TEXT NOT NULL,
+    hashed_password TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    is_active INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS users_email ON users (email);
+CREATE INDEX IF NOT EXISTS users_username ON users (username);
+
+-- Lowercased email and username of every user, so logins are one
+-- indexed lookup and duplicate registrations fail on insert
+CREATE TABLE IF NOT EXISTS login_keys (
+    key TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL REFERENCES users (id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS login_keys_user ON login_keys (user_id);
+
+-- Login keys of users created before login_keys whose email or username
+-- differs from an older user's only by case. The older user holds the
+-- key in login_keys; these users log in with their exact spelling.
+CREATE TABLE IF NOT EXISTS shadowed_login_keys (
+    key TEXT NOT NULL,
+    user_id TEXT NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    PRIMARY KEY (key, user_id)
+);
+
+CREATE TABLE IF NOT EXISTS polls (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    description TEXT,
+    options TEXT NOT NULL,
+    status TEXT NOT NULL,
+    owner_id TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    closes_at TEXT
+);
+CREATE INDEX IF NOT EXISTS polls_owner ON polls (owner_id);
+CREATE INDEX IF NOT EXISTS polls_status ON polls (status);
+CREATE INDEX IF NOT EXISTS polls_status_closes ON polls (status, closes_at);
+
+CREATE TABLE IF NOT EXISTS votes (
+    id TEXT PRIMARY KEY,
+    poll_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    rankings TEXT NOT NULL,
+    submitted_at TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS votes_poll_user ON votes (poll_id, user_id);
+
+-- One row per ranked choice, so tallies run as SQL aggregates
+CREATE TABLE IF NOT EXISTS rankings (
+    poll_id TEXT NOT NULL,
+    vote_id TEXT NOT NULL REFERENCES votes (id) ON DELETE CASCADE,
+    option_id TEXT NOT NULL,
+    rank INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS rankings_poll ON rankings (poll_id, option_id, rank);
+CREATE INDEX IF NOT EXISTS rankings_vote ON rankings (vote_id);
+
+-- Named leases held by one process at a time (e.g. the poll scheduler)
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    holder TEXT NOT NULL,
+    expires_at TEXT NOT NULL
+);
+"""
+
+# Schema changes applied in order on top of SQLITE_SCHEMA; the number
+# applied so far is kept in PRAGMA user_version
+SQLITE_MIGRATIONS = [
+    "ALTER TABLE polls ADD COLUMN archive TEXT",
+    "ALTER TABLE polls ADD COLUMN results TEXT",
+    "INSERT OR IGNORE INTO login_keys SELECT lower(email), id FROM users",
+    "INSERT OR IGNORE INTO login_keys SELECT lower(username), id FROM users",
+    "ALTER TABLE polls ADD COLUMN revision INTEGER NOT NULL DEFAULT 0",
+    # One vote per voter: drop repeat votes that raced past the service's
+    # already-voted check (their rankings cascade), then make it unique
+    "DELETE FROM votes WHERE rowid NOT IN "
+    "(SELECT min(rowid) FROM votes GROUP BY poll_id, user_id)",
+    "DROP INDEX IF EXISTS votes_poll_user",
+    "CREATE UNIQUE INDEX votes_poll_user ON votes (poll_id, user_id)",
+    # Record the login keys the login_keys backfill above skipped because
+    # an older user held them (reported by SQLiteUserRepository)
+    "INSERT OR IGNORE INTO shadowed_login_keys SELECT lower(email), id FROM users "
+    "WHERE NOT EXISTS (SELECT 1 FROM login_keys "
+    "WHERE key = lower(users.email) AND user_id = users.id)",
+    "INSERT OR IGNORE INTO shadowed_login_keys SELECT lower(username), id FROM users "
+    "WHERE NOT EXISTS (SELECT 1 FROM login_keys "
+    "WHERE key = lower(users.username) AND user_id = users.id)",
+]
+
+
+class SQLiteDatabase:
+    """
+    SQLite database in WAL mode, accessed through a thread pool.
+
+    Every worker thread keeps its own connection, so reads run
+    concurrently under WAL while writes serialize on SQLite's lock.
+    Statements use fixed SQL text, so each connection's statement cache
+    keeps them prepared.
     """
-    global _client
+
+    def __init__(self, path: str, pool_size: int = 4):
+        """
+        Open the database and create the schema if needed.
+
+        Args:
+            path: Path to the SQLite database file.
+            pool_size: Number of worker threads (and connections).
+        """
+        self.path = path
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=pool_size,
+            thread_name_prefix="sqlite",
+        )
+        self._migrate(self._connect())
+
+    def _connect(self) -> sqlite3.Connection:
+        """Get the calling thread's connection, opening it on first use."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self.path,
+                timeout=5.0,
+                cached_statements=256,
+                check_same_thread=False,
+            )
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("PRAGMA foreign_keys=ON")
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def _migrate(self, connection: sqlite3.Connection) -> None:
+        """
+        Switch to WAL, create the schema and apply pending migrations.
+
+        Safe to run from several worker processes at once: the schema and
+        migrations are applied under one write lock, and the version is
+        read after taking it.
+        """
+        # WAL is persistent, but switching to it fails without waiting on
+        # the busy timeout while another process holds a lock
+        deadline = time.monotonic() + 10.0
+        while connection.execute("PRAGMA journal_mode").fetchone()[0] != "wal":
+            try:
+                connection.execute("PRAGMA journal_mode=WAL")
+            except sqlite3.OperationalError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.05)
+
+        connection.executescript("BEGIN IMMEDIATE;" + SQLITE_SCHEMA)
+        try:
+            version = connection.execute("PRAGMA user_version").fetchone()[0]
+            for statement in SQLITE_MIGRATIONS[version:]:
+                connection.execute(statement)
+            connection.execute(f"PRAGMA user_version = {len(SQLITE_MIGRATIONS)}")
+            connection.commit()
+        except BaseException:
+            connection.rollback()
+            raise
+
+    async def run(self, fn: Callable[..., T], *args) -> T:
+        """
+        Run ``fn(connection, *args)`` on the thread pool.
+
+        Args:
+            fn: Function taking a connection and the given arguments.
+
+        Returns:
+            The function's return value.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor,
+            lambda: fn(self._connect(), *args),
+        )
+
+    def close(self) -> None:
+        """Shut down the thread pool and close every connection."""
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+
+
+# Process-local stores for the memory and sqlite backends
+_memory_database: MemoryDatabase | None = None
+_sqlite_database: SQLiteDatabase | None = None
+
+
+def _open_mongodb_client() -> AsyncIOMotorClient:
+    # Imported here so the sqlite and memory backends never load motor
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    return AsyncIOMotorClient(
+        settings.mongodb_url,
+        minPoolSize=settings.mongodb_min_pool_size,
+    )
+
+
+def _open_sqlite_database() -> SQLiteDatabase:
+    return SQLiteDatabase(settings.sqlite_path, pool_size=settings.sqlite_pool_size)
+
+
+def current_database() -> AsyncIOMotorDatabase | SQLiteDatabase | MemoryDatabase:
+    """
+    Get the database of the configured backend, connecting on first use.
+
+    Returns:
+        The MongoDB database, or the process-wide SQLiteDatabase or
+        MemoryDatabase for the sqlite and memory backends.
+    """
+    global _client, _memory_database, _sqlite_database
+
+    if settings.repository_backend == "memory":
+        if _memory_database is None:
+            _memory_database = MemoryDatabase()
+        return _memory_database
+
+    if settings.repository_backend == "sqlite":
+        if _sqlite_database is None:
+            _sqlite_database = _open_sqlite_database()
+        return _sqlite_database
 
     if _client is None:
-        _client = AsyncIOMotorClient(settings.mongodb_url)
+        _client = _open_mongodb_client()
+
+    return _client[settings.mongodb_database]
+
 
-    yield _client[settings.mongodb_database]
+async def get_database() -> AsyncGenerator[
+    AsyncIOMotorDatabase | SQLiteDatabase | MemoryDatabase, None
+]:
+    """
+    Dependency that provides a MongoDB database instance.
+
+    With the sqlite or memory backend configured, yields the process-wide
+    SQLiteDatabase or MemoryDatabase instead.
+
+    Yields:
+        AsyncIOMotorDatabase: The MongoDB database instance.
+    """
+    yield current_database()
 
 
 async def connect_to_database() -> None:
     """Initialize the database connection on application startup."""
-    global _client
-    _client = AsyncIOMotorClient(settings.mongodb_url)
+    global _client, _memory_database, _sqlite_database
+    if settings.repository_backend == "memory":
+        _memory_database = MemoryDatabase()
+        return
+    if settings.repository_backend == "sqlite":
+        _sqlite_database = _open_sqlite_database()
+        return
+    _client = _open_mongodb_client()
 
 
 async def close_database_connection() -> None:
     """Close the database connection on application shutdown."""
-    global _client
+    global _client, _memory_database, _sqlite_database
+    _memory_database = None
+    if _sqlite_database is not None:
+        _sqlite_database.close()
+        _sqlite_database = None
     if _client is not None:
         _client.close()
         _client = None
@@ -0,0 +1,37 @@
+"""
+Response classes for endpoints returning large Pydantic payloads.
+"""
+
+from functools import lru_cache
+from typing import Any
+
+import pydantic_core
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(model: type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(list[model])
+
+
+class ModelJSONResponse(JSONResponse):
+    """
+    JSON response encoding Pydantic models straight to bytes.
+
+    Endpoints that return a response instance skip FastAPI's response-model
+    pass, which validates the return value again before serializing it.
+    Service results are already validated models, so they are encoded
+    directly with their compiled serializers. Declare ``response_model`` on
+    the route to keep the OpenAPI schema.
+
+    Content is a model, a list of models of one class, or anything else
+    pydantic-core can encode.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.__pydantic_serializer__.to_json(content)
+        if isinstance(content, list) and content and isinstance(content[0], BaseModel):
+            return _list_adapter(type(content[0])).dump_json(content)
+        return pydantic_core.to_json(content)
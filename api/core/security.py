@@ -2,13 +2,123 @@
 Security utilities for JWT token handling and password hashing.
 """
 
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from typing import Callable, TypeVar
 
 import bcrypt
-from jose import JWTError, jwt
 
 from .config import settings
 
+# python-jose, and the cryptography backend it loads, are imported by the
+# token functions on first use rather than at startup
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+# bcrypt cost for new hashes: PASSWORD_HASH_ROUNDS, or measured at startup
+# by calibrate_password_rounds (bcrypt's own default until then)
+password_rounds = settings.password_hash_rounds or 12
+
+# Cost hashed while calibrating: cheap, and slow enough to time reliably
+_CALIBRATION_ROUNDS = 8
+_MAX_ROUNDS = 20
+
+
+class PasswordPoolFull(Exception):
+    """Raised when too many password hashes are already queued."""
+
+
+class PasswordPool:
+    """
+    Bounded thread pool for bcrypt work.
+
+    bcrypt takes hundreds of milliseconds per call by design and releases
+    the GIL while it runs, so it runs here instead of on the event loop.
+    At most ``workers`` hashes run at once; up to ``max_queue`` more wait,
+    and further requests are rejected rather than queued without bound.
+    """
+
+    def __init__(self, workers: int, max_queue: int):
+        """
+        Create the pool. Threads start on first use, after any fork.
+
+        Args:
+            workers: Hashes computed concurrently.
+            max_queue: Hashes allowed to wait for a free worker.
+        """
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: ThreadPoolExecutor | None = None
+
+        # Metrics
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds_total = 0.0
+        self.max_wait_seconds = 0.0
+
+    async def run(self, fn: Callable[..., T], *args) -> T:
+        """
+        Run ``fn(*args)`` on the pool.
+
+        Raises:
+            PasswordPoolFull: If the queue is full.
+        """
+        if self.in_flight >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise PasswordPoolFull()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="bcrypt",
+            )
+
+        submitted = time.perf_counter()
+
+        def task() -> tuple[float, T]:
+            return time.perf_counter() - submitted, fn(*args)
+
+        self.in_flight += 1
+        try:
+            waited, result = await asyncio.get_running_loop().run_in_executor(
+                self._executor,
+                task,
+            )
+        finally:
+            self.in_flight -= 1
+
+        self.completed += 1
+        self.wait_seconds_total += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        return result
+
+    def stats(self) -> dict:
+        """Queueing metrics since startup."""
+        return {
+            "workers": self.workers,
+            "running": min(self.in_flight, self.workers),
+            "queued": max(self.in_flight - self.workers, 0),
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self.wait_seconds_total / self.completed * 1000, 1)
+            if self.completed else 0.0,
+            "max_wait_ms": round(self.max_wait_seconds * 1000, 1),
+        }
+
+
+password_pool = PasswordPool(
+    workers=settings.password_hash_workers,
+    max_queue=settings.password_hash_max_queue,
+)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against a hashed password."""
@@ -19,13 +129,82 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 
 def hash_password(password: str) -> str:
-    """Hash a plain password."""
+    """Hash a plain password at the current cost."""
     return bcrypt.hashpw(
         password.encode("utf-8"),
-        bcrypt.gensalt()
+        bcrypt.gensalt(rounds=password_rounds)
     ).decode("utf-8")
 
 
+def hash_rounds(hashed_password: str) -> int:
+    """Get the cost a bcrypt hash was made with, stored in the hash ($2b$12$...)."""
+    return int(hashed_password.split("$")[2])
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    """Check whether a hash was made at a cost other than the current one."""
+    return hash_rounds(hashed_password) != password_rounds
+
+
+def measure_password_rounds(target_ms: float, min_rounds: int) -> int:
+    """
+    Find the bcrypt cost whose hash takes closest to, but at most, target_ms.
+
+    Each extra round doubles the hashing time, so one cheap hash is timed
+    and the rest extrapolated.
+
+    Args:
+        target_ms: Target time for one hash, in milliseconds.
+        min_rounds: Lowest cost returned, however slow the hardware.
+
+    Returns:
+        The bcrypt cost.
+    """
+    salt = bcrypt.gensalt(rounds=_CALIBRATION_ROUNDS)
+    elapsed = math.inf
+    for _ in range(3):
+        started = time.perf_counter()
+        bcrypt.hashpw(b"calibration", salt)
+        elapsed = min(elapsed, (time.perf_counter() - started) * 1000)
+    rounds = _CALIBRATION_ROUNDS + math.floor(math.log2(target_ms / elapsed))
+    return max(min_rounds, min(rounds, _MAX_ROUNDS))
+
+
+async def calibrate_password_rounds() -> int:
+    """
+    Set the cost of new hashes from PASSWORD_HASH_TARGET_MS.
+
+    A cost pinned with PASSWORD_HASH_ROUNDS is kept as is. Runs on the
+    password pool, so it measures the threads that hash in production.
+
+    Returns:
+        The cost in use.
+    """
+    global password_rounds
+    if not settings.password_hash_rounds:
+        password_rounds = await password_pool.run(
+            measure_password_rounds,
+            settings.password_hash_target_ms,
+            settings.password_hash_min_rounds,
+        )
+        logger.info(
+            "bcrypt cost %d (target %.0f ms per hash)",
+            password_rounds,
+            settings.password_hash_target_ms,
+        )
+    return password_rounds
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the password pool, without blocking the event loop."""
+    return await password_pool.run(verify_password, plain_password, hashed_password)
+
+
+async def hash_password_async(password: str) -> str:
+    """Hash a password on the password pool, without blocking the event loop."""
+    return await password_pool.run(hash_password, password)
+
+
 def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
     """
     Create a JWT access token.
@@ -47,6 +226,8 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None) -> s
         )
 
     to_encode.update({"exp": expire})
+    from jose import jwt
+
     encoded_jwt = jwt.encode(
         to_encode,
         settings.jwt_secret_key,
@@ -55,22 +236,45 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None) -> s
     return encoded_jwt
 
 
+# Decoded payloads of verified tokens, keyed by token digest; entries are
+# used until the token's exp, so a cached token is never accepted expired
+_decoded_tokens: OrderedDict[bytes, dict] = OrderedDict()
+
+
 def verify_token(token: str) -> dict | None:
     """
     Verify and decode a JWT token.
 
+    Verified tokens are cached until they expire, so repeated requests
+    with the same token skip signature verification.
+
     Args:
         token: The JWT token string to verify.
 
     Returns:
         The decoded token payload, or None if verification fails.
     """
+    digest = hashlib.sha256(token.encode("utf-8")).digest()
+    payload = _decoded_tokens.get(digest)
+    if payload is not None:
+        if payload["exp"] > time.time():
+            _decoded_tokens.move_to_end(digest)
+            return payload
+        del _decoded_tokens[digest]
+
+    from jose import JWTError, jwt
+
     try:
         payload = jwt.decode(
             token,
             settings.jwt_secret_key,
             algorithms=[settings.jwt_algorithm]
         )
-        return payload
     except JWTError:
         return None
+
+    if isinstance(payload.get("exp"), (int, float)):
+        _decoded_tokens[digest] = payload
+        if len(_decoded_tokens) > settings.token_cache_size:
+            _decoded_tokens.popitem(last=False)
+    return payload
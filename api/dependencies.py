@@ -2,54 +2,122 @@
 Dependency injection - FastAPI dependencies for services and auth.
 """
 
-from fastapi import Depends, HTTPException, status
+from typing import TYPE_CHECKING
+
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from motor.motor_asyncio import AsyncIOMotorDatabase
+from pydantic import ValidationError
 
-from core.database import get_database
+from core.config import settings
 from core.security import verify_token
-from models.auth import UserResponse
-from repositories.poll_repository import PollRepository
-from repositories.user_repository import UserRepository
+from models.auth import TokenPayload, UserResponse
+from repositories.memory_repository import MemoryPollRepository, MemoryUserRepository
+from repositories.sqlite_repository import SQLitePollRepository, SQLiteUserRepository
 from services.auth_service import AuthService
+from services.chart_service import ChartService
 from services.poll_service import PollService
+from services.revocation_list import revocation_list
+from services.vote_import import VoteImportService
+
+if TYPE_CHECKING:
+    from motor.motor_asyncio import AsyncIOMotorDatabase
+
+    from repositories.poll_repository import PollRepository
+    from repositories.user_repository import UserRepository
 
 # Security scheme for JWT bearer token
 security = HTTPBearer()
 
 
-# --- Repository Dependencies ---
+# --- Repositories ---
+# The MongoDB repositories import motor and pymongo, so they are only
+# imported with the mongodb backend
 
 
-async def get_user_repository(
-    database: AsyncIOMotorDatabase = Depends(get_database),
-) -> UserRepository:
-    """Get the user repository instance."""
+async def get_user_repository(database: "AsyncIOMotorDatabase") -> "UserRepository":
+    """Get the user repository instance for the configured backend."""
+    if settings.repository_backend == "memory":
+        return MemoryUserRepository(database)
+    if settings.repository_backend == "sqlite":
+        return SQLiteUserRepository(database)
+    from repositories.user_repository import UserRepository
+
     return UserRepository(database)
 
 
-async def get_poll_repository(
-    database: AsyncIOMotorDatabase = Depends(get_database),
-) -> PollRepository:
-    """Get the poll repository instance."""
-    return PollRepository(database)
+async def get_poll_repository(database: "AsyncIOMotorDatabase") -> "PollRepository":
+    """Get the poll repository instance for the configured backend."""
+    if settings.repository_backend == "memory":
+        return MemoryPollRepository(database)
+    if settings.repository_backend == "sqlite":
+        return SQLitePollRepository(database)
+    from repositories.poll_repository import PollRepository
+
+    return PollRepository(
+        database,
+        packed_ballots=settings.mongodb_packed_ballots,
+        vote_bucket_size=settings.mongodb_vote_bucket_size,
+    )
+
+
+# --- Service Container ---
+
+
+class ServiceContainer:
+    """
+    Repositories and services shared by every request of an application.
+
+    Repositories and services hold no per-request state, so they are built
+    once at startup (see main.lifespan) and stored on ``app.state.services``.
+    The dependencies below then only look them up.
+    """
+
+    def __init__(self, user_repository: "UserRepository", poll_repository: "PollRepository"):
+        """
+        Build the services.
+
+        Args:
+            user_repository: Repository for user data access.
+            poll_repository: Repository for poll data access.
+        """
+        self.user_repository = user_repository
+        self.poll_repository = poll_repository
+        self.auth_service = AuthService(user_repository)
+        self.poll_service = PollService(poll_repository)
+        self.chart_service = ChartService()
+        self.vote_import_service = VoteImportService(poll_repository)
+
+    @classmethod
+    async def create(cls, database: "AsyncIOMotorDatabase") -> "ServiceContainer":
+        """Build the container for a database of the configured backend."""
+        return cls(
+            await get_user_repository(database),
+            await get_poll_repository(database),
+        )
 
 
 # --- Service Dependencies ---
+# Declared async so FastAPI calls them inline instead of in its threadpool
 
 
-async def get_auth_service(
-    user_repository: UserRepository = Depends(get_user_repository),
-) -> AuthService:
+async def get_auth_service(request: Request) -> AuthService:
     """Get the auth service instance."""
-    return AuthService(user_repository)
+    return request.app.state.services.auth_service
 
 
-async def get_poll_service(
-    poll_repository: PollRepository = Depends(get_poll_repository),
-) -> PollService:
+async def get_poll_service(request: Request) -> PollService:
     """Get the poll service instance."""
-    return PollService(poll_repository)
+    return request.app.state.services.poll_service
+
+
+async def get_chart_service(request: Request) -> ChartService:
+    """Get the chart service instance."""
+    return request.app.state.services.chart_service
+
+
+async def get_vote_import_service(request: Request) -> VoteImportService:
+    """Get the vote import service instance."""
+    return request.app.state.services.vote_import_service
 
 
 # --- Authentication Dependencies ---
@@ -85,7 +153,32 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    return await auth_service.get_current_user(user_id)
+    return await _resolve_user(payload, auth_service)
+
+
+async def get_token_subject(
+    credentials: HTTPAuthorizationCredentials | None = Depends(
+        HTTPBearer(auto_error=False)
+    ),
+) -> str:
+    """
+    Validate a JWT token using in-memory state only and return its user ID.
+
+    The signature, expiry and revocation list are checked, but the user is
+    not read, so deleted users pass until their tokens expire.
+
+    Raises:
+        HTTPException: If the token is missing, invalid or revoked.
+    """
+    payload = verify_token(credentials.credentials) if credentials else None
+    user_id = payload.get("sub") if payload else None
+    if user_id is None or revocation_list.is_revoked(user_id):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user_id
 
 
 async def get_current_user_optional(
@@ -114,6 +207,43 @@ async def get_current_user_optional(
         return None
 
     try:
-        return await auth_service.get_current_user(user_id)
+        return await _resolve_user(payload, auth_service)
     except HTTPException:
         return None
+
+
+async def _resolve_user(payload: dict, auth_service: AuthService) -> UserResponse:
+    """
+    Get the user a verified token payload was issued to.
+
+    In stateless mode, tokens carrying profile claims are trusted without
+    reading the user, unless the user is on the revocation list.
+
+    Raises:
+        HTTPException: If the token is revoked or the user not found.
+    """
+    if settings.jwt_stateless_claims and "username" in payload:
+        try:
+            claims = TokenPayload.model_validate(payload)
+        except ValidationError:
+            claims = None
+        if (
+            claims is not None
+            and claims.is_active
+            and None not in (claims.username, claims.email, claims.created_at)
+        ):
+            if revocation_list.is_revoked(claims.sub):
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Token has been revoked",
+                    headers={"WWW-Authenticate": "Bearer"},
+                )
+            return UserResponse(
+                id=claims.sub,
+                email=claims.email,
+                username=claims.username,
+                created_at=claims.created_at,
+                is_active=claims.is_active,
+            )
+
+    return await auth_service.get_current_user(payload["sub"])
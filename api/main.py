@@ -4,14 +4,28 @@ FastAPI application entry point for rankstuff.io.
 Run with: cd api && uv run uvicorn main:app --reload
 """
 
+import time
+
+# Startup is timed from here, before the application's imports
+_import_started = time.perf_counter()
+
+import logging
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from core import security
+from core.compression import CompressionMiddleware
 from core.config import settings
-from core.database import close_database_connection, connect_to_database
+from core.database import close_database_connection, connect_to_database, current_database
+from dependencies import ServiceContainer
 from routers import auth_router, chart_router, poll_router
+from services.poll_scheduler import PollScheduler
+from services.revocation_list import revocation_list
+from warmup import warm_up
+
+logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
@@ -19,11 +33,63 @@ async def lifespan(app: FastAPI):
     """
     Application lifespan handler.
     """
+    await security.calibrate_password_rounds()
     await connect_to_database()
+    app.state.services = await ServiceContainer.create(current_database())
+    poll_repository = app.state.services.poll_repository
+    await poll_repository.ensure_indexes()
+    user_repository = app.state.services.user_repository
+    await user_repository.ensure_indexes()
+    if settings.warmup_enabled:
+        await warm_up(app, poll_repository)
+
+    watcher = None
+    if settings.repository_backend == "mongodb" and settings.change_streams_enabled:
+        from repositories.change_stream import ChangeStreamWatcher
+
+        watcher = ChangeStreamWatcher(current_database())
+        watcher.start()
+
+    scheduler = None
+    if settings.poll_scheduler_enabled:
+        scheduler = PollScheduler(
+            poll_repository,
+            interval=settings.poll_scheduler_interval_seconds,
+            lease_seconds=settings.poll_scheduler_lease_seconds,
+        )
+        scheduler.start()
+
+    # Checked by /auth/verify in every mode, and by stateless claims
+    revocation_list.start(
+        user_repository,
+        interval=settings.revocation_refresh_seconds,
+    )
+
+    _check_startup_time()
+
     yield
+
+    await revocation_list.stop()
+    if scheduler is not None:
+        await scheduler.stop()
+    if watcher is not None:
+        await watcher.stop()
     await close_database_connection()
 
 
+def _check_startup_time() -> None:
+    """Log how long the worker took to start, warning past the budget."""
+    elapsed = time.perf_counter() - _import_started
+    if settings.startup_budget_seconds and elapsed > settings.startup_budget_seconds:
+        logger.warning(
+            "Worker started in %.2f s, over the %.2f s startup budget",
+            elapsed,
+            settings.startup_budget_seconds,
+        )
+    else:
+        logger.info("Worker started in %.2f s", elapsed)
+
+
 app = FastAPI(
     title=settings.app_name,
     description="A ranking and polling API using Borda count",
@@ -38,6 +104,13 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.compression_minimum_size,
+    gzip_level=settings.compression_gzip_level,
+    brotli_quality=settings.compression_brotli_quality,
+    cache_size=settings.compression_cache_size,
+)
 
 # Include routers
 app.include_router(auth_router)
@@ -58,4 +131,8 @@ async def health_check() -> dict:
         "status": "healthy",
         "app": settings.app_name,
         "version": "1.0.0",
+        "password_hashing": {
+            **security.password_pool.stats(),
+            "rounds": security.password_rounds,
+        },
     }
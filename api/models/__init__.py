@@ -14,11 +14,15 @@ from .polls import (
     PollOption,
     PollCreate,
     PollResponse,
+    PollBatchResponse,
     PollInDB,
     VoteCreate,
     VoteResponse,
     VoteInDB,
     PollResults,
+    PollPage,
+    VoteImportReport,
+    VoteImportProgress,
 )
 from .charts import (
     AlgorithmComparisonChart,
@@ -37,11 +41,15 @@ __all__ = [
     "PollOption",
     "PollCreate",
     "PollResponse",
+    "PollBatchResponse",
     "PollInDB",
     "VoteCreate",
     "VoteResponse",
     "VoteInDB",
     "PollResults",
+    "PollPage",
+    "VoteImportReport",
+    "VoteImportProgress",
     # Charts
     "AlgorithmComparisonChart",
     "VoteDistributionChart",
@@ -52,6 +52,12 @@ class TokenPayload(BaseModel):
     sub: str  # User ID
     exp: datetime
 
+    # Profile claims, present in tokens issued with JWT_STATELESS_CLAIMS
+    username: str | None = None
+    email: EmailStr | None = None
+    is_active: bool | None = None
+    created_at: datetime | None = None
+
 
 # --- Database Models ---
 
@@ -2,10 +2,10 @@
 Pydantic models for polls and voting.
 """
 
-from datetime import datetime
+from datetime import datetime, timezone
 from enum import Enum
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 
 
 class PollStatus(str, Enum):
@@ -16,6 +16,13 @@ class PollStatus(str, Enum):
     CLOSED = "closed"
 
 
+def _naive_utc(value: datetime | None) -> datetime | None:
+    """Convert an aware datetime to naive UTC, the form timestamps are stored in."""
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
 # --- Embedded Models ---
 
 class PollOption(BaseModel):
@@ -44,6 +51,8 @@ class PollCreate(BaseModel):
     allow_multiple_votes: bool = False
     closes_at: datetime | None = None
 
+    _closes_at_utc = field_validator("closes_at")(_naive_utc)
+
 
 class PollUpdate(BaseModel):
     """Schema for poll update request."""
@@ -54,6 +63,8 @@ class PollUpdate(BaseModel):
     status: PollStatus | None = None
     closes_at: datetime | None = None
 
+    _closes_at_utc = field_validator("closes_at")(_naive_utc)
+
 
 class VoteCreate(BaseModel):
     """Schema for submitting a ranked vote."""
@@ -81,6 +92,13 @@ class PollResponse(BaseModel):
         from_attributes = True
 
 
+class PollBatchResponse(BaseModel):
+    """Schema for a batch poll lookup."""
+
+    polls: list[PollResponse]  # in the order requested
+    missing: list[str]  # requested IDs with no poll
+
+
 class VoteResponse(BaseModel):
     """Schema for vote confirmation response."""
 
@@ -112,8 +130,44 @@ class PollResults(BaseModel):
     calculated_at: datetime
 
 
+class PollPage(BaseModel):
+    """Schema for everything the vote page shows, in one response."""
+
+    poll: PollResponse
+    has_voted: bool
+    results: PollResults | None  # None unless the requester may see them
+
+
+class VoteImportReport(BaseModel):
+    """Schema for the outcome of a ballot import."""
+
+    import_id: str
+    imported: int  # ballots written by this run
+    skipped: int  # ballots already written by an earlier run of the import
+    rejected: int  # invalid ballots, not written
+    complete: bool  # whether the whole file was read
+    errors: list[str] = []  # the first rejected ballots and why
+    warnings: list[str] = []
+
+
+class VoteImportProgress(BaseModel):
+    """Schema for the progress of a ballot import."""
+
+    import_id: str
+    imported: int  # ballots written so far, across runs
+
+
 # --- Database Models ---
 
+class PollArchive(BaseModel):
+    """Schema for the ballot archive of a closed poll."""
+
+    path: str
+    vote_count: int
+    archived_at: datetime
+    pruned: bool = False
+
+
 class PollInDB(BaseModel):
     """Schema for poll document stored in MongoDB."""
 
@@ -125,6 +179,12 @@ class PollInDB(BaseModel):
     owner_id: str
     created_at: datetime = Field(default_factory=datetime.utcnow)
     closes_at: datetime | None = None
+    archive: PollArchive | None = None
+    # Results stored when the poll closes
+    results: PollResults | None = None
+    # Bumped by the repositories on every change visible in responses
+    # (status, votes, stored results); ETags are derived from it
+    revision: int = 0
 
     class Config:
         from_attributes = True
@@ -1,13 +1,29 @@
 """
 Repository layer - Abstract database access.
+
+Backends are imported on first access, so the SQLite and memory backends
+run without importing motor and pymongo.
 """
 
-from .base import BaseRepository
-from .user_repository import UserRepository
-from .poll_repository import PollRepository
+from importlib import import_module
+
+from .base import BaseRepository, DuplicateVoteError
+
+# Exported name -> module defining it
+_EXPORTS = {
+    "UserRepository": ".user_repository",
+    "PollRepository": ".poll_repository",
+    "MemoryUserRepository": ".memory_repository",
+    "MemoryPollRepository": ".memory_repository",
+    "SQLiteUserRepository": ".sqlite_repository",
+    "SQLitePollRepository": ".sqlite_repository",
+}
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(import_module(_EXPORTS[name], __name__), name)
+
 
-__all__ = [
-    "BaseRepository",
-    "UserRepository",
-    "PollRepository",
-]
+__all__ = ["BaseRepository", "DuplicateVoteError", *_EXPORTS]
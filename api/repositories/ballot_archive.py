@@ -0,0 +1,170 @@
+"""
+Fixed-width ballot archive files for closed polls.
+
+An archive stores every ballot of a poll as one row of a rank matrix: one
+column per option, holding the rank the voter gave that option, or 0 if it
+was left unranked. Rows are fixed width, so the file is read back with
+``numpy.memmap`` without copying or decoding anything.
+
+Layout (little-endian):
+
+- header: magic ``RSBA``, format version (u8), rank width in bytes (u8),
+  reserved (u16), option count (u32), ballot count (u64), option map
+  length (u32), reserved (u32)
+- option map: JSON list of option IDs, one per column, padded to 8 bytes
+- ballot rows: ballot count x option count ranks of rank width bytes
+
+Ranks larger than the rank width can hold are clamped to its maximum.
+Requires numpy (``pip install rankstuff-api[archive]``).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import struct
+from collections.abc import AsyncIterable, Iterator
+from pathlib import Path
+
+import numpy as np
+
+from models.polls import VoteInDB
+
+MAGIC = b"RSBA"
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct("<4sBBHIQII")
+
+# Memory budget of one chunk of ballot rows, in bytes. Tallies widen ranks
+# to 8-byte integers, so chunks are sized as if every rank took 8 bytes.
+CHUNK_BYTES = 64 << 20
+
+
+def _chunk_rows(option_count: int) -> int:
+    """Ballot rows per chunk within CHUNK_BYTES, at 8 bytes per rank."""
+    return max(1, CHUNK_BYTES // (max(1, option_count) * 8))
+
+
+def _rank_dtype(rank_width: int) -> np.dtype:
+    return np.dtype(np.uint8) if rank_width == 1 else np.dtype("<u2")
+
+
+def _pack_header(option_map: bytes, rank_width: int, option_count: int, ballot_count: int) -> bytes:
+    header = _HEADER.pack(
+        MAGIC, FORMAT_VERSION, rank_width, 0,
+        option_count, ballot_count, len(option_map), 0,
+    ) + option_map
+    return header + b"\0" * (-len(header) % 8)
+
+
+async def write_archive(
+    path: str | Path,
+    option_ids: list[str],
+    votes: AsyncIterable[VoteInDB],
+    chunk_size: int | None = None,
+) -> int:
+    """
+    Write a poll's ballots to an archive file.
+
+    The file is written next to its destination and moved into place
+    once complete, so readers never see a partial archive.
+
+    Args:
+        path: Destination file path.
+        option_ids: The poll's option IDs, one column each.
+        votes: The poll's votes, e.g. from ``PollRepository.iter_votes``.
+        chunk_size: Ballot rows buffered per write. Defaults to as many
+            as fit in CHUNK_BYTES.
+
+    Returns:
+        The number of ballots written.
+    """
+    path = Path(path)
+    rank_width = 1 if len(option_ids) < 0xFF else 2
+    dtype = _rank_dtype(rank_width)
+    max_rank = np.iinfo(dtype).max
+    columns = {option_id: column for column, option_id in enumerate(option_ids)}
+    option_map = json.dumps(option_ids).encode("utf-8")
+    chunk_size = chunk_size or _chunk_rows(len(option_ids))
+
+    tmp_path = path.with_name(path.name + ".tmp")
+    ballot_count = 0
+    with open(tmp_path, "wb") as file:
+        file.write(_pack_header(option_map, rank_width, len(option_ids), 0))
+
+        buffer = np.zeros((chunk_size, len(option_ids)), dtype=dtype)
+        rows = 0
+        async for vote in votes:
+            row = buffer[rows]
+            for ranking in vote.rankings:
+                column = columns.get(ranking.option_id)
+                if column is not None:
+                    row[column] = min(ranking.rank, max_rank)
+            rows += 1
+            if rows == chunk_size:
+                file.write(buffer.tobytes())
+                ballot_count += rows
+                buffer[:] = 0
+                rows = 0
+        file.write(buffer[:rows].tobytes())
+        ballot_count += rows
+
+        file.seek(0)
+        file.write(_pack_header(option_map, rank_width, len(option_ids), ballot_count))
+        file.flush()
+        os.fsync(file.fileno())
+
+    os.replace(tmp_path, path)
+    return ballot_count
+
+
+class BallotArchive:
+    """A ballot archive opened for reading, backed by a memory map."""
+
+    def __init__(self, path: str | Path):
+        """
+        Open an archive file.
+
+        Args:
+            path: Path to the archive.
+
+        Raises:
+            ValueError: If the file is not a ballot archive.
+        """
+        self.path = Path(path)
+        with open(self.path, "rb") as file:
+            fields = _HEADER.unpack(file.read(_HEADER.size))
+            magic, version, rank_width, _, option_count, ballot_count, map_length, _ = fields
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise ValueError(f"{self.path} is not a version {FORMAT_VERSION} ballot archive")
+            self.option_ids: list[str] = json.loads(file.read(map_length))
+
+        self.rank_width = rank_width
+        self.ballot_count = ballot_count
+        offset = _HEADER.size + map_length
+        offset += -offset % 8
+
+        dtype = _rank_dtype(rank_width)
+        if ballot_count == 0:
+            self.ranks = np.zeros((0, option_count), dtype=dtype)
+        else:
+            self.ranks = np.memmap(
+                self.path,
+                dtype=dtype,
+                mode="r",
+                offset=offset,
+                shape=(ballot_count, option_count),
+            )
+
+    def chunks(self, rows: int | None = None) -> Iterator[np.ndarray]:
+        """
+        Yield the rank matrix in row slices, as views into the file.
+
+        Args:
+            rows: Ballot rows per slice. Defaults to as many as fit in
+                CHUNK_BYTES, so a tally's working copy of a slice stays
+                within budget however many options the poll has.
+        """
+        rows = rows or _chunk_rows(self.ranks.shape[1])
+        for start in range(0, self.ballot_count, rows):
+            yield self.ranks[start:start + rows]
@@ -0,0 +1,67 @@
+"""
+Packed ballot encoding for the votes collection.
+
+A packed ballot stores a vote's rankings as option indices in rank order,
+instead of a list of ``{option_id, rank}`` subdocuments. Indices point into
+the poll's ``option_index``, an append-only list of option IDs kept on the
+poll document, so indices stay valid when options are added later.
+
+Layout: one byte giving the index width (1 or 2 bytes), then one unsigned
+big-endian index per rank, starting at rank 1.
+"""
+
+import struct
+from collections.abc import Iterator
+
+
+def encode_ballot(rankings: list[dict], positions: dict[str, int]) -> bytes | None:
+    """
+    Pack a vote's rankings.
+
+    Args:
+        rankings: The ``{option_id, rank}`` rankings of the vote.
+        positions: Map of option ID to its index in the poll's option_index.
+
+    Returns:
+        The packed ballot, or None if the rankings cannot be packed
+        (ranks are not exactly 1..k, or an option is not in the index).
+    """
+    ordered = sorted(rankings, key=lambda ranking: ranking["rank"])
+    if any(ranking["rank"] != rank for rank, ranking in enumerate(ordered, start=1)):
+        return None
+
+    try:
+        indices = [positions[ranking["option_id"]] for ranking in ordered]
+    except KeyError:
+        return None
+
+    if max(indices, default=0) <= 0xFF:
+        return bytes([1, *indices])
+    if max(indices) <= 0xFFFF:
+        return b"\x02" + struct.pack(f">{len(indices)}H", *indices)
+    return None
+
+
+def iter_ballot(data: bytes) -> Iterator[int]:
+    """Yield the option indices of a packed ballot in rank order."""
+    if data[0] == 1:
+        yield from data[1:]
+    else:
+        yield from struct.unpack(f">{(len(data) - 1) // 2}H", data[1:])
+
+
+def decode_ballot(data: bytes, option_index: list[str]) -> list[dict]:
+    """
+    Unpack a ballot into ``{option_id, rank}`` rankings.
+
+    Args:
+        data: The packed ballot.
+        option_index: The poll's option_index.
+
+    Returns:
+        The rankings, in rank order.
+    """
+    return [
+        {"option_id": option_index[index], "rank": rank}
+        for rank, index in enumerate(iter_ballot(data), start=1)
+    ]
@@ -5,14 +5,20 @@ Abstract base repository defining the interface for data access.
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from typing import Generic, TypeVar
+from typing import TYPE_CHECKING, Generic, TypeVar
 
-from motor.motor_asyncio import AsyncIOMotorDatabase
 from pydantic import BaseModel
 
+if TYPE_CHECKING:
+    from motor.motor_asyncio import AsyncIOMotorDatabase
+
 T = TypeVar("T", bound=BaseModel)
 
 
+class DuplicateVoteError(Exception):
+    """The voter has already voted in the poll."""
+
+
 class BaseRepository(ABC, Generic[T]):
     """
     Abstract base class for all repositories.
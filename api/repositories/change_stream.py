@@ -0,0 +1,135 @@
+"""
+MongoDB change stream watcher for cross-worker cache invalidation.
+
+Every worker process runs its own watcher, since every worker keeps its
+own caches. Changes to polls, users and votes are published to the
+caches registered in ``core.cache``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import OperationFailure, PyMongoError
+
+from core.cache import invalidate_all, publish_invalidation, set_stream_live
+
+logger = logging.getLogger(__name__)
+
+# Watched collection -> cache collection its changes invalidate. Vote
+# caches are keyed by poll ID; bucketed votes are seen through voters.
+WATCHED_COLLECTIONS = {
+    "polls": "polls",
+    "users": "users",
+    "votes": "votes",
+    "voters": "votes",
+}
+
+# Server error codes meaning change streams are unavailable, e.g. on a
+# standalone server (40573) or with an unsupported storage engine (40324)
+_UNSUPPORTED_CODES = {40573, 40324}
+# The resume token fell off the oplog, so events were lost (286)
+_HISTORY_LOST_CODES = {286}
+
+
+class ChangeStreamWatcher:
+    """
+    Background task publishing database changes as cache invalidations.
+
+    The stream is resumed from the last seen event after errors, so no
+    invalidation is lost across reconnects. When it can't be resumed,
+    every cache is cleared before watching again. While the stream is
+    down, caches fall back to short TTLs (see ``core.cache``).
+    """
+
+    def __init__(self, database: AsyncIOMotorDatabase, retry_seconds: float = 5.0):
+        """
+        Initialize the watcher.
+
+        Args:
+            database: The MongoDB database to watch.
+            retry_seconds: Delay before reopening a failed stream.
+                Standalone servers are retried at 60x this delay.
+        """
+        self.database = database
+        self.retry_seconds = retry_seconds
+        self.resume_token: dict | None = None
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """Start the watcher on the running event loop."""
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the watcher."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        set_stream_live(False)
+
+    async def _run(self) -> None:
+        pipeline = [
+            {"$match": {"$or": [
+                {"ns.coll": {"$in": list(WATCHED_COLLECTIONS)}},
+                # Database-wide events: dropDatabase, invalidate
+                {"ns.coll": {"$exists": False}},
+            ]}},
+            {"$project": {
+                "ns.coll": 1,
+                "operationType": 1,
+                "documentKey": 1,
+                "fullDocument.poll_id": 1,
+            }},
+        ]
+        while True:
+            delay = self.retry_seconds
+            try:
+                async with self.database.watch(
+                    pipeline,
+                    resume_after=self.resume_token,
+                ) as stream:
+                    if self.resume_token is None:
+                        # Nothing to resume from: changes may have been missed
+                        invalidate_all()
+                    set_stream_live(True)
+                    async for change in stream:
+                        self._publish(change)
+                        if change["operationType"] == "invalidate":
+                            # The stream ends here and can't be resumed
+                            self.resume_token = None
+                        else:
+                            self.resume_token = stream.resume_token
+            except OperationFailure as exc:
+                if exc.code in _UNSUPPORTED_CODES:
+                    logger.info("Change streams unavailable, caches use the fallback TTL")
+                    delay = self.retry_seconds * 60
+                elif exc.code in _HISTORY_LOST_CODES:
+                    logger.warning("Change stream history lost, restarting without resume")
+                    self.resume_token = None
+                else:
+                    logger.exception("Change stream failed")
+            except PyMongoError:
+                logger.exception("Change stream failed")
+            set_stream_live(False)
+            await asyncio.sleep(delay)
+
+    def _publish(self, change: dict) -> None:
+        """Publish one change event to the registered caches."""
+        operation = change["operationType"]
+        if operation in ("drop", "rename", "dropDatabase", "invalidate"):
+            invalidate_all()
+            return
+
+        cache_collection = WATCHED_COLLECTIONS.get(change["ns"]["coll"])
+        if cache_collection == "votes":
+            # Only inserts carry the poll ID; clear vote caches otherwise
+            key = (change.get("fullDocument") or {}).get("poll_id")
+        else:
+            key = str(change["documentKey"]["_id"])
+        publish_invalidation(cache_collection, key)
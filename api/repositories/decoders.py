@@ -0,0 +1,63 @@
+"""
+Document decoders - Convert stored documents into database models.
+
+Decoding a large result set allocates a few small objects per document, and
+most of the cost on big polls is the cyclic garbage collector repeatedly
+scanning the growing list of decoded models. Decoded models never form
+reference cycles, so batch decodes run with the collector paused.
+"""
+
+import gc
+from collections.abc import Callable, Iterable
+from contextlib import contextmanager
+from typing import Iterator, TypeVar
+
+from models.auth import UserInDB
+from models.polls import PollInDB, VoteInDB
+
+T = TypeVar("T")
+
+
+@contextmanager
+def gc_paused() -> Iterator[None]:
+    """Pause cyclic garbage collection for the duration of the block."""
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
+def decode_many(decode: Callable[[dict], T], docs: Iterable[dict]) -> list[T]:
+    """
+    Decode a batch of documents with garbage collection paused.
+
+    Args:
+        decode: The per-document decoder.
+        docs: The raw documents.
+
+    Returns:
+        The decoded models, in order.
+    """
+    with gc_paused():
+        return [decode(doc) for doc in docs]
+
+
+def decode_poll(doc: dict) -> PollInDB:
+    """Convert a poll document to a PollInDB model."""
+    doc["id"] = str(doc.pop("_id"))
+    return PollInDB.model_validate(doc)
+
+
+def decode_vote(doc: dict) -> VoteInDB:
+    """Convert a vote document to a VoteInDB model."""
+    doc["id"] = str(doc.pop("_id"))
+    return VoteInDB.model_validate(doc)
+
+
+def decode_user(doc: dict) -> UserInDB:
+    """Convert a user document to a UserInDB model."""
+    doc["id"] = str(doc.pop("_id"))
+    return UserInDB.model_validate(doc)
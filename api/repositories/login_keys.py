@@ -0,0 +1,53 @@
+"""
+Login keys - The normalized email and username a user logs in with.
+
+Shared by every user repository backend; kept apart from the MongoDB
+repository so the others don't import pymongo.
+"""
+
+import logging
+
+from models.auth import UserInDB
+
+logger = logging.getLogger(__name__)
+
+
+class DuplicateUserError(Exception):
+    """A user with the same email or username already exists."""
+
+    def __init__(self, field: str):
+        """
+        Args:
+            field: The conflicting field, "email" or "username".
+        """
+        super().__init__(f"Duplicate {field}")
+        self.field = field
+
+
+def login_keys(entity: UserInDB) -> list[str]:
+    """The normalized keys a user can log in with: email and username."""
+    return list(dict.fromkeys([entity.email.lower(), entity.username.lower()]))
+
+
+def conflicting_field(entity: UserInDB, key: str | None) -> str:
+    """The field of a user whose login key collided with another user's."""
+    return "username" if key == entity.username.lower() else "email"
+
+
+def log_login_conflicts(conflicts: dict[str, list[str]]) -> None:
+    """
+    Warn about login keys shared by users created before login keys.
+
+    Args:
+        conflicts: Map of login key to the IDs of the users sharing it,
+            the user holding the key first.
+    """
+    for key, user_ids in conflicts.items():
+        logger.warning(
+            "Users %s have emails or usernames differing only by case (%r). "
+            "Only %s logs in with any capitalization, the others with their "
+            "exact spelling. Change the email or username of all but one.",
+            ", ".join(user_ids),
+            key,
+            user_ids[0],
+        )
@@ -0,0 +1,461 @@
+"""
+In-memory repositories for tests and benchmarks.
+
+These mirror PollRepository and UserRepository on top of a MemoryDatabase,
+so the service and router layers can run without a MongoDB server.
+Secondary indexes are plain dicts maintained on every write.
+"""
+
+from __future__ import annotations
+
+from collections.abc import AsyncIterator
+from datetime import datetime, timedelta
+from itertools import islice
+
+from bson import ObjectId
+
+from core.cache import publish_invalidation
+from core.database import MemoryDatabase
+from models.auth import UserInDB
+from models.polls import PollArchive, PollInDB, PollResults, PollStatus, VoteInDB
+
+from .base import BaseRepository, DuplicateVoteError
+from .decoders import decode_many, decode_poll, decode_user, decode_vote
+from .login_keys import DuplicateUserError, conflicting_field, login_keys
+
+
+def _matches(doc: dict, filters: dict | None) -> bool:
+    """Check a document against a filter of field equality conditions."""
+    if not filters:
+        return True
+    return all(doc.get(field) == value for field, value in filters.items())
+
+
+class MemoryPollRepository(BaseRepository[PollInDB]):
+    """In-memory repository for poll CRUD operations."""
+
+    def __init__(self, database: MemoryDatabase):
+        super().__init__(database, "polls")
+        self.votes_collection = database["votes"]
+        self.leases_collection = database["leases"]
+
+        # owner_id / status -> {poll_id: None}, kept in insertion order
+        self._by_owner = self.collection.index("owner_id")
+        self._by_status = self.collection.index("status")
+        # poll_id -> {user_id: vote_id}
+        self._votes_by_poll = self.votes_collection.index("poll_id")
+
+    async def ensure_indexes(self) -> None:
+        """Indexes are plain dicts kept up to date on every write."""
+
+    async def preload_open_polls(self, limit: int = 1000) -> int:
+        """Nothing is cached per process; documents are already in memory."""
+        return 0
+
+    def _doc_to_poll(self, poll_id: str, doc: dict) -> PollInDB:
+        """Convert a stored document to a PollInDB model."""
+        return decode_poll({**doc, "_id": poll_id})
+
+    def _doc_to_vote(self, vote_id: str, doc: dict) -> VoteInDB:
+        """Convert a stored document to a VoteInDB model."""
+        return decode_vote({**doc, "_id": vote_id})
+
+    def _index_poll(self, poll_id: str, doc: dict) -> None:
+        self._by_owner.setdefault(doc["owner_id"], {})[poll_id] = None
+        self._by_status.setdefault(doc["status"], {})[poll_id] = None
+
+    def _unindex_poll(self, poll_id: str, doc: dict) -> None:
+        self._by_owner.get(doc["owner_id"], {}).pop(poll_id, None)
+        self._by_status.get(doc["status"], {}).pop(poll_id, None)
+
+    def _select(self, poll_ids, skip: int, limit: int) -> list[PollInDB]:
+        """Decode a page of polls from an iterable of IDs."""
+        page = islice(poll_ids, skip, skip + limit)
+        documents = self.collection.documents
+        return decode_many(
+            lambda poll_id: self._doc_to_poll(poll_id, documents[poll_id]),
+            page,
+        )
+
+    async def create(self, entity: PollInDB) -> PollInDB:
+        """Create a new poll."""
+        doc = entity.model_dump(exclude={"id"})
+        doc["status"] = entity.status.value
+        poll_id = str(ObjectId())
+        self.collection.documents[poll_id] = doc
+        self._index_poll(poll_id, doc)
+        entity.id = poll_id
+        return entity
+
+    async def get_by_id(self, entity_id: str) -> PollInDB | None:
+        """Get a poll by its ID."""
+        doc = self.collection.documents.get(entity_id)
+        if doc is None:
+            return None
+        return self._doc_to_poll(entity_id, doc)
+
+    async def get_by_ids(self, entity_ids: list[str]) -> list[PollInDB]:
+        """Get the polls with the given IDs, in no particular order."""
+        documents = self.collection.documents
+        return decode_many(
+            lambda poll_id: self._doc_to_poll(poll_id, documents[poll_id]),
+            [entity_id for entity_id in entity_ids if entity_id in documents],
+        )
+
+    async def update(self, entity_id: str, entity: PollInDB) -> PollInDB | None:
+        """Update an existing poll."""
+        doc = self.collection.documents.get(entity_id)
+        if doc is None:
+            return None
+        self._unindex_poll(entity_id, doc)
+        doc.update(entity.model_dump(exclude={"id", "revision"}))
+        doc["status"] = entity.status.value
+        doc["revision"] += 1
+        self._index_poll(entity_id, doc)
+        return self._doc_to_poll(entity_id, doc)
+
+    async def delete(self, entity_id: str) -> bool:
+        """Delete a poll by its ID."""
+        doc = self.collection.documents.pop(entity_id, None)
+        if doc is None:
+            return False
+        self._unindex_poll(entity_id, doc)
+        return True
+
+    async def list(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        filters: dict | None = None,
+    ) -> list[PollInDB]:
+        """List polls with pagination. Filters are field equality conditions."""
+        poll_ids = (
+            poll_id
+            for poll_id, doc in self.collection.documents.items()
+            if _matches(doc, filters)
+        )
+        return self._select(poll_ids, skip, limit)
+
+    async def get_by_owner(
+        self,
+        owner_id: str,
+        skip: int = 0,
+        limit: int = 100,
+    ) -> list[PollInDB]:
+        """Get all polls owned by a specific user."""
+        return self._select(self._by_owner.get(owner_id, {}), skip, limit)
+
+    async def get_open_polls(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+    ) -> list[PollInDB]:
+        """Get all currently open polls."""
+        return self._select(self._by_status.get(PollStatus.OPEN.value, {}), skip, limit)
+
+    async def update_status(
+        self,
+        poll_id: str,
+        status: PollStatus,
+        expected: PollStatus | None = None,
+    ) -> PollInDB | None:
+        """Update a poll's status, if it currently has the expected status."""
+        doc = self.collection.documents.get(poll_id)
+        if doc is None:
+            return None
+        if expected is not None and doc["status"] != expected.value:
+            return None
+        self._unindex_poll(poll_id, doc)
+        doc["status"] = status.value
+        doc["revision"] += 1
+        self._index_poll(poll_id, doc)
+        return self._doc_to_poll(poll_id, doc)
+
+    async def get_polls_closing_before(
+        self,
+        before: datetime,
+        limit: int = 1000,
+    ) -> list[PollInDB]:
+        """Get open polls whose closes_at is at or before a time, soonest first."""
+        documents = self.collection.documents
+        due = sorted(
+            (
+                (documents[poll_id]["closes_at"], poll_id)
+                for poll_id in self._by_status.get(PollStatus.OPEN.value, {})
+                if documents[poll_id]["closes_at"] is not None
+                and documents[poll_id]["closes_at"] <= before
+            ),
+        )
+        return self._select((poll_id for _, poll_id in due), 0, limit)
+
+    async def set_archive(self, poll_id: str, archive: PollArchive | None) -> None:
+        """Record (or clear) the ballot archive of a poll."""
+        doc = self.collection.documents.get(poll_id)
+        if doc is not None:
+            doc["archive"] = archive.model_dump() if archive else None
+
+    async def set_results(self, poll_id: str, results: PollResults | None) -> None:
+        """Store (or clear) the precomputed results of a poll."""
+        doc = self.collection.documents.get(poll_id)
+        if doc is not None:
+            doc["results"] = results.model_dump() if results else None
+            doc["revision"] += 1
+
+    async def acquire_lease(self, name: str, holder: str, ttl_seconds: float) -> bool:
+        """Acquire or renew a named lease."""
+        now = datetime.utcnow()
+        lease = self.leases_collection.documents.get(name)
+        if lease is not None and lease["holder"] != holder and lease["expires_at"] > now:
+            return False
+        self.leases_collection.documents[name] = {
+            "holder": holder,
+            "expires_at": now + timedelta(seconds=ttl_seconds),
+        }
+        return True
+
+    async def release_lease(self, name: str, holder: str) -> None:
+        """Release a lease if the caller holds it."""
+        lease = self.leases_collection.documents.get(name)
+        if lease is not None and lease["holder"] == holder:
+            del self.leases_collection.documents[name]
+
+    # --- Vote Operations ---
+
+    async def create_vote(self, vote: VoteInDB) -> VoteInDB:
+        """
+        Create a new vote for a poll.
+
+        Raises:
+            DuplicateVoteError: If the voter has already voted in the poll.
+        """
+        voters = self._votes_by_poll.setdefault(vote.poll_id, {})
+        if vote.user_id in voters:
+            raise DuplicateVoteError()
+        doc = vote.model_dump(exclude={"id"})
+        vote_id = str(ObjectId())
+        self.votes_collection.documents[vote_id] = doc
+        voters[vote.user_id] = vote_id
+        poll = self.collection.documents.get(vote.poll_id)
+        if poll is not None:
+            poll["revision"] += 1
+        vote.id = vote_id
+        return vote
+
+    async def create_votes(self, votes: list[VoteInDB]) -> None:
+        """
+        Insert a batch of votes for one poll, in order.
+
+        Raises:
+            DuplicateVoteError: If a voter has already voted in the poll;
+                the votes before theirs are stored.
+        """
+        for vote in votes:
+            await self.create_vote(vote)
+
+    async def count_votes_by_voter_prefix(self, poll_id: str, prefix: str) -> int:
+        """Count a poll's votes whose voter ID starts with prefix."""
+        return sum(
+            1 for user_id in self._votes_by_poll.get(poll_id, {})
+            if user_id.startswith(prefix)
+        )
+
+    async def get_vote(self, poll_id: str, user_id: str) -> VoteInDB | None:
+        """Get a user's vote for a specific poll."""
+        vote_id = self._votes_by_poll.get(poll_id, {}).get(user_id)
+        if vote_id is None:
+            return None
+        return self._doc_to_vote(vote_id, self.votes_collection.documents[vote_id])
+
+    async def get_votes_for_poll(self, poll_id: str) -> list[VoteInDB]:
+        """Get all votes for a specific poll."""
+        documents = self.votes_collection.documents
+        return decode_many(
+            lambda vote_id: self._doc_to_vote(vote_id, documents[vote_id]),
+            self._votes_by_poll.get(poll_id, {}).values(),
+        )
+
+    async def iter_votes(
+        self,
+        poll_id: str,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[VoteInDB]:
+        """Stream all votes for a poll."""
+        documents = self.votes_collection.documents
+        for vote_id in list(self._votes_by_poll.get(poll_id, {}).values()):
+            if vote_id in documents:
+                yield self._doc_to_vote(vote_id, documents[vote_id])
+
+    async def delete_votes(self, poll_id: str) -> int:
+        """Delete every vote of a poll, returning how many were deleted."""
+        vote_ids = self._votes_by_poll.pop(poll_id, {}).values()
+        for vote_id in vote_ids:
+            self.votes_collection.documents.pop(vote_id, None)
+        return len(vote_ids)
+
+    async def count_votes(self, poll_id: str) -> int:
+        """Count the total number of votes for a poll."""
+        return len(self._votes_by_poll.get(poll_id, {}))
+
+    async def count_votes_many(self, poll_ids: list[str]) -> dict[str, int]:
+        """Count the votes of several polls, omitting polls without votes."""
+        return {
+            poll_id: len(self._votes_by_poll[poll_id])
+            for poll_id in poll_ids
+            if self._votes_by_poll.get(poll_id)
+        }
+
+    async def get_borda_scores(
+        self,
+        poll_id: str,
+        option_ids: list[str],
+    ) -> dict[str, float]:
+        """Sum Borda points (n - rank + 1) per option for a poll."""
+        n_options = len(option_ids)
+        scores = {option_id: 0.0 for option_id in option_ids}
+        documents = self.votes_collection.documents
+        for vote_id in self._votes_by_poll.get(poll_id, {}).values():
+            for ranking in documents[vote_id]["rankings"]:
+                if ranking["option_id"] in scores:
+                    scores[ranking["option_id"]] += n_options - ranking["rank"] + 1
+        return scores
+
+
+class MemoryUserRepository(BaseRepository[UserInDB]):
+    """In-memory repository for user CRUD operations."""
+
+    def __init__(self, database: MemoryDatabase):
+        super().__init__(database, "users")
+
+        # email / username / login key -> user_id
+        self._by_email = self.collection.index("email")
+        self._by_username = self.collection.index("username")
+        self._by_login = self.collection.index("login_keys")
+
+    async def ensure_indexes(self) -> None:
+        """Indexes are plain dicts kept up to date on every write."""
+
+    async def get_login_conflicts(self) -> dict[str, list[str]]:
+        """In-memory users always had login keys, so none are shared."""
+        return {}
+
+    def _doc_to_model(self, user_id: str, doc: dict) -> UserInDB:
+        """Convert a stored document to a UserInDB model."""
+        return decode_user({**doc, "_id": user_id})
+
+    def _check_login_keys(self, user_id: str | None, entity: UserInDB) -> list[str]:
+        """Get a user's login keys, raising if another user holds one."""
+        keys = login_keys(entity)
+        for key in keys:
+            if self._by_login.get(key, user_id) != user_id:
+                raise DuplicateUserError(conflicting_field(entity, key))
+        return keys
+
+    def _index_user(self, user_id: str, doc: dict) -> None:
+        self._by_email[doc["email"]] = user_id
+        self._by_username[doc["username"]] = user_id
+        for key in doc["login_keys"]:
+            self._by_login[key] = user_id
+
+    def _unindex_user(self, doc: dict) -> None:
+        self._by_email.pop(doc["email"], None)
+        self._by_username.pop(doc["username"], None)
+        for key in doc["login_keys"]:
+            self._by_login.pop(key, None)
+
+    def _lookup(self, index: dict, key: str) -> UserInDB | None:
+        user_id = index.get(key)
+        if user_id is None:
+            return None
+        return self._doc_to_model(user_id, self.collection.documents[user_id])
+
+    async def create(self, entity: UserInDB) -> UserInDB:
+        """
+        Create a new user.
+
+        Raises:
+            DuplicateUserError: If the email or username is taken.
+        """
+        doc = entity.model_dump(exclude={"id"})
+        doc["login_keys"] = self._check_login_keys(None, entity)
+        user_id = str(ObjectId())
+        self.collection.documents[user_id] = doc
+        self._index_user(user_id, doc)
+        entity.id = user_id
+        return entity
+
+    async def get_by_id(self, entity_id: str) -> UserInDB | None:
+        """Get a user by their ID."""
+        doc = self.collection.documents.get(entity_id)
+        if doc is None:
+            return None
+        return self._doc_to_model(entity_id, doc)
+
+    async def get_by_email(self, email: str) -> UserInDB | None:
+        """Get a user by their email address."""
+        return self._lookup(self._by_email, email)
+
+    async def get_by_username(self, username: str) -> UserInDB | None:
+        """Get a user by their username."""
+        return self._lookup(self._by_username, username)
+
+    async def get_by_login(self, identifier: str) -> UserInDB | None:
+        """Get a user by their email or username, ignoring case."""
+        return self._lookup(self._by_login, identifier.lower())
+
+    async def set_password_hash(self, entity_id: str, hashed_password: str) -> None:
+        """Replace a user's password hash, e.g. after a bcrypt cost change."""
+        doc = self.collection.documents.get(entity_id)
+        if doc is not None:
+            doc["hashed_password"] = hashed_password
+
+    async def get_inactive_ids(self) -> list[str]:
+        """Get the IDs of all deactivated users."""
+        return [
+            user_id
+            for user_id, doc in self.collection.documents.items()
+            if not doc["is_active"]
+        ]
+
+    async def update(self, entity_id: str, entity: UserInDB) -> UserInDB | None:
+        """
+        Update an existing user.
+
+        Raises:
+            DuplicateUserError: If the new email or username is taken.
+        """
+        doc = self.collection.documents.get(entity_id)
+        if doc is None:
+            return None
+        keys = self._check_login_keys(entity_id, entity)
+        self._unindex_user(doc)
+        doc.update(entity.model_dump(exclude={"id"}), login_keys=keys)
+        self._index_user(entity_id, doc)
+        publish_invalidation("users", entity_id)
+        return self._doc_to_model(entity_id, doc)
+
+    async def delete(self, entity_id: str) -> bool:
+        """Delete a user by their ID."""
+        doc = self.collection.documents.pop(entity_id, None)
+        if doc is None:
+            return False
+        self._unindex_user(doc)
+        publish_invalidation("users", entity_id)
+        return True
+
+    async def list(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        filters: dict | None = None,
+    ) -> list[UserInDB]:
+        """List users with pagination. Filters are field equality conditions."""
+        documents = self.collection.documents
+        user_ids = islice(
+            (user_id for user_id, doc in documents.items() if _matches(doc, filters)),
+            skip,
+            skip + limit,
+        )
+        return decode_many(
+            lambda user_id: self._doc_to_model(user_id, documents[user_id]),
+            user_ids,
+        )
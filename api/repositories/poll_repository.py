@@ -4,35 +4,169 @@ Repository for poll and vote data access.
 
 from __future__ import annotations
 
-from bson import ObjectId
-from motor.motor_asyncio import AsyncIOMotorDatabase
-from pymongo import ReturnDocument
+import logging
+import re
+from collections.abc import AsyncIterator
+from datetime import datetime, timedelta
 
-from models.polls import PollInDB, PollStatus, VoteInDB
+from bson import Binary, ObjectId
+from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorDatabase
+from pymongo import ASCENDING, IndexModel, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
 
-from .base import BaseRepository
+from models.polls import PollArchive, PollInDB, PollResults, PollStatus, VoteInDB
+
+from .ballots import decode_ballot, encode_ballot, iter_ballot
+from .base import BaseRepository, DuplicateVoteError
+from .decoders import decode_many, decode_poll, decode_vote
+
+logger = logging.getLogger(__name__)
+
+# Name of the votes (poll_id, user_id) index, unique since bulk imports
+_VOTES_VOTER_INDEX = "poll_id_1_user_id_1"
+
+# Option indices never change once assigned, so they are cached per process
+_OPTION_INDEX_CACHE: dict[str, list[str]] = {}
+_OPTION_INDEX_CACHE_SIZE = 10_000
+
+
+def _cache_option_index(poll_id: str, option_index: list[str]) -> None:
+    if len(_OPTION_INDEX_CACHE) >= _OPTION_INDEX_CACHE_SIZE:
+        _OPTION_INDEX_CACHE.pop(next(iter(_OPTION_INDEX_CACHE)))
+    _OPTION_INDEX_CACHE[poll_id] = option_index
 
 
 class PollRepository(BaseRepository[PollInDB]):
     """Repository for poll CRUD operations."""
 
-    def __init__(self, database: AsyncIOMotorDatabase):
+    def __init__(
+        self,
+        database: AsyncIOMotorDatabase,
+        packed_ballots: bool = False,
+        vote_bucket_size: int = 0,
+    ):
+        """
+        Initialize the repository.
+
+        Args:
+            database: The MongoDB database instance.
+            packed_ballots: Store new votes as packed ballots instead of
+                rankings subdocuments. Both formats are always readable.
+            vote_bucket_size: Store new votes in bucket documents of up to
+                this many ballots per poll. 0 stores one document per vote.
+        """
         super().__init__(database, "polls")
         self.votes_collection = database["votes"]
+        self.buckets_collection = database["vote_buckets"]
+        self.voters_collection = database["voters"]
+        self.leases_collection = database["leases"]
+        self.packed_ballots = packed_ballots
+        self.vote_bucket_size = vote_bucket_size
+
+    async def ensure_indexes(self) -> None:
+        """Create the indexes the poll scheduler and vote storage rely on."""
+        await self.collection.create_indexes([
+            IndexModel([("status", ASCENDING), ("closes_at", ASCENDING)]),
+        ])
+        await self._ensure_unique_voter_index()
+        if self.vote_bucket_size:
+            await self.buckets_collection.create_indexes([
+                IndexModel([("poll_id", ASCENDING), ("count", ASCENDING)]),
+            ])
+            await self.voters_collection.create_indexes([
+                IndexModel([("poll_id", ASCENDING), ("user_id", ASCENDING)], unique=True),
+            ])
 
     def _doc_to_poll(self, doc: dict) -> PollInDB:
         """Convert MongoDB document to PollInDB model."""
-        doc["id"] = str(doc.pop("_id"))
-        return PollInDB(**doc)
+        return decode_poll(doc)
+
+    def _doc_to_vote(self, doc: dict, option_index: list[str] | None = None) -> VoteInDB:
+        """Convert MongoDB document to VoteInDB model, unpacking packed ballots."""
+        if "ballot" in doc:
+            doc["rankings"] = decode_ballot(doc.pop("ballot"), option_index)
+        return decode_vote(doc)
+
+    async def _get_option_index(self, poll_id: str, refresh: bool = False) -> list[str]:
+        """
+        Get a poll's option_index, assigning it first for older polls.
+
+        Args:
+            poll_id: The poll's ID.
+            refresh: Bypass the process cache, e.g. after options were added.
 
-    def _doc_to_vote(self, doc: dict) -> VoteInDB:
-        """Convert MongoDB document to VoteInDB model."""
-        doc["id"] = str(doc.pop("_id"))
-        return VoteInDB(**doc)
+        Returns:
+            The option IDs in index order, or an empty list if the poll is gone.
+        """
+        option_index = None if refresh else _OPTION_INDEX_CACHE.get(poll_id)
+        if option_index is not None:
+            return option_index
+
+        doc = await self.collection.find_one(
+            {"_id": ObjectId(poll_id)},
+            {"option_index": 1},
+        )
+        if doc is None:
+            return []
+        if "option_index" not in doc:
+            doc = await self.collection.find_one_and_update(
+                {"_id": ObjectId(poll_id)},
+                [{"$set": {"option_index": {"$ifNull": ["$option_index", "$options.id"]}}}],
+                projection={"option_index": 1},
+                return_document=ReturnDocument.AFTER,
+            )
+
+        _cache_option_index(poll_id, doc["option_index"])
+        return doc["option_index"]
+
+    async def preload_open_polls(self, limit: int = 1000) -> int:
+        """
+        Load the option indices of open polls into the process cache.
+
+        Args:
+            limit: Maximum number of polls to load.
+
+        Returns:
+            The number of polls loaded.
+        """
+        cursor = self.collection.find(
+            {"status": PollStatus.OPEN.value, "option_index": {"$exists": True}},
+            {"option_index": 1},
+        ).limit(limit)
+        loaded = 0
+        async for doc in cursor:
+            _cache_option_index(str(doc["_id"]), doc["option_index"])
+            loaded += 1
+        return loaded
+
+    async def _pack(self, poll_id: str, rankings: list[dict]) -> Binary | None:
+        """Pack rankings against the poll's option_index, if possible."""
+        option_index = await self._get_option_index(poll_id)
+        positions = {option_id: index for index, option_id in enumerate(option_index)}
+        if any(ranking["option_id"] not in positions for ranking in rankings):
+            option_index = await self._get_option_index(poll_id, refresh=True)
+            positions = {option_id: index for index, option_id in enumerate(option_index)}
+
+        ballot = encode_ballot(rankings, positions)
+        return Binary(ballot) if ballot is not None else None
+
+    async def _decode_votes(self, poll_id: str, docs: list[dict]) -> list[VoteInDB]:
+        """Decode vote documents of one poll, in either storage format."""
+        if not any("ballot" in doc for doc in docs):
+            return decode_many(self._doc_to_vote, docs)
+
+        option_index = await self._get_option_index(poll_id)
+        highest = max(
+            max(iter_ballot(doc["ballot"]), default=0) for doc in docs if "ballot" in doc
+        )
+        if highest >= len(option_index):
+            option_index = await self._get_option_index(poll_id, refresh=True)
+        return decode_many(lambda doc: self._doc_to_vote(doc, option_index), docs)
 
     async def create(self, entity: PollInDB) -> PollInDB:
         """Create a new poll."""
         doc = entity.model_dump(exclude={"id"})
+        doc["option_index"] = [option.id for option in entity.options]
         result = await self.collection.insert_one(doc)
         entity.id = str(result.inserted_id)
         return entity
@@ -44,12 +178,28 @@ class PollRepository(BaseRepository[PollInDB]):
             return None
         return self._doc_to_poll(doc)
 
+    async def get_by_ids(self, entity_ids: list[str]) -> list[PollInDB]:
+        """Get the polls with the given IDs, in no particular order."""
+        object_ids = [ObjectId(entity_id) for entity_id in entity_ids if ObjectId.is_valid(entity_id)]
+        if not object_ids:
+            return []
+        cursor = self.collection.find({"_id": {"$in": object_ids}})
+        docs = await cursor.to_list(length=len(object_ids))
+        return decode_many(self._doc_to_poll, docs)
+
     async def update(self, entity_id: str, entity: PollInDB) -> PollInDB | None:
         """Update an existing poll."""
-        doc = entity.model_dump(exclude={"id"})
+        doc = entity.model_dump(exclude={"id", "revision"})
         result = await self.collection.find_one_and_update(
             {"_id": ObjectId(entity_id)},
-            {"$set": doc},
+            {
+                "$set": doc,
+                "$inc": {"revision": 1},
+                # Append new options; existing indices must never move
+                "$addToSet": {
+                    "option_index": {"$each": [option.id for option in entity.options]},
+                },
+            },
             return_document=ReturnDocument.AFTER,
         )
         if result is None:
@@ -70,7 +220,7 @@ class PollRepository(BaseRepository[PollInDB]):
         """List polls with pagination."""
         cursor = self.collection.find(filters or {}).skip(skip).limit(limit)
         docs = await cursor.to_list(length=limit)
-        return [self._doc_to_poll(doc) for doc in docs]
+        return decode_many(self._doc_to_poll, docs)
 
     async def get_by_owner(
         self,
@@ -81,7 +231,7 @@ class PollRepository(BaseRepository[PollInDB]):
         """Get all polls owned by a specific user."""
         cursor = self.collection.find({"owner_id": owner_id}).skip(skip).limit(limit)
         docs = await cursor.to_list(length=limit)
-        return [self._doc_to_poll(doc) for doc in docs]
+        return decode_many(self._doc_to_poll, docs)
 
     async def get_open_polls(
         self,
@@ -91,48 +241,492 @@ class PollRepository(BaseRepository[PollInDB]):
         """Get all currently open polls."""
         cursor = self.collection.find({"status": PollStatus.OPEN.value}).skip(skip).limit(limit)
         docs = await cursor.to_list(length=limit)
-        return [self._doc_to_poll(doc) for doc in docs]
+        return decode_many(self._doc_to_poll, docs)
 
     async def update_status(
         self,
         poll_id: str,
         status: PollStatus,
+        expected: PollStatus | None = None,
     ) -> PollInDB | None:
-        """Update a poll's status."""
+        """
+        Update a poll's status.
+
+        Args:
+            poll_id: The poll's ID.
+            status: The new status.
+            expected: Only update if the poll currently has this status.
+
+        Returns:
+            The updated poll, or None if not found or not in the expected status.
+        """
+        query = {"_id": ObjectId(poll_id)}
+        if expected is not None:
+            query["status"] = expected.value
         result = await self.collection.find_one_and_update(
-            {"_id": ObjectId(poll_id)},
-            {"$set": {"status": status.value}},
+            query,
+            {"$set": {"status": status.value}, "$inc": {"revision": 1}},
             return_document=ReturnDocument.AFTER,
         )
         if result is None:
             return None
         return self._doc_to_poll(result)
 
+    async def get_polls_closing_before(
+        self,
+        before: datetime,
+        limit: int = 1000,
+    ) -> list[PollInDB]:
+        """Get open polls whose closes_at is at or before a time, soonest first."""
+        cursor = (
+            self.collection.find({
+                "status": PollStatus.OPEN.value,
+                "closes_at": {"$ne": None, "$lte": before},
+            })
+            .sort("closes_at", ASCENDING)
+            .limit(limit)
+        )
+        docs = await cursor.to_list(length=limit)
+        return decode_many(self._doc_to_poll, docs)
+
+    async def set_results(self, poll_id: str, results: PollResults | None) -> None:
+        """Store (or clear) the precomputed results of a poll."""
+        await self.collection.update_one(
+            {"_id": ObjectId(poll_id)},
+            {
+                "$set": {"results": results.model_dump() if results else None},
+                "$inc": {"revision": 1},
+            },
+        )
+
+    async def acquire_lease(self, name: str, holder: str, ttl_seconds: float) -> bool:
+        """
+        Acquire or renew a named lease shared by all workers.
+
+        Args:
+            name: The lease name.
+            holder: A unique ID for the calling process.
+            ttl_seconds: How long the lease is held unless renewed.
+
+        Returns:
+            True if the caller holds the lease.
+        """
+        now = datetime.utcnow()
+        try:
+            await self.leases_collection.find_one_and_update(
+                {
+                    "_id": name,
+                    "$or": [{"holder": holder}, {"expires_at": {"$lte": now}}],
+                },
+                {"$set": {"holder": holder, "expires_at": now + timedelta(seconds=ttl_seconds)}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            # Held by another process: the upsert collided with its document
+            return False
+        return True
+
+    async def release_lease(self, name: str, holder: str) -> None:
+        """Release a lease if the caller holds it."""
+        await self.leases_collection.delete_one({"_id": name, "holder": holder})
+
+    async def set_archive(self, poll_id: str, archive: PollArchive | None) -> None:
+        """Record (or clear) the ballot archive of a poll."""
+        await self.collection.update_one(
+            {"_id": ObjectId(poll_id)},
+            {"$set": {"archive": archive.model_dump() if archive else None}},
+        )
+
+    async def _ensure_unique_voter_index(self) -> None:
+        """
+        Create the unique votes (poll_id, user_id) index.
+
+        Databases created before it was unique have a plain index of the
+        same name. It is replaced, after deleting repeat votes (a voter's
+        votes after their first) that raced past the service's
+        already-voted check and would make the unique index fail.
+        """
+        indexes = await self.votes_collection.index_information()
+        existing = indexes.get(_VOTES_VOTER_INDEX)
+        if existing is not None and existing.get("unique"):
+            return
+
+        groups = self.votes_collection.aggregate([
+            {"$group": {
+                "_id": {"poll_id": "$poll_id", "user_id": "$user_id"},
+                "ids": {"$push": "$_id"},
+            }},
+            {"$match": {"ids.1": {"$exists": True}}},
+        ], allowDiskUse=True)
+        repeats = []
+        async for group in groups:
+            repeats.extend(sorted(group["ids"])[1:])
+            logger.warning(
+                "Deleting %d repeat votes of voter %s in poll %s",
+                len(group["ids"]) - 1,
+                group["_id"]["user_id"],
+                group["_id"]["poll_id"],
+            )
+        if repeats:
+            await self.votes_collection.delete_many({"_id": {"$in": repeats}})
+
+        if existing is not None:
+            try:
+                await self.votes_collection.drop_index(_VOTES_VOTER_INDEX)
+            except OperationFailure:
+                # Already replaced by another worker starting up
+                pass
+        await self.votes_collection.create_indexes([
+            IndexModel(
+                [("poll_id", ASCENDING), ("user_id", ASCENDING)],
+                name=_VOTES_VOTER_INDEX,
+                unique=True,
+            ),
+        ])
+
     # --- Vote Operations ---
 
+    def _vote_sources(self, poll_id: str) -> list[tuple[AsyncIOMotorCollection, list[dict]]]:
+        """
+        Aggregation sources that yield one vote document per ballot.
+
+        Per-vote documents are always read, so votes stored before bucket
+        mode was enabled stay visible. Bucketed ballots are unwound and
+        given their bucket's poll_id.
+        """
+        match = {"$match": {"poll_id": poll_id}}
+        sources = [(self.votes_collection, [match])]
+        if self.vote_bucket_size:
+            sources.append((self.buckets_collection, [
+                match,
+                {"$unwind": "$ballots"},
+                {"$replaceRoot": {
+                    "newRoot": {"$mergeObjects": ["$ballots", {"poll_id": "$poll_id"}]},
+                }},
+            ]))
+        return sources
+
     async def create_vote(self, vote: VoteInDB) -> VoteInDB:
-        """Create a new vote for a poll."""
+        """
+        Create a new vote for a poll.
+
+        In bucket mode the voter is first recorded in the voters collection,
+        whose unique index rejects a second vote, and the ballot is then
+        pushed onto a bucket of the poll that still has room. If the push
+        fails, the voter is removed again.
+
+        Raises:
+            DuplicateVoteError: If the voter has already voted in the poll.
+        """
         doc = vote.model_dump(exclude={"id"})
-        result = await self.votes_collection.insert_one(doc)
-        vote.id = str(result.inserted_id)
+        if self.packed_ballots:
+            ballot = await self._pack(vote.poll_id, doc["rankings"])
+            if ballot is not None:
+                doc["ballot"] = ballot
+                del doc["rankings"]
+
+        if not self.vote_bucket_size:
+            try:
+                result = await self.votes_collection.insert_one(doc)
+            except DuplicateKeyError as exc:
+                raise DuplicateVoteError() from exc
+            await self._bump_revision(vote.poll_id)
+            vote.id = str(result.inserted_id)
+            return vote
+
+        vote_id = ObjectId()
+        try:
+            await self.voters_collection.insert_one({
+                "_id": vote_id,
+                "poll_id": vote.poll_id,
+                "user_id": vote.user_id,
+            })
+        except DuplicateKeyError as exc:
+            raise DuplicateVoteError() from exc
+        del doc["poll_id"]
+        try:
+            bucket = await self.buckets_collection.find_one_and_update(
+                {"poll_id": vote.poll_id, "count": {"$lt": self.vote_bucket_size}},
+                {"$push": {"ballots": {"_id": vote_id, **doc}}, "$inc": {"count": 1}},
+                projection={"_id": 1},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except BaseException:
+            # Undo the voter so they can vote again, and the ballot in case
+            # the push was applied but its reply lost
+            await self.buckets_collection.update_one(
+                {"poll_id": vote.poll_id, "ballots._id": vote_id},
+                {"$pull": {"ballots": {"_id": vote_id}}, "$inc": {"count": -1}},
+            )
+            await self.voters_collection.delete_one({"_id": vote_id})
+            raise
+        # Only a hint for get_vote, which searches the poll's buckets without it
+        await self.voters_collection.update_one(
+            {"_id": vote_id},
+            {"$set": {"bucket_id": bucket["_id"]}},
+        )
+        await self._bump_revision(vote.poll_id)
+        vote.id = str(vote_id)
         return vote
 
-    async def get_vote(self, poll_id: str, user_id: str) -> VoteInDB | None:
-        """Get a user's vote for a specific poll."""
-        doc = await self.votes_collection.find_one({
+    async def create_votes(self, votes: list[VoteInDB]) -> None:
+        """
+        Insert a batch of votes for one poll, in order.
+
+        Votes are written as per-vote documents even in bucket mode (they
+        are always read), with one ordered insert_many: if it is cut short,
+        the votes stored are a prefix of the batch.
+
+        Raises:
+            DuplicateVoteError: If a voter has already voted in the poll;
+                the votes before theirs are stored.
+        """
+        if not votes:
+            return
+        docs = []
+        for vote in votes:
+            doc = vote.model_dump(exclude={"id"})
+            if self.packed_ballots:
+                ballot = await self._pack(vote.poll_id, doc["rankings"])
+                if ballot is not None:
+                    doc["ballot"] = ballot
+                    del doc["rankings"]
+            docs.append(doc)
+        try:
+            result = await self.votes_collection.insert_many(docs, ordered=True)
+        except BulkWriteError as exc:
+            if exc.details.get("nInserted"):
+                await self._bump_revision(votes[0].poll_id)
+            if any(error["code"] == 11000 for error in exc.details.get("writeErrors", [])):
+                raise DuplicateVoteError() from exc
+            raise
+        for vote, vote_id in zip(votes, result.inserted_ids):
+            vote.id = str(vote_id)
+        await self._bump_revision(votes[0].poll_id)
+
+    async def count_votes_by_voter_prefix(self, poll_id: str, prefix: str) -> int:
+        """Count a poll's votes whose voter ID starts with prefix."""
+        if not prefix:
+            return await self.count_votes(poll_id)
+        return await self.votes_collection.count_documents({
             "poll_id": poll_id,
-            "user_id": user_id,
+            "user_id": {"$regex": f"^{re.escape(prefix)}"},
         })
+
+    async def _bump_revision(self, poll_id: str) -> None:
+        """Count a change to a poll's votes in its revision."""
+        await self.collection.update_one({"_id": ObjectId(poll_id)}, {"$inc": {"revision": 1}})
+
+    async def get_vote(self, poll_id: str, user_id: str) -> VoteInDB | None:
+        """Get a user's vote for a specific poll."""
+        doc = None
+        if self.vote_bucket_size:
+            voter = await self.voters_collection.find_one({
+                "poll_id": poll_id,
+                "user_id": user_id,
+            })
+            if voter is not None:
+                bucket_filter = {"poll_id": poll_id, "ballots._id": voter["_id"]}
+                if "bucket_id" in voter:
+                    bucket_filter["_id"] = voter["bucket_id"]
+                bucket = await self.buckets_collection.find_one(
+                    bucket_filter,
+                    {"ballots": {"$elemMatch": {"_id": voter["_id"]}}},
+                )
+                if bucket is not None:
+                    doc = {**bucket["ballots"][0], "poll_id": poll_id}
+
+        if doc is None:
+            doc = await self.votes_collection.find_one({
+                "poll_id": poll_id,
+                "user_id": user_id,
+            })
         if doc is None:
             return None
-        return self._doc_to_vote(doc)
+        return (await self._decode_votes(poll_id, [doc]))[0]
 
     async def get_votes_for_poll(self, poll_id: str) -> list[VoteInDB]:
         """Get all votes for a specific poll."""
         cursor = self.votes_collection.find({"poll_id": poll_id})
         docs = await cursor.to_list(length=None)
-        return [self._doc_to_vote(doc) for doc in docs]
+
+        if self.vote_bucket_size:
+            # Whole buckets are fetched and flattened here: ballots/N documents
+            buckets = self.buckets_collection.find({"poll_id": poll_id}, {"ballots": 1})
+            async for bucket in buckets:
+                docs.extend({**ballot, "poll_id": poll_id} for ballot in bucket["ballots"])
+
+        return await self._decode_votes(poll_id, docs)
+
+    async def iter_votes(
+        self,
+        poll_id: str,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[VoteInDB]:
+        """
+        Stream all votes for a poll, decoding one cursor batch at a time.
+
+        Args:
+            poll_id: The poll's ID.
+            batch_size: Number of documents fetched and decoded per batch.
+
+        Yields:
+            The poll's votes.
+        """
+        batch: list[dict] = []
+        async for doc in self.votes_collection.find({"poll_id": poll_id}, batch_size=batch_size):
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                for vote in await self._decode_votes(poll_id, batch):
+                    yield vote
+                batch = []
+        if batch:
+            for vote in await self._decode_votes(poll_id, batch):
+                yield vote
+
+        if self.vote_bucket_size:
+            buckets = self.buckets_collection.find({"poll_id": poll_id}, {"ballots": 1})
+            async for bucket in buckets:
+                docs = [{**ballot, "poll_id": poll_id} for ballot in bucket["ballots"]]
+                for vote in await self._decode_votes(poll_id, docs):
+                    yield vote
+
+    async def delete_votes(self, poll_id: str) -> int:
+        """
+        Delete every vote of a poll.
+
+        Returns:
+            The number of votes deleted.
+        """
+        deleted = await self.count_votes(poll_id)
+        await self.votes_collection.delete_many({"poll_id": poll_id})
+        await self.buckets_collection.delete_many({"poll_id": poll_id})
+        await self.voters_collection.delete_many({"poll_id": poll_id})
+        return deleted
 
     async def count_votes(self, poll_id: str) -> int:
         """Count the total number of votes for a poll."""
-        return await self.votes_collection.count_documents({"poll_id": poll_id})
+        count = await self.votes_collection.count_documents({"poll_id": poll_id})
+        if self.vote_bucket_size:
+            cursor = self.buckets_collection.aggregate([
+                {"$match": {"poll_id": poll_id}},
+                {"$group": {"_id": None, "count": {"$sum": "$count"}}},
+            ])
+            async for row in cursor:
+                count += row["count"]
+        return count
+
+    async def count_votes_many(self, poll_ids: list[str]) -> dict[str, int]:
+        """Count the votes of several polls, omitting polls without votes."""
+        match = {"$match": {"poll_id": {"$in": poll_ids}}}
+        counts: dict[str, int] = {}
+        cursor = self.votes_collection.aggregate([
+            match,
+            {"$group": {"_id": "$poll_id", "count": {"$sum": 1}}},
+        ])
+        async for row in cursor:
+            counts[row["_id"]] = row["count"]
+        if self.vote_bucket_size:
+            cursor = self.buckets_collection.aggregate([
+                match,
+                {"$group": {"_id": "$poll_id", "count": {"$sum": "$count"}}},
+            ])
+            async for row in cursor:
+                counts[row["_id"]] = counts.get(row["_id"], 0) + row["count"]
+        return counts
+
+    async def get_borda_scores(
+        self,
+        poll_id: str,
+        option_ids: list[str],
+    ) -> dict[str, float]:
+        """
+        Sum Borda points per option for a poll.
+
+        Each ranking earns n - rank + 1 points, where n is the number of
+        options. Rankings subdocuments are summed by an aggregation on the
+        server; packed ballots are summed here from their raw bytes.
+
+        Args:
+            poll_id: The poll's ID.
+            option_ids: IDs of the poll's options.
+
+        Returns:
+            Dictionary mapping option IDs to their scores.
+        """
+        n_options = len(option_ids)
+        scores = {option_id: 0.0 for option_id in option_ids}
+        # Points per option index, from packed ballots
+        points: dict[int, int] = {}
+
+        for collection, pipeline in self._vote_sources(poll_id):
+            cursor = collection.aggregate([
+                *pipeline,
+                {"$match": {"rankings": {"$exists": True}}},
+                {"$unwind": "$rankings"},
+                {"$group": {
+                    "_id": "$rankings.option_id",
+                    "points": {"$sum": {"$subtract": [n_options + 1, "$rankings.rank"]}},
+                }},
+            ])
+            async for row in cursor:
+                if row["_id"] in scores:
+                    scores[row["_id"]] += row["points"]
+
+            packed = collection.aggregate([
+                *pipeline,
+                {"$match": {"ballot": {"$exists": True}}},
+                {"$project": {"_id": 0, "ballot": 1}},
+            ])
+            async for doc in packed:
+                for position, index in enumerate(iter_ballot(doc["ballot"])):
+                    points[index] = points.get(index, 0) + n_options - position
+
+        if points:
+            option_index = await self._get_option_index(poll_id)
+            if max(points) >= len(option_index):
+                option_index = await self._get_option_index(poll_id, refresh=True)
+            for index, total in points.items():
+                if option_index[index] in scores:
+                    scores[option_index[index]] += total
+        return scores
+
+    async def pack_votes(self, poll_id: str, batch_size: int = 1000) -> int:
+        """
+        Convert a poll's rankings-format votes to packed ballots.
+
+        Votes whose rankings cannot be packed are left as they are.
+
+        Args:
+            poll_id: The poll's ID.
+            batch_size: Number of votes converted per bulk write.
+
+        Returns:
+            The number of votes converted.
+        """
+        converted = 0
+        requests: list[UpdateOne] = []
+
+        async def flush() -> int:
+            result = await self.votes_collection.bulk_write(requests, ordered=False)
+            requests.clear()
+            return result.modified_count
+
+        cursor = self.votes_collection.find(
+            {"poll_id": poll_id, "rankings": {"$exists": True}},
+            {"rankings": 1},
+        )
+        async for doc in cursor:
+            ballot = await self._pack(poll_id, doc["rankings"])
+            if ballot is None:
+                continue
+            requests.append(UpdateOne(
+                {"_id": doc["_id"], "rankings": {"$exists": True}},
+                {"$set": {"ballot": ballot}, "$unset": {"rankings": ""}},
+            ))
+            if len(requests) >= batch_size:
+                converted += await flush()
+        if requests:
+            converted += await flush()
+        return converted
@@ -0,0 +1,736 @@
+"""
+SQLite repositories for single-node deployments.
+
+These mirror PollRepository and UserRepository on top of a SQLiteDatabase.
+Each method runs its statements on the database's thread pool; nested
+documents (poll options, vote rankings) are stored as JSON, and every
+ranked choice is also kept as a row in ``rankings`` so tallies are SQL
+aggregates.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+from collections.abc import AsyncIterator
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from core.cache import publish_invalidation
+from core.database import SQLiteDatabase
+from models.auth import UserInDB
+from models.polls import PollArchive, PollInDB, PollResults, PollStatus, VoteInDB
+
+from .base import BaseRepository, DuplicateVoteError
+from .decoders import decode_many, decode_poll, decode_user, decode_vote
+from .login_keys import DuplicateUserError, conflicting_field, log_login_conflicts, login_keys
+
+_POLL_COLUMNS = (
+    "id, title, description, options, status, owner_id, created_at, closes_at, archive, results, "
+    "revision"
+)
+_VOTE_COLUMNS = "id, poll_id, user_id, rankings, submitted_at"
+_USER_COLUMNS = "id, email, username, hashed_password, created_at, is_active"
+
+# Columns that list() filters may compare against
+_POLL_FILTERS = {"title", "description", "status", "owner_id"}
+_USER_FILTERS = {"email", "username", "is_active"}
+
+
+def _isoformat(value: datetime | None) -> str | None:
+    return value.isoformat() if value is not None else None
+
+
+def _model_json(model: PollArchive | PollResults | None) -> str | None:
+    return model.model_dump_json() if model is not None else None
+
+
+def _where(filters: dict | None, allowed: set[str]) -> tuple[str, list]:
+    """Build a WHERE clause from field equality filters."""
+    if not filters:
+        return "", []
+    unknown = set(filters) - allowed
+    if unknown:
+        raise ValueError(f"Unsupported filter fields: {sorted(unknown)}")
+    clause = " AND ".join(f"{field} = ?" for field in filters)
+    return f" WHERE {clause}", [
+        value.value if isinstance(value, PollStatus) else value
+        for value in filters.values()
+    ]
+
+
+def _row_to_poll_doc(row: sqlite3.Row) -> dict:
+    return {
+        "_id": row["id"],
+        "title": row["title"],
+        "description": row["description"],
+        "options": json.loads(row["options"]),
+        "status": row["status"],
+        "owner_id": row["owner_id"],
+        "created_at": row["created_at"],
+        "closes_at": row["closes_at"],
+        "archive": json.loads(row["archive"]) if row["archive"] else None,
+        "results": json.loads(row["results"]) if row["results"] else None,
+        "revision": row["revision"],
+    }
+
+
+def _row_to_vote_doc(row: sqlite3.Row) -> dict:
+    return {
+        "_id": row["id"],
+        "poll_id": row["poll_id"],
+        "user_id": row["user_id"],
+        "rankings": json.loads(row["rankings"]),
+        "submitted_at": row["submitted_at"],
+    }
+
+
+def _row_to_user_doc(row: sqlite3.Row) -> dict:
+    return {
+        "_id": row["id"],
+        "email": row["email"],
+        "username": row["username"],
+        "hashed_password": row["hashed_password"],
+        "created_at": row["created_at"],
+        "is_active": bool(row["is_active"]),
+    }
+
+
+def _poll_params(entity: PollInDB) -> tuple:
+    return (
+        entity.title,
+        entity.description,
+        json.dumps([option.model_dump() for option in entity.options]),
+        PollStatus(entity.status).value,
+        entity.owner_id,
+        _isoformat(entity.created_at),
+        _isoformat(entity.closes_at),
+        _model_json(entity.archive),
+        _model_json(entity.results),
+    )
+
+
+def _user_params(entity: UserInDB) -> tuple:
+    return (
+        entity.email,
+        entity.username,
+        entity.hashed_password,
+        _isoformat(entity.created_at),
+        int(entity.is_active),
+    )
+
+
+class SQLitePollRepository(BaseRepository[PollInDB]):
+    """SQLite repository for poll CRUD operations."""
+
+    def __init__(self, database: SQLiteDatabase):
+        # Tables are addressed in SQL, not through BaseRepository.collection
+        self.database = database
+
+    async def ensure_indexes(self) -> None:
+        """Indexes are created with the schema when the database is opened."""
+
+    async def preload_open_polls(self, limit: int = 1000) -> int:
+        """Poll metadata is read from SQLite on demand, so nothing is preloaded."""
+        return 0
+
+    def _doc_to_poll(self, row: sqlite3.Row) -> PollInDB:
+        """Convert a polls row to a PollInDB model."""
+        return decode_poll(_row_to_poll_doc(row))
+
+    def _doc_to_vote(self, row: sqlite3.Row) -> VoteInDB:
+        """Convert a votes row to a VoteInDB model."""
+        return decode_vote(_row_to_vote_doc(row))
+
+    async def _fetch_polls(self, sql: str, params: tuple | list) -> list[PollInDB]:
+        rows = await self.database.run(lambda conn: conn.execute(sql, params).fetchall())
+        return decode_many(self._doc_to_poll, rows)
+
+    async def create(self, entity: PollInDB) -> PollInDB:
+        """Create a new poll."""
+        poll_id = str(ObjectId())
+        params = (poll_id, *_poll_params(entity), entity.revision)
+
+        def insert(conn: sqlite3.Connection) -> None:
+            with conn:
+                conn.execute(
+                    f"INSERT INTO polls ({_POLL_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    params,
+                )
+
+        await self.database.run(insert)
+        entity.id = poll_id
+        return entity
+
+    async def get_by_id(self, entity_id: str) -> PollInDB | None:
+        """Get a poll by its ID."""
+        row = await self.database.run(
+            lambda conn: conn.execute(
+                f"SELECT {_POLL_COLUMNS} FROM polls WHERE id = ?",
+                (entity_id,),
+            ).fetchone()
+        )
+        if row is None:
+            return None
+        return self._doc_to_poll(row)
+
+    async def get_by_ids(self, entity_ids: list[str]) -> list[PollInDB]:
+        """Get the polls with the given IDs, in no particular order."""
+        if not entity_ids:
+            return []
+        placeholders = ", ".join("?" * len(entity_ids))
+        return await self._fetch_polls(
+            f"SELECT {_POLL_COLUMNS} FROM polls WHERE id IN ({placeholders})",
+            entity_ids,
+        )
+
+    async def update(self, entity_id: str, entity: PollInDB) -> PollInDB | None:
+        """Update an existing poll."""
+        params = (*_poll_params(entity), entity_id)
+
+        def update(conn: sqlite3.Connection) -> sqlite3.Row | None:
+            with conn:
+                return conn.execute(
+                    "UPDATE polls SET title = ?, description = ?, options = ?, status = ?, "
+                    "owner_id = ?, created_at = ?, closes_at = ?, archive = ?, results = ?, "
+                    f"revision = revision + 1 WHERE id = ? RETURNING {_POLL_COLUMNS}",
+                    params,
+                ).fetchone()
+
+        row = await self.database.run(update)
+        if row is None:
+            return None
+        return self._doc_to_poll(row)
+
+    async def delete(self, entity_id: str) -> bool:
+        """Delete a poll by its ID."""
+
+        def delete(conn: sqlite3.Connection) -> int:
+            with conn:
+                return conn.execute("DELETE FROM polls WHERE id = ?", (entity_id,)).rowcount
+
+        return await self.database.run(delete) > 0
+
+    async def list(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        filters: dict | None = None,
+    ) -> list[PollInDB]:
+        """List polls with pagination. Filters are column equality conditions."""
+        where, params = _where(filters, _POLL_FILTERS)
+        return await self._fetch_polls(
+            f"SELECT {_POLL_COLUMNS} FROM polls{where} ORDER BY rowid LIMIT ? OFFSET ?",
+            [*params, limit, skip],
+        )
+
+    async def get_by_owner(
+        self,
+        owner_id: str,
+        skip: int = 0,
+        limit: int = 100,
+    ) -> list[PollInDB]:
+        """Get all polls owned by a specific user."""
+        return await self._fetch_polls(
+            f"SELECT {_POLL_COLUMNS} FROM polls WHERE owner_id = ? "
+            "ORDER BY rowid LIMIT ? OFFSET ?",
+            (owner_id, limit, skip),
+        )
+
+    async def get_open_polls(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+    ) -> list[PollInDB]:
+        """Get all currently open polls."""
+        return await self._fetch_polls(
+            f"SELECT {_POLL_COLUMNS} FROM polls WHERE status = ? "
+            "ORDER BY rowid LIMIT ? OFFSET ?",
+            (PollStatus.OPEN.value, limit, skip),
+        )
+
+    async def update_status(
+        self,
+        poll_id: str,
+        status: PollStatus,
+        expected: PollStatus | None = None,
+    ) -> PollInDB | None:
+        """Update a poll's status, if it currently has the expected status."""
+        sql = "UPDATE polls SET status = ?, revision = revision + 1 WHERE id = ?"
+        params = [status.value, poll_id]
+        if expected is not None:
+            sql += " AND status = ?"
+            params.append(expected.value)
+
+        def update(conn: sqlite3.Connection) -> sqlite3.Row | None:
+            with conn:
+                return conn.execute(f"{sql} RETURNING {_POLL_COLUMNS}", params).fetchone()
+
+        row = await self.database.run(update)
+        if row is None:
+            return None
+        return self._doc_to_poll(row)
+
+    async def get_polls_closing_before(
+        self,
+        before: datetime,
+        limit: int = 1000,
+    ) -> list[PollInDB]:
+        """Get open polls whose closes_at is at or before a time, soonest first."""
+        return await self._fetch_polls(
+            f"SELECT {_POLL_COLUMNS} FROM polls "
+            "WHERE status = ? AND closes_at IS NOT NULL AND closes_at <= ? "
+            "ORDER BY closes_at LIMIT ?",
+            (PollStatus.OPEN.value, _isoformat(before), limit),
+        )
+
+    async def set_archive(self, poll_id: str, archive: PollArchive | None) -> None:
+        """Record (or clear) the ballot archive of a poll."""
+        params = (_model_json(archive), poll_id)
+
+        def update(conn: sqlite3.Connection) -> None:
+            with conn:
+                conn.execute("UPDATE polls SET archive = ? WHERE id = ?", params)
+
+        await self.database.run(update)
+
+    async def set_results(self, poll_id: str, results: PollResults | None) -> None:
+        """Store (or clear) the precomputed results of a poll."""
+        params = (_model_json(results), poll_id)
+
+        def update(conn: sqlite3.Connection) -> None:
+            with conn:
+                conn.execute(
+                    "UPDATE polls SET results = ?, revision = revision + 1 WHERE id = ?",
+                    params,
+                )
+
+        await self.database.run(update)
+
+    async def acquire_lease(self, name: str, holder: str, ttl_seconds: float) -> bool:
+        """Acquire or renew a named lease shared by all workers."""
+        now = datetime.utcnow()
+        params = (name, holder, _isoformat(now + timedelta(seconds=ttl_seconds)), _isoformat(now))
+
+        def upsert(conn: sqlite3.Connection) -> int:
+            with conn:
+                return conn.execute(
+                    "INSERT INTO leases (name, holder, expires_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT (name) DO UPDATE SET "
+                    "holder = excluded.holder, expires_at = excluded.expires_at "
+                    "WHERE leases.holder = excluded.holder OR leases.expires_at <= ?",
+                    params,
+                ).rowcount
+
+        return await self.database.run(upsert) > 0
+
+    async def release_lease(self, name: str, holder: str) -> None:
+        """Release a lease if the caller holds it."""
+
+        def delete(conn: sqlite3.Connection) -> None:
+            with conn:
+                conn.execute("DELETE FROM leases WHERE name = ? AND holder = ?", (name, holder))
+
+        await self.database.run(delete)
+
+    # --- Vote Operations ---
+
+    async def create_vote(self, vote: VoteInDB) -> VoteInDB:
+        """
+        Create a new vote for a poll.
+
+        Raises:
+            DuplicateVoteError: If the voter has already voted in the poll.
+        """
+        vote_id = str(ObjectId())
+        rankings = [ranking.model_dump() for ranking in vote.rankings]
+        vote_params = (
+            vote_id,
+            vote.poll_id,
+            vote.user_id,
+            json.dumps(rankings),
+            _isoformat(vote.submitted_at),
+        )
+        ranking_params = [
+            (vote.poll_id, vote_id, ranking["option_id"], ranking["rank"])
+            for ranking in rankings
+        ]
+
+        def insert(conn: sqlite3.Connection) -> None:
+            with conn:
+                try:
+                    conn.execute(
+                        f"INSERT INTO votes ({_VOTE_COLUMNS}) VALUES (?, ?, ?, ?, ?)",
+                        vote_params,
+                    )
+                except sqlite3.IntegrityError as exc:
+                    raise DuplicateVoteError() from exc
+                conn.executemany(
+                    "INSERT INTO rankings (poll_id, vote_id, option_id, rank) "
+                    "VALUES (?, ?, ?, ?)",
+                    ranking_params,
+                )
+                conn.execute(
+                    "UPDATE polls SET revision = revision + 1 WHERE id = ?",
+                    (vote.poll_id,),
+                )
+
+        await self.database.run(insert)
+        vote.id = vote_id
+        return vote
+
+    async def create_votes(self, votes: list[VoteInDB]) -> None:
+        """
+        Insert a batch of votes for one poll, in one transaction.
+
+        Raises:
+            DuplicateVoteError: If a voter has already voted in the poll;
+                none of the batch is stored.
+        """
+        if not votes:
+            return
+        vote_params = []
+        ranking_params = []
+        for vote in votes:
+            vote.id = str(ObjectId())
+            rankings = [ranking.model_dump() for ranking in vote.rankings]
+            vote_params.append((
+                vote.id,
+                vote.poll_id,
+                vote.user_id,
+                json.dumps(rankings),
+                _isoformat(vote.submitted_at),
+            ))
+            ranking_params.extend(
+                (vote.poll_id, vote.id, ranking["option_id"], ranking["rank"])
+                for ranking in rankings
+            )
+
+        def insert(conn: sqlite3.Connection) -> None:
+            with conn:
+                try:
+                    conn.executemany(
+                        f"INSERT INTO votes ({_VOTE_COLUMNS}) VALUES (?, ?, ?, ?, ?)",
+                        vote_params,
+                    )
+                except sqlite3.IntegrityError as exc:
+                    raise DuplicateVoteError() from exc
+                conn.executemany(
+                    "INSERT INTO rankings (poll_id, vote_id, option_id, rank) "
+                    "VALUES (?, ?, ?, ?)",
+                    ranking_params,
+                )
+                conn.execute(
+                    "UPDATE polls SET revision = revision + 1 WHERE id = ?",
+                    (votes[0].poll_id,),
+                )
+
+        await self.database.run(insert)
+
+    async def count_votes_by_voter_prefix(self, poll_id: str, prefix: str) -> int:
+        """Count a poll's votes whose voter ID starts with prefix."""
+        if not prefix:
+            return await self.count_votes(poll_id)
+        # A range over the (poll_id, user_id) index: every string with the
+        # prefix sorts between it and the prefix with its last character bumped
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        row = await self.database.run(
+            lambda conn: conn.execute(
+                "SELECT COUNT(*) FROM votes WHERE poll_id = ? AND user_id >= ? AND user_id < ?",
+                (poll_id, prefix, upper),
+            ).fetchone()
+        )
+        return row[0]
+
+    async def get_vote(self, poll_id: str, user_id: str) -> VoteInDB | None:
+        """Get a user's vote for a specific poll."""
+        row = await self.database.run(
+            lambda conn: conn.execute(
+                f"SELECT {_VOTE_COLUMNS} FROM votes WHERE poll_id = ? AND user_id = ?",
+                (poll_id, user_id),
+            ).fetchone()
+        )
+        if row is None:
+            return None
+        return self._doc_to_vote(row)
+
+    async def get_votes_for_poll(self, poll_id: str) -> list[VoteInDB]:
+        """Get all votes for a specific poll."""
+        rows = await self.database.run(
+            lambda conn: conn.execute(
+                f"SELECT {_VOTE_COLUMNS} FROM votes WHERE poll_id = ?",
+                (poll_id,),
+            ).fetchall()
+        )
+        return decode_many(self._doc_to_vote, rows)
+
+    async def iter_votes(
+        self,
+        poll_id: str,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[VoteInDB]:
+        """Stream all votes for a poll, one keyset-paginated batch at a time."""
+        last_rowid = 0
+        while True:
+            rows = await self.database.run(
+                lambda conn: conn.execute(
+                    f"SELECT rowid, {_VOTE_COLUMNS} FROM votes "
+                    "WHERE poll_id = ? AND rowid > ? ORDER BY rowid LIMIT ?",
+                    (poll_id, last_rowid, batch_size),
+                ).fetchall()
+            )
+            if not rows:
+                return
+            last_rowid = rows[-1]["rowid"]
+            for vote in decode_many(self._doc_to_vote, rows):
+                yield vote
+
+    async def delete_votes(self, poll_id: str) -> int:
+        """Delete every vote of a poll, returning how many were deleted."""
+
+        def delete(conn: sqlite3.Connection) -> int:
+            with conn:
+                conn.execute("DELETE FROM rankings WHERE poll_id = ?", (poll_id,))
+                return conn.execute("DELETE FROM votes WHERE poll_id = ?", (poll_id,)).rowcount
+
+        return await self.database.run(delete)
+
+    async def count_votes(self, poll_id: str) -> int:
+        """Count the total number of votes for a poll."""
+        row = await self.database.run(
+            lambda conn: conn.execute(
+                "SELECT COUNT(*) FROM votes WHERE poll_id = ?",
+                (poll_id,),
+            ).fetchone()
+        )
+        return row[0]
+
+    async def count_votes_many(self, poll_ids: list[str]) -> dict[str, int]:
+        """Count the votes of several polls, omitting polls without votes."""
+        if not poll_ids:
+            return {}
+        placeholders = ", ".join("?" * len(poll_ids))
+        rows = await self.database.run(
+            lambda conn: conn.execute(
+                f"SELECT poll_id, COUNT(*) FROM votes WHERE poll_id IN ({placeholders}) "
+                "GROUP BY poll_id",
+                poll_ids,
+            ).fetchall()
+        )
+        return {poll_id: count for poll_id, count in rows}
+
+    async def get_borda_scores(
+        self,
+        poll_id: str,
+        option_ids: list[str],
+    ) -> dict[str, float]:
+        """Sum Borda points (n - rank + 1) per option with a SQL aggregate."""
+        rows = await self.database.run(
+            lambda conn: conn.execute(
+                "SELECT option_id, SUM(? - rank) FROM rankings "
+                "WHERE poll_id = ? GROUP BY option_id",
+                (len(option_ids) + 1, poll_id),
+            ).fetchall()
+        )
+        scores = {option_id: 0.0 for option_id in option_ids}
+        for option_id, points in rows:
+            if option_id in scores:
+                scores[option_id] += points
+        return scores
+
+
+class SQLiteUserRepository(BaseRepository[UserInDB]):
+    """SQLite repository for user CRUD operations."""
+
+    def __init__(self, database: SQLiteDatabase):
+        # Tables are addressed in SQL, not through BaseRepository.collection
+        self.database = database
+
+    async def ensure_indexes(self) -> None:
+        """
+        Log login keys shared by users created before login keys.
+
+        Indexes are created with the schema when the database is opened.
+        """
+        log_login_conflicts(await self.get_login_conflicts())
+
+    async def get_login_conflicts(self) -> dict[str, list[str]]:
+        """
+        Get the login keys shared by users created before login keys.
+
+        Returns:
+            Map of login key to the IDs of the users sharing it, the user
+            holding the key first.
+        """
+        rows = await self.database.run(
+            lambda conn: conn.execute(
+                "SELECT shadowed.key, login_keys.user_id, shadowed.user_id "
+                "FROM shadowed_login_keys AS shadowed "
+                "LEFT JOIN login_keys ON login_keys.key = shadowed.key "
+                "ORDER BY shadowed.key"
+            ).fetchall()
+        )
+        conflicts: dict[str, list[str]] = {}
+        for key, holder_id, user_id in rows:
+            conflicts.setdefault(key, [holder_id] if holder_id else []).append(user_id)
+        return conflicts
+
+    def _doc_to_model(self, row: sqlite3.Row) -> UserInDB:
+        """Convert a users row to a UserInDB model."""
+        return decode_user(_row_to_user_doc(row))
+
+    async def _fetch_one(self, sql: str, params: tuple) -> UserInDB | None:
+        row = await self.database.run(lambda conn: conn.execute(sql, params).fetchone())
+        if row is None:
+            return None
+        return self._doc_to_model(row)
+
+    @staticmethod
+    def _insert_login_keys(conn: sqlite3.Connection, user_id: str, entity: UserInDB) -> None:
+        """Insert a user's login keys, raising if another user holds one."""
+        for key in login_keys(entity):
+            try:
+                conn.execute(
+                    "INSERT INTO login_keys (key, user_id) VALUES (?, ?)",
+                    (key, user_id),
+                )
+            except sqlite3.IntegrityError:
+                raise DuplicateUserError(conflicting_field(entity, key))
+
+    async def create(self, entity: UserInDB) -> UserInDB:
+        """
+        Create a new user.
+
+        Raises:
+            DuplicateUserError: If the email or username is taken.
+        """
+        user_id = str(ObjectId())
+        params = (user_id, *_user_params(entity))
+
+        def insert(conn: sqlite3.Connection) -> None:
+            with conn:
+                conn.execute(
+                    f"INSERT INTO users ({_USER_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)",
+                    params,
+                )
+                self._insert_login_keys(conn, user_id, entity)
+
+        await self.database.run(insert)
+        entity.id = user_id
+        return entity
+
+    async def get_by_id(self, entity_id: str) -> UserInDB | None:
+        """Get a user by their ID."""
+        return await self._fetch_one(
+            f"SELECT {_USER_COLUMNS} FROM users WHERE id = ?",
+            (entity_id,),
+        )
+
+    async def get_by_email(self, email: str) -> UserInDB | None:
+        """Get a user by their email address."""
+        return await self._fetch_one(
+            f"SELECT {_USER_COLUMNS} FROM users WHERE email = ?",
+            (email,),
+        )
+
+    async def get_by_username(self, username: str) -> UserInDB | None:
+        """Get a user by their username."""
+        return await self._fetch_one(
+            f"SELECT {_USER_COLUMNS} FROM users WHERE username = ?",
+            (username,),
+        )
+
+    async def get_by_login(self, identifier: str) -> UserInDB | None:
+        """Get a user by their email or username, ignoring case."""
+        key = identifier.lower()
+        user = await self._fetch_one(
+            f"SELECT {_USER_COLUMNS} FROM users "
+            "WHERE id = (SELECT user_id FROM login_keys WHERE key = ?)",
+            (key,),
+        )
+        if user is not None and identifier not in (user.email, user.username):
+            # Users sharing the key with its holder log in with their exact
+            # spelling (see the shadowed_login_keys table)
+            user = await self._fetch_one(
+                f"SELECT {_USER_COLUMNS} FROM users "
+                "WHERE id IN (SELECT user_id FROM shadowed_login_keys WHERE key = ?) "
+                "AND (email = ? OR username = ?)",
+                (key, identifier, identifier),
+            ) or user
+        return user
+
+    async def set_password_hash(self, entity_id: str, hashed_password: str) -> None:
+        """Replace a user's password hash, e.g. after a bcrypt cost change."""
+
+        def update(conn: sqlite3.Connection) -> None:
+            with conn:
+                conn.execute(
+                    "UPDATE users SET hashed_password = ? WHERE id = ?",
+                    (hashed_password, entity_id),
+                )
+
+        await self.database.run(update)
+
+    async def get_inactive_ids(self) -> list[str]:
+        """Get the IDs of all deactivated users."""
+        rows = await self.database.run(
+            lambda conn: conn.execute("SELECT id FROM users WHERE is_active = 0").fetchall()
+        )
+        return [row["id"] for row in rows]
+
+    async def update(self, entity_id: str, entity: UserInDB) -> UserInDB | None:
+        """
+        Update an existing user.
+
+        Raises:
+            DuplicateUserError: If the new email or username is taken.
+        """
+        params = (*_user_params(entity), entity_id)
+
+        def update(conn: sqlite3.Connection) -> sqlite3.Row | None:
+            with conn:
+                row = conn.execute(
+                    "UPDATE users SET email = ?, username = ?, hashed_password = ?, "
+                    "created_at = ?, is_active = ? "
+                    f"WHERE id = ? RETURNING {_USER_COLUMNS}",
+                    params,
+                ).fetchone()
+                if row is not None:
+                    conn.execute("DELETE FROM login_keys WHERE user_id = ?", (entity_id,))
+                    conn.execute("DELETE FROM shadowed_login_keys WHERE user_id = ?", (entity_id,))
+                    self._insert_login_keys(conn, entity_id, entity)
+                return row
+
+        row = await self.database.run(update)
+        publish_invalidation("users", entity_id)
+        if row is None:
+            return None
+        return self._doc_to_model(row)
+
+    async def delete(self, entity_id: str) -> bool:
+        """Delete a user by their ID."""
+
+        def delete(conn: sqlite3.Connection) -> int:
+            with conn:
+                return conn.execute("DELETE FROM users WHERE id = ?", (entity_id,)).rowcount
+
+        deleted = await self.database.run(delete)
+        publish_invalidation("users", entity_id)
+        return deleted > 0
+
+    async def list(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        filters: dict | None = None,
+    ) -> list[UserInDB]:
+        """List users with pagination. Filters are column equality conditions."""
+        where, params = _where(filters, _USER_FILTERS)
+        rows = await self.database.run(
+            lambda conn: conn.execute(
+                f"SELECT {_USER_COLUMNS} FROM users{where} ORDER BY rowid LIMIT ? OFFSET ?",
+                [*params, limit, skip],
+            ).fetchall()
+        )
+        return decode_many(self._doc_to_model, rows)
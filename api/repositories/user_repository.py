@@ -6,27 +6,110 @@ from __future__ import annotations
 
 from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import DuplicateKeyError
 
+from core.cache import publish_invalidation
 from models.auth import UserInDB
 
 from .base import BaseRepository
+from .decoders import decode_many, decode_user
+from .login_keys import DuplicateUserError, conflicting_field, log_login_conflicts, login_keys
 
 
 class UserRepository(BaseRepository[UserInDB]):
-    """Repository for user CRUD operations."""
+    """
+    Repository for user CRUD operations.
+
+    Every user document carries ``login_keys``, its lowercased email and
+    username, under a unique multikey index. Logins resolve with one
+    indexed lookup, and duplicate registrations fail on the insert.
+    """
 
     def __init__(self, database: AsyncIOMotorDatabase):
         super().__init__(database, "users")
 
+    async def ensure_indexes(self) -> None:
+        """
+        Backfill login keys and create the unique index over them.
+
+        Users created before login keys can have an email or username
+        differing from another user's only by case. The oldest of them
+        keeps the shared key; the others have it moved to
+        ``shadowed_login_keys`` and log in with its exact spelling. Every
+        such conflict is logged at startup until an operator resolves it.
+        """
+        indexes = await self.collection.index_information()
+        if "login_keys_1" not in indexes:
+            await self.collection.update_many(
+                {"login_keys": {"$exists": False}},
+                [{"$set": {"login_keys": {"$setUnion": [[
+                    {"$toLower": "$email"},
+                    {"$toLower": "$username"},
+                ]]}}}],
+            )
+            shared = self.collection.aggregate([
+                {"$unwind": "$login_keys"},
+                {"$group": {"_id": "$login_keys", "ids": {"$push": "$_id"}}},
+                {"$match": {"ids.1": {"$exists": True}}},
+            ], allowDiskUse=True)
+            async for group in shared:
+                await self.collection.update_many(
+                    {"_id": {"$in": sorted(group["ids"])[1:]}},
+                    {
+                        "$pull": {"login_keys": group["_id"]},
+                        "$addToSet": {"shadowed_login_keys": group["_id"]},
+                    },
+                )
+        await self.collection.create_indexes([
+            IndexModel([("login_keys", ASCENDING)], unique=True),
+            IndexModel([("shadowed_login_keys", ASCENDING)], sparse=True),
+        ])
+        log_login_conflicts(await self.get_login_conflicts())
+
+    async def get_login_conflicts(self) -> dict[str, list[str]]:
+        """
+        Get the login keys shared by users created before login keys.
+
+        Returns:
+            Map of login key to the IDs of the users sharing it, the user
+            holding the key first.
+        """
+        conflicts: dict[str, list[str]] = {}
+        cursor = self.collection.find(
+            {"shadowed_login_keys": {"$exists": True}},
+            {"shadowed_login_keys": 1},
+        )
+        async for doc in cursor:
+            for key in doc["shadowed_login_keys"]:
+                conflicts.setdefault(key, []).append(str(doc["_id"]))
+        for key, user_ids in conflicts.items():
+            holder = await self.collection.find_one({"login_keys": key}, {"_id": 1})
+            if holder is not None:
+                user_ids.insert(0, str(holder["_id"]))
+        return conflicts
+
     def _doc_to_model(self, doc: dict) -> UserInDB:
         """Convert MongoDB document to UserInDB model."""
-        doc["id"] = str(doc.pop("_id"))
-        return UserInDB(**doc)
+        return decode_user(doc)
 
-    async def create(self, entity: UserInDB) -> UserInDB:
-        """Create a new user."""
+    def _to_doc(self, entity: UserInDB) -> dict:
         doc = entity.model_dump(exclude={"id"})
-        result = await self.collection.insert_one(doc)
+        doc["login_keys"] = login_keys(entity)
+        return doc
+
+    async def create(self, entity: UserInDB) -> UserInDB:
+        """
+        Create a new user.
+
+        Raises:
+            DuplicateUserError: If the email or username is taken.
+        """
+        try:
+            result = await self.collection.insert_one(self._to_doc(entity))
+        except DuplicateKeyError as exc:
+            key = (exc.details or {}).get("keyValue", {}).get("login_keys")
+            raise DuplicateUserError(conflicting_field(entity, key)) from exc
         entity.id = str(result.inserted_id)
         return entity
 
@@ -51,14 +134,51 @@ class UserRepository(BaseRepository[UserInDB]):
             return None
         return self._doc_to_model(doc)
 
-    async def update(self, entity_id: str, entity: UserInDB) -> UserInDB | None:
-        """Update an existing user."""
-        doc = entity.model_dump(exclude={"id"})
-        result = await self.collection.find_one_and_update(
+    async def get_by_login(self, identifier: str) -> UserInDB | None:
+        """Get a user by their email or username, ignoring case."""
+        key = identifier.lower()
+        doc = await self.collection.find_one({"login_keys": key})
+        if doc is None:
+            return None
+        if identifier not in (doc["email"], doc["username"]):
+            # Users sharing the key with its holder log in with their exact
+            # spelling (see ensure_indexes)
+            doc = await self.collection.find_one({
+                "shadowed_login_keys": key,
+                "$or": [{"email": identifier}, {"username": identifier}],
+            }) or doc
+        return self._doc_to_model(doc)
+
+    async def set_password_hash(self, entity_id: str, hashed_password: str) -> None:
+        """Replace a user's password hash, e.g. after a bcrypt cost change."""
+        await self.collection.update_one(
             {"_id": ObjectId(entity_id)},
-            {"$set": doc},
-            return_document=True,
+            {"$set": {"hashed_password": hashed_password}},
         )
+
+    async def get_inactive_ids(self) -> list[str]:
+        """Get the IDs of all deactivated users."""
+        cursor = self.collection.find({"is_active": False}, {"_id": 1})
+        return [str(doc["_id"]) async for doc in cursor]
+
+    async def update(self, entity_id: str, entity: UserInDB) -> UserInDB | None:
+        """
+        Update an existing user.
+
+        Raises:
+            DuplicateUserError: If the new email or username is taken.
+        """
+        try:
+            result = await self.collection.find_one_and_update(
+                {"_id": ObjectId(entity_id)},
+                {"$set": self._to_doc(entity), "$unset": {"shadowed_login_keys": ""}},
+                return_document=True,
+            )
+        except DuplicateKeyError as exc:
+            key = (exc.details or {}).get("keyValue", {}).get("login_keys")
+            raise DuplicateUserError(conflicting_field(entity, key)) from exc
+        # Other workers are notified through the change stream
+        publish_invalidation("users", entity_id)
         if result is None:
             return None
         return self._doc_to_model(result)
@@ -66,6 +186,7 @@ class UserRepository(BaseRepository[UserInDB]):
     async def delete(self, entity_id: str) -> bool:
         """Delete a user by their ID."""
         result = await self.collection.delete_one({"_id": ObjectId(entity_id)})
+        publish_invalidation("users", entity_id)
         return result.deleted_count > 0
 
     async def list(
@@ -77,4 +198,4 @@ class UserRepository(BaseRepository[UserInDB]):
         """List users with pagination."""
         cursor = self.collection.find(filters or {}).skip(skip).limit(limit)
         docs = await cursor.to_list(length=limit)
-        return [self._doc_to_model(doc) for doc in docs]
+        return decode_many(self._doc_to_model, docs)
@@ -2,9 +2,9 @@
 Authentication router - API endpoints for auth.
 """
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response, status
 
-from dependencies import get_auth_service, get_current_user
+from dependencies import get_auth_service, get_current_user, get_token_subject
 from models.auth import Token, UserCreate, UserLogin, UserResponse
 from services.auth_service import AuthService
 
@@ -62,4 +62,15 @@ async def refresh_token(
 
     Returns a new access token if the current one is still valid.
     """
-    return await auth_service.refresh_token(current_user.id)
+    return await auth_service.refresh_token(current_user)
+
+
+@router.get("/verify", status_code=204)
+async def verify_token(user_id: str = Depends(get_token_subject)) -> Response:
+    """
+    Check a bearer token, for nginx `auth_request` (see deploy/nginx.conf).
+
+    Answers from memory, without a database read: 204 with the user's ID
+    in the X-User-Id header, or 401.
+    """
+    return Response(status_code=status.HTTP_204_NO_CONTENT, headers={"X-User-Id": user_id})
@@ -4,7 +4,7 @@ Chart router - API endpoints for visualization data.
 
 from fastapi import APIRouter, Depends
 
-from dependencies import get_current_user
+from dependencies import get_chart_service, get_current_user
 from models.auth import UserResponse
 from models.charts import AlgorithmComparisonChart, VoteDistributionChart
 from services.chart_service import ChartService
@@ -12,11 +12,6 @@ from services.chart_service import ChartService
 router = APIRouter(prefix="/charts", tags=["Charts"])
 
 
-def get_chart_service() -> ChartService:
-    """Dependency to get chart service."""
-    return ChartService()
-
-
 @router.get("/algorithm-comparison")
 async def get_algorithm_comparison(
     current_user: UserResponse = Depends(get_current_user),
@@ -2,33 +2,49 @@
 Poll router - API endpoints for polls and voting.
 """
 
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, Depends, Header, Query, Request
+from fastapi.responses import StreamingResponse
 
-from dependencies import get_current_user, get_current_user_optional, get_poll_service
+from core.responses import ModelJSONResponse
+from dependencies import (
+    get_current_user,
+    get_current_user_optional,
+    get_poll_service,
+    get_vote_import_service,
+)
 from models.auth import UserResponse
 from models.polls import (
+    PollBatchResponse,
     PollCreate,
+    PollPage,
     PollResponse,
     PollResults,
     VoteCreate,
+    VoteImportProgress,
+    VoteImportReport,
     VoteResponse,
 )
 from services.poll_service import PollService
+from services.vote_export import MEDIA_TYPES, VoteExportFormat
+from services.vote_import import VoteImportFormat, VoteImportService
+
+# Import IDs name the voter IDs of imported ballots (import:<id>:<n>)
+IMPORT_ID_PATTERN = r"^[A-Za-z0-9_.-]{1,64}$"
 
 router = APIRouter(prefix="/polls", tags=["Polls"])
 
 
-@router.get("")
+@router.get("", response_model=list[PollResponse])
 async def list_polls(
     current_user: UserResponse = Depends(get_current_user),
     poll_service: PollService = Depends(get_poll_service),
-) -> list[PollResponse]:
+) -> ModelJSONResponse:
     """
     List all polls for the current user.
 
     Returns polls owned by or voted on by the current user.
     """
-    return await poll_service.list_user_polls(current_user.id)
+    return ModelJSONResponse(await poll_service.list_user_polls(current_user.id))
 
 
 @router.post("", status_code=201)
@@ -50,17 +66,61 @@ async def create_poll(
     return await poll_service.create_poll(poll_data, current_user.id)
 
 
-@router.get("/{poll_id}")
+@router.get(":batch", response_model=PollBatchResponse)
+async def get_polls(
+    ids: list[str] = Query(..., description="Poll IDs, repeated or comma-separated"),
+    poll_service: PollService = Depends(get_poll_service),
+) -> ModelJSONResponse:
+    """
+    Get several polls by their IDs.
+
+    Returns the polls found in the order requested, with vote counts, and
+    lists the IDs that have no poll under ``missing`` instead of failing.
+    """
+    poll_ids = [poll_id.strip() for value in ids for poll_id in value.split(",") if poll_id.strip()]
+    return ModelJSONResponse(await poll_service.get_polls(poll_ids))
+
+
+@router.get("/{poll_id}", response_model=PollResponse)
 async def get_poll(
     poll_id: str,
+    if_none_match: str | None = Header(default=None),
     poll_service: PollService = Depends(get_poll_service),
-) -> PollResponse:
+) -> ModelJSONResponse:
     """
     Get a poll by its ID.
 
-    Returns the poll details including current vote count.
+    Returns the poll details including current vote count. Supports
+    conditional requests with If-None-Match.
+    """
+    poll, headers = await poll_service.get_poll(poll_id, if_none_match)
+    return ModelJSONResponse(poll, headers=headers)
+
+
+@router.get("/{poll_id}/page", response_model=PollPage)
+async def get_poll_page(
+    poll_id: str,
+    request: Request,
+    current_user: UserResponse | None = Depends(get_current_user_optional),
+    poll_service: PollService = Depends(get_poll_service),
+) -> ModelJSONResponse:
+    """
+    Get everything the vote page needs in one request.
+
+    Combines the poll, whether the current user/IP has voted, and the
+    results when they are visible (closed polls, or the owner's own polls).
     """
-    return await poll_service.get_poll(poll_id)
+    if current_user:
+        voter_id = current_user.id
+    else:
+        voter_id = f"anon:{request.client.host}"
+
+    page = await poll_service.get_poll_page(
+        poll_id,
+        voter_id,
+        current_user.id if current_user else None,
+    )
+    return ModelJSONResponse(page)
 
 
 @router.post("/{poll_id}/open")
@@ -139,16 +199,93 @@ async def check_voted(
     return {"has_voted": has_voted}
 
 
-@router.get("/{poll_id}/results")
+@router.get("/{poll_id}/votes/export", response_class=StreamingResponse)
+async def export_votes(
+    poll_id: str,
+    export_format: VoteExportFormat = Query(VoteExportFormat.NDJSON, alias="format"),
+    anonymize: bool = False,
+    current_user: UserResponse = Depends(get_current_user),
+    poll_service: PollService = Depends(get_poll_service),
+) -> StreamingResponse:
+    """
+    Download a poll's raw ballots.
+
+    Only the poll owner can export votes. Ballots are streamed as NDJSON
+    (one vote per line) or CSV (one row per vote, one rank column per
+    option), in constant memory.
+
+    - **format**: ndjson or csv
+    - **anonymize**: Replace voter IDs with pseudonyms, consistent within the
+      export. Anonymous voters' IDs always are, as they hold IP addresses.
+    """
+    chunks = await poll_service.export_votes(poll_id, current_user.id, export_format, anonymize)
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="poll-{poll_id}-votes.{export_format.value}"',
+        },
+    )
+
+
+@router.post("/{poll_id}/votes/import")
+async def import_votes(
+    poll_id: str,
+    request: Request,
+    import_format: VoteImportFormat = Query(..., alias="format"),
+    import_id: str = Query(..., pattern=IMPORT_ID_PATTERN),
+    current_user: UserResponse = Depends(get_current_user),
+    vote_import_service: VoteImportService = Depends(get_vote_import_service),
+) -> VoteImportReport:
+    """
+    Import ballots from a BLT or CSV election file sent as the request body.
+
+    Only the poll owner can import votes, into a draft or open poll. The
+    file is parsed as it uploads and written in batches. After a failure,
+    send the file again with the same import ID: ballots already imported
+    are skipped.
+
+    - **format**: blt or csv
+    - **import_id**: Names this file's import, e.g. its file name
+    """
+    return await vote_import_service.import_votes(
+        poll_id,
+        request.stream(),
+        import_format,
+        import_id,
+        owner_id=current_user.id,
+    )
+
+
+@router.get("/{poll_id}/votes/import/{import_id}")
+async def get_import_progress(
+    poll_id: str,
+    import_id: str,
+    current_user: UserResponse = Depends(get_current_user),
+    vote_import_service: VoteImportService = Depends(get_vote_import_service),
+) -> VoteImportProgress:
+    """
+    Get how many ballots an import has written so far.
+    """
+    return await vote_import_service.get_progress(poll_id, import_id, current_user.id)
+
+
+@router.get("/{poll_id}/results", response_model=PollResults)
 async def get_results(
     poll_id: str,
+    if_none_match: str | None = Header(default=None),
     current_user: UserResponse = Depends(get_current_user),
     poll_service: PollService = Depends(get_poll_service),
-) -> PollResults:
+) -> ModelJSONResponse:
     """
     Get the poll results calculated using Borda count.
 
     Results show each option's score and final ranking.
     Only the poll owner can see results while poll is open.
     """
-    return await poll_service.get_results(poll_id, current_user.id)
+    results, headers = await poll_service.get_results(
+        poll_id,
+        current_user.id,
+        if_none_match,
+    )
+    return ModelJSONResponse(results, headers=headers)
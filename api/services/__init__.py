@@ -1,13 +1,26 @@
 """
 Service layer - Business logic.
+
+Services are imported on first access, so importing one service module
+doesn't import the others.
 """
 
-from .auth_service import AuthService
-from .poll_service import PollService
-from .chart_service import ChartService
+from importlib import import_module
+
+# Exported name -> module defining it
+_EXPORTS = {
+    "AuthService": ".auth_service",
+    "PollService": ".poll_service",
+    "ChartService": ".chart_service",
+    "PollScheduler": ".poll_scheduler",
+    "VoteImportService": ".vote_import",
+}
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(import_module(_EXPORTS[name], __name__), name)
+
 
-__all__ = [
-    "AuthService",
-    "PollService",
-    "ChartService",
-]
+__all__ = [*_EXPORTS]
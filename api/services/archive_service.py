@@ -0,0 +1,112 @@
+"""
+Archive service - Ballot archives for closed polls.
+
+Requires numpy (``pip install rankstuff-api[archive]``).
+"""
+
+import asyncio
+from datetime import datetime, timezone
+from pathlib import Path
+
+from fastapi import HTTPException, status
+
+from models.polls import PollArchive, PollInDB, PollStatus
+from repositories.ballot_archive import BallotArchive, write_archive
+from repositories.poll_repository import PollRepository
+from services.tally import TallyAlgorithm, tally
+
+
+class ArchiveService:
+    """Service for archiving closed polls and tallying their archives."""
+
+    def __init__(self, poll_repository: PollRepository, archive_dir: str):
+        """
+        Initialize the archive service.
+
+        Args:
+            poll_repository: Repository for poll data access.
+            archive_dir: Directory the archive files are written to.
+        """
+        self.poll_repository = poll_repository
+        self.archive_dir = Path(archive_dir)
+
+    async def archive_poll(self, poll_id: str, prune: bool = False) -> PollArchive:
+        """
+        Write a closed poll's ballots to an archive file.
+
+        Args:
+            poll_id: The poll's ID.
+            prune: Delete the archived votes from the database afterwards.
+
+        Returns:
+            The archive record stored on the poll.
+
+        Raises:
+            HTTPException: If poll not found, not closed or already pruned.
+        """
+        poll = await self.poll_repository.get_by_id(poll_id)
+
+        if not poll:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Poll not found",
+            )
+
+        if poll.status != PollStatus.CLOSED:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Only closed polls can be archived",
+            )
+
+        if poll.archive and poll.archive.pruned:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Poll votes were already archived and pruned",
+            )
+
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        path = self.archive_dir / f"{poll_id}.rsba"
+        vote_count = await write_archive(
+            path,
+            [opt.id for opt in poll.options],
+            self.poll_repository.iter_votes(poll_id),
+        )
+
+        archive = PollArchive(
+            path=str(path),
+            vote_count=vote_count,
+            archived_at=datetime.now(timezone.utc),
+        )
+        await self.poll_repository.set_archive(poll_id, archive)
+
+        if prune:
+            await self.poll_repository.delete_votes(poll_id)
+            archive.pruned = True
+            await self.poll_repository.set_archive(poll_id, archive)
+
+        return archive
+
+    async def tally(
+        self,
+        poll: PollInDB,
+        algorithm: TallyAlgorithm = TallyAlgorithm.BORDA,
+    ) -> list[tuple[str, float]]:
+        """
+        Run a results algorithm over an archived poll's ballots.
+
+        The archive is memory-mapped and tallied on a worker thread.
+
+        Args:
+            poll: An archived poll.
+            algorithm: The results algorithm to run.
+
+        Returns:
+            (option ID, score) pairs in finishing order, winner first.
+        """
+        archive = BallotArchive(poll.archive.path)
+        return await asyncio.to_thread(
+            tally,
+            algorithm,
+            archive.chunks,
+            archive.option_ids,
+        )
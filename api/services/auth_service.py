@@ -2,11 +2,39 @@
 Authentication service - Business logic for user auth.
 """
 
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Awaitable, TypeVar
+
 from fastapi import HTTPException, status
 
-from core.security import create_access_token, hash_password, verify_password
+from core.cache import TTLCache, register_cache
+from core.config import settings
+from core.security import (
+    PasswordPoolFull,
+    create_access_token,
+    hash_password_async,
+    needs_rehash,
+    verify_password_async,
+)
 from models.auth import Token, UserCreate, UserInDB, UserResponse
-from repositories.user_repository import UserRepository
+from repositories.login_keys import DuplicateUserError
+
+if TYPE_CHECKING:
+    from repositories.user_repository import UserRepository
+
+T = TypeVar("T")
+
+# Users resolved from access tokens, keyed by user ID. Evicted when the
+# user changes, in any worker.
+_PRINCIPAL_CACHE: TTLCache[UserResponse] = register_cache(
+    "users",
+    TTLCache(
+        "principals",
+        max_size=settings.principal_cache_size,
+        ttl=settings.principal_cache_ttl_seconds,
+    ),
+)
 
 
 class AuthService:
@@ -34,30 +62,27 @@ class AuthService:
         Raises:
             HTTPException: If email or username already exists.
         """
-        # Check if email already exists
-        existing_user = await self.user_repository.get_by_email(user_data.email)
-        if existing_user:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Email already registered",
-            )
-
-        # Check if username already exists
-        existing_user = await self.user_repository.get_by_username(user_data.username)
-        if existing_user:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Username already taken",
-            )
-
-        # Create user with hashed password
         user_in_db = UserInDB(
             email=user_data.email,
             username=user_data.username,
-            hashed_password=hash_password(user_data.password),
+            hashed_password=await self._run_password_task(
+                hash_password_async(user_data.password)
+            ),
         )
 
-        created_user = await self.user_repository.create(user_in_db)
+        # The unique login key index catches duplicates, also between
+        # concurrent registrations
+        try:
+            created_user = await self.user_repository.create(user_in_db)
+        except DuplicateUserError as exc:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=(
+                    "Email already registered"
+                    if exc.field == "email"
+                    else "Username already taken"
+                ),
+            )
 
         return UserResponse(
             id=created_user.id,
@@ -72,7 +97,7 @@ class AuthService:
         Authenticate a user and return a JWT token.
 
         Args:
-            identifier: The user's email or username.
+            identifier: The user's email or username, in any case.
             password: The user's password.
 
         Returns:
@@ -81,12 +106,11 @@ class AuthService:
         Raises:
             HTTPException: If credentials are invalid.
         """
-        # Try email first, then username
-        user = await self.user_repository.get_by_email(identifier)
-        if not user:
-            user = await self.user_repository.get_by_username(identifier)
+        user = await self.user_repository.get_by_login(identifier)
 
-        if not user or not verify_password(password, user.hashed_password):
+        if not user or not await self._run_password_task(
+            verify_password_async(password, user.hashed_password)
+        ):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid credentials",
@@ -99,7 +123,18 @@ class AuthService:
                 detail="User account is inactive",
             )
 
-        access_token = create_access_token(data={"sub": user.id})
+        if needs_rehash(user.hashed_password):
+            await self._rehash_password(user, password)
+
+        access_token = self._access_token(
+            UserResponse(
+                id=user.id,
+                email=user.email,
+                username=user.username,
+                created_at=user.created_at,
+                is_active=user.is_active,
+            )
+        )
 
         return Token(access_token=access_token)
 
@@ -107,6 +142,9 @@ class AuthService:
         """
         Get the current authenticated user.
 
+        Users are cached for a short time, so most authenticated requests
+        don't read the users collection.
+
         Args:
             user_id: The user's ID from the JWT token.
 
@@ -116,6 +154,10 @@ class AuthService:
         Raises:
             HTTPException: If user not found.
         """
+        cached = _PRINCIPAL_CACHE.get(user_id)
+        if cached is not None:
+            return cached
+
         user = await self.user_repository.get_by_id(user_id)
 
         if not user:
@@ -124,23 +166,89 @@ class AuthService:
                 detail="User not found",
             )
 
-        return UserResponse(
+        principal = UserResponse(
             id=user.id,
             email=user.email,
             username=user.username,
             created_at=user.created_at,
             is_active=user.is_active,
         )
+        _PRINCIPAL_CACHE.set(user_id, principal)
+        return principal
 
-    async def refresh_token(self, user_id: str) -> Token:
+    async def refresh_token(self, user: UserResponse) -> Token:
         """
         Refresh an access token for a user.
 
+        The user is read again, bypassing the principal cache, so the new
+        token carries their current profile (stateless claims are copied
+        from it) and deactivated users can't extend their session.
+
         Args:
-            user_id: The user's ID from the current JWT token.
+            user: The user authenticated by the current JWT token.
 
         Returns:
             A new JWT token.
+
+        Raises:
+            HTTPException: If the user no longer exists or is inactive.
         """
-        access_token = create_access_token(data={"sub": user_id})
-        return Token(access_token=access_token)
+        current = await self.user_repository.get_by_id(user.id)
+
+        if not current:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid or expired token",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+
+        if not current.is_active:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="User account is inactive",
+            )
+
+        principal = UserResponse(
+            id=current.id,
+            email=current.email,
+            username=current.username,
+            created_at=current.created_at,
+            is_active=current.is_active,
+        )
+        _PRINCIPAL_CACHE.set(current.id, principal)
+        return Token(access_token=self._access_token(principal))
+
+    def _access_token(self, user: UserResponse) -> str:
+        """Create an access token, with profile claims in stateless mode."""
+        data = {"sub": user.id}
+        if settings.jwt_stateless_claims:
+            data.update(
+                username=user.username,
+                email=user.email,
+                is_active=user.is_active,
+                created_at=user.created_at.isoformat(),
+            )
+        return create_access_token(data=data)
+
+    async def _rehash_password(self, user: UserInDB, password: str) -> None:
+        """
+        Re-hash a verified password at the current bcrypt cost.
+
+        Skipped when the password pool is full; the next login retries.
+        """
+        try:
+            hashed_password = await hash_password_async(password)
+        except PasswordPoolFull:
+            return
+        await self.user_repository.set_password_hash(user.id, hashed_password)
+
+    async def _run_password_task(self, task: Awaitable[T]) -> T:
+        """Await a password pool task, turning a full queue into a 503."""
+        try:
+            return await task
+        except PasswordPoolFull:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many sign-in attempts in progress, try again shortly",
+                headers={"Retry-After": "1"},
+            )
@@ -0,0 +1,59 @@
+"""
+Edge cache purge - Refresh nginx's cached copies of public poll reads.
+"""
+
+import asyncio
+import logging
+import urllib.request
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Request header asking nginx to bypass its cache and store the fresh
+# response; honoured only from the API hosts (see deploy/nginx.conf)
+REFRESH_HEADER = "X-Cache-Refresh"
+
+
+class EdgeCachePurger:
+    """
+    Refreshes nginx's cached poll responses after a poll changes status.
+
+    Open-source nginx can't purge cache entries, so they are replaced
+    instead: the poll is requested through each nginx with the refresh
+    header, which bypasses the cache and stores the new response.
+    Refreshes run in the background; failures are logged, and the entry
+    then expires on its own after POLL_MICRO_CACHE_SECONDS.
+    """
+
+    def __init__(self, base_urls: list[str], timeout: float = 2.0):
+        """
+        Args:
+            base_urls: Base URLs of the nginx servers caching the API.
+            timeout: Seconds to wait for each refresh.
+        """
+        self.base_urls = [url.rstrip("/") for url in base_urls]
+        self.timeout = timeout
+        self._tasks: set[asyncio.Task] = set()
+
+    def purge_poll(self, poll_id: str) -> None:
+        """Refresh a poll's cached responses in the background."""
+        for base_url in self.base_urls:
+            task = asyncio.create_task(self._refresh(f"{base_url}/polls/{poll_id}"))
+            # Keep a reference until done, so the task isn't collected
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _refresh(self, url: str) -> None:
+        try:
+            await asyncio.to_thread(self._get, url)
+        except OSError as exc:
+            logger.warning("Edge cache refresh of %s failed: %s", url, exc)
+
+    def _get(self, url: str) -> None:
+        request = urllib.request.Request(url, headers={REFRESH_HEADER: "1"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+edge_cache = EdgeCachePurger(settings.edge_cache_purge_urls)
@@ -0,0 +1,141 @@
+"""
+Poll scheduler - Closes polls when their closes_at deadline passes.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING
+
+from models.polls import PollStatus
+from services.edge_cache import edge_cache
+from services.poll_service import PollService
+
+if TYPE_CHECKING:
+    from repositories.poll_repository import PollRepository
+
+logger = logging.getLogger(__name__)
+
+# Held by the one worker process that runs the scheduler
+LEASE_NAME = "poll-scheduler"
+
+
+class PollScheduler:
+    """
+    Background task that closes polls at their deadline.
+
+    Every worker runs a scheduler, but only the holder of a shared lease
+    does any work; the others retry at each interval and take over when
+    the lease expires. Each interval the holder loads the deadlines due
+    before the next interval into a min-heap, then sleeps until each one
+    and closes the poll with a conditional status update, so a poll is
+    closed (and its results precomputed) exactly once even if leases
+    overlap or the owner closes it by hand.
+
+    Polls created with a deadline inside the current interval are closed
+    at the next interval; votes are refused from the deadline on.
+    """
+
+    def __init__(
+        self,
+        poll_repository: PollRepository,
+        interval: float = 30.0,
+        lease_seconds: float = 90.0,
+    ):
+        """
+        Initialize the scheduler.
+
+        Args:
+            poll_repository: Repository for poll data access.
+            interval: Seconds between deadline scans (and lease renewals).
+            lease_seconds: How long the lease outlives a stalled holder.
+                Must be longer than interval.
+        """
+        self.poll_repository = poll_repository
+        self.poll_service = PollService(poll_repository)
+        self.interval = interval
+        self.lease_seconds = lease_seconds
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """Start the scheduler on the running event loop."""
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the scheduler and hand the lease over to another worker."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.poll_repository.release_lease(LEASE_NAME, self.holder)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                if await self.poll_repository.acquire_lease(
+                    LEASE_NAME,
+                    self.holder,
+                    self.lease_seconds,
+                ):
+                    await self.run_once()
+                    continue
+            except Exception:
+                logger.exception("Poll scheduler pass failed")
+            await asyncio.sleep(self.interval)
+
+    async def run_once(self) -> int:
+        """
+        Close the polls whose deadlines fall within the next interval.
+
+        Returns after the interval has elapsed, closing each poll as its
+        deadline passes. Overdue polls are closed immediately.
+
+        Returns:
+            The number of polls closed.
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        now = datetime.utcnow()
+        polls = await self.poll_repository.get_polls_closing_before(
+            now + timedelta(seconds=self.interval),
+        )
+        deadlines = [(poll.closes_at, poll.id) for poll in polls]
+        heapq.heapify(deadlines)
+
+        closed = 0
+        while deadlines:
+            closes_at, poll_id = heapq.heappop(deadlines)
+            delay = (closes_at - datetime.utcnow()).total_seconds()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if await self._close(poll_id):
+                closed += 1
+
+        remaining = self.interval - (loop.time() - started)
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+        return closed
+
+    async def _close(self, poll_id: str) -> bool:
+        """Close a poll if it is still open and precompute its results."""
+        poll = await self.poll_repository.update_status(
+            poll_id,
+            PollStatus.CLOSED,
+            expected=PollStatus.OPEN,
+        )
+        if poll is None:
+            return False
+        await self.poll_service.precompute_results(poll)
+        edge_cache.purge_poll(poll_id)
+        logger.info("Closed poll %s at its deadline", poll_id)
+        return True
@@ -2,14 +2,23 @@
 Poll service - Business logic for polls and voting.
 """
 
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator
 from datetime import datetime, timezone
+from typing import TYPE_CHECKING
 
 from fastapi import HTTPException, status
 
+from core.cache import TTLCache, publish_invalidation, register_cache
+from core.config import settings
 from models.polls import (
     OptionResult,
+    PollBatchResponse,
     PollCreate,
     PollInDB,
+    PollPage,
     PollResponse,
     PollResults,
     PollStatus,
@@ -17,7 +26,78 @@ from models.polls import (
     VoteInDB,
     VoteResponse,
 )
-from repositories.poll_repository import PollRepository
+from repositories.base import DuplicateVoteError
+from services.edge_cache import edge_cache
+from services.vote_export import VoteExportFormat, encode_votes
+
+if TYPE_CHECKING:
+    from repositories.poll_repository import PollRepository
+
+# Results of polls still open, keyed by poll ID with the revision they were
+# tallied at; closed polls store theirs. Evicted when the poll or its votes
+# change, in any worker, and ignored once the poll's revision has moved on,
+# so a stale tally is never served under a newer ETag.
+_TALLY_CACHE: TTLCache[tuple[int, PollResults]] = register_cache("votes", TTLCache("tallies"))
+register_cache("polls", _TALLY_CACHE)
+
+
+async def _none() -> None:
+    """Placeholder for a step skipped in asyncio.gather."""
+    return None
+
+
+def deadline_passed(poll: PollInDB) -> bool:
+    """Check whether a poll's closes_at is in the past."""
+    if poll.closes_at is None:
+        return False
+    closes_at = poll.closes_at
+    if closes_at.tzinfo is not None:
+        closes_at = closes_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return closes_at <= datetime.utcnow()
+
+
+def _cache_headers(poll: PollInDB, resource: str, public: bool) -> dict[str, str]:
+    """
+    Caching headers for a response derived from a poll.
+
+    The ETag changes with the poll's revision. Closed polls never change
+    again, so their responses may be cached for a long time. Public reads
+    of other polls are micro-cached by nginx (X-Accel-Expires, which nginx
+    doesn't forward) and refreshed by services/edge_cache.py when the
+    poll changes status.
+
+    Args:
+        poll: The poll.
+        resource: Distinguishes the poll's representations, e.g. "results".
+        public: Whether shared caches may store the response.
+    """
+    headers = {"ETag": f'"{poll.id}-{poll.revision}-{resource}"'}
+    if poll.status == PollStatus.CLOSED:
+        visibility = "public" if public else "private"
+        headers["Cache-Control"] = f"{visibility}, max-age={settings.closed_poll_max_age_seconds}"
+    else:
+        headers["Cache-Control"] = "no-cache"
+        if public:
+            headers["X-Accel-Expires"] = str(settings.poll_micro_cache_seconds)
+    if public:
+        headers["Surrogate-Key"] = f"poll-{poll.id}"
+    return headers
+
+
+def _check_not_modified(if_none_match: str | None, headers: dict[str, str]) -> None:
+    """
+    Answer 304 if the client's cached copy matches the current ETag.
+
+    Raises:
+        HTTPException: 304 Not Modified, with the caching headers.
+    """
+    if not if_none_match:
+        return
+    etag = headers["ETag"]
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
 
 
 class PollService:
@@ -45,7 +125,7 @@ class PollService:
         polls = await self.poll_repository.get_by_owner(user_id)
         results = []
         for poll in polls:
-            vote_count = await self.poll_repository.count_votes(poll.id)
+            vote_count = await self._vote_count(poll)
             results.append(self._to_response(poll, vote_count))
         return results
 
@@ -77,18 +157,24 @@ class PollService:
 
         return self._to_response(created_poll, vote_count=0)
 
-    async def get_poll(self, poll_id: str) -> PollResponse:
+    async def get_poll(
+        self,
+        poll_id: str,
+        if_none_match: str | None = None,
+    ) -> tuple[PollResponse, dict[str, str]]:
         """
         Get a poll by its ID.
 
         Args:
             poll_id: The poll's ID.
+            if_none_match: The request's If-None-Match header.
 
         Returns:
-            The poll response.
+            The poll response and its caching headers (ETag, Cache-Control).
 
         Raises:
-            HTTPException: If poll not found.
+            HTTPException: If poll not found, or 304 if the client's copy
+                is current.
         """
         poll = await self.poll_repository.get_by_id(poll_id)
 
@@ -98,9 +184,51 @@ class PollService:
                 detail="Poll not found",
             )
 
-        vote_count = await self.poll_repository.count_votes(poll_id)
+        headers = _cache_headers(poll, "poll", public=True)
+        _check_not_modified(if_none_match, headers)
+
+        vote_count = await self._vote_count(poll)
+
+        return self._to_response(poll, vote_count), headers
+
+    async def get_polls(self, poll_ids: list[str]) -> PollBatchResponse:
+        """
+        Get several polls at once.
+
+        Polls are read with one query and their vote counts with another,
+        instead of two queries per poll.
 
-        return self._to_response(poll, vote_count)
+        Args:
+            poll_ids: The polls' IDs; duplicates are ignored.
+
+        Returns:
+            The polls found, in the order requested, and the IDs not found.
+
+        Raises:
+            HTTPException: If more than poll_batch_max_ids IDs are requested.
+        """
+        poll_ids = list(dict.fromkeys(poll_ids))
+        if len(poll_ids) > settings.poll_batch_max_ids:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"At most {settings.poll_batch_max_ids} polls can be requested at once",
+            )
+
+        polls = {poll.id: poll for poll in await self.poll_repository.get_by_ids(poll_ids)}
+        vote_counts = await self.poll_repository.count_votes_many(
+            [poll.id for poll in polls.values() if not (poll.archive and poll.archive.pruned)]
+        )
+
+        found, missing = [], []
+        for poll_id in poll_ids:
+            poll = polls.get(poll_id)
+            if poll is None:
+                missing.append(poll_id)
+            elif poll.archive and poll.archive.pruned:
+                found.append(self._to_response(poll, poll.archive.vote_count))
+            else:
+                found.append(self._to_response(poll, vote_counts.get(poll_id, 0)))
+        return PollBatchResponse(polls=found, missing=missing)
 
     async def open_poll(self, poll_id: str, user_id: str) -> PollResponse:
         """
@@ -128,6 +256,7 @@ class PollService:
             poll_id,
             PollStatus.OPEN,
         )
+        edge_cache.purge_poll(poll_id)
 
         return self._to_response(updated_poll, vote_count=0)
 
@@ -153,12 +282,22 @@ class PollService:
                 detail="Only open polls can be closed",
             )
 
+        # Conditional, so a poll closed meanwhile by the scheduler isn't closed twice
         updated_poll = await self.poll_repository.update_status(
             poll_id,
             PollStatus.CLOSED,
+            expected=PollStatus.OPEN,
         )
 
-        vote_count = await self.poll_repository.count_votes(poll_id)
+        if updated_poll is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Only open polls can be closed",
+            )
+
+        await self.precompute_results(updated_poll)
+        edge_cache.purge_poll(poll_id)
+        vote_count = await self._vote_count(updated_poll)
 
         return self._to_response(updated_poll, vote_count)
 
@@ -188,7 +327,7 @@ class PollService:
                 detail="Poll not found",
             )
 
-        if poll.status != PollStatus.OPEN:
+        if poll.status != PollStatus.OPEN or deadline_passed(poll):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Poll is not open for voting",
@@ -221,7 +360,16 @@ class PollService:
             rankings=vote_data.rankings,
         )
 
-        created_vote = await self.poll_repository.create_vote(vote_in_db)
+        # The unique voter index catches a concurrent second vote
+        try:
+            created_vote = await self.poll_repository.create_vote(vote_in_db)
+        except DuplicateVoteError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="You have already voted in this poll",
+            )
+        # Other workers are notified through the change stream
+        publish_invalidation("votes", vote_data.poll_id)
 
         return VoteResponse(
             id=created_vote.id,
@@ -235,7 +383,57 @@ class PollService:
         vote = await self.poll_repository.get_vote(poll_id, user_id)
         return vote is not None
 
-    async def get_results(self, poll_id: str, user_id: str | None = None) -> PollResults:
+    async def export_votes(
+        self,
+        poll_id: str,
+        user_id: str,
+        export_format: VoteExportFormat,
+        anonymize: bool = False,
+    ) -> AsyncIterator[bytes]:
+        """
+        Stream a poll's ballots for download.
+
+        Checks run before anything is streamed, so failures are answered
+        with a status code; the votes are then read and encoded one batch
+        at a time (see services/vote_export.py).
+
+        Args:
+            poll_id: The poll's ID.
+            user_id: The ID of the requesting user.
+            export_format: NDJSON or CSV.
+            anonymize: Replace all voter IDs with per-export pseudonyms;
+                anonymous voters' IDs, which hold IP addresses, always are.
+
+        Returns:
+            The encoded export, in chunks.
+
+        Raises:
+            HTTPException: If poll not found, user not authorized, or the
+                votes were pruned after archiving.
+        """
+        poll = await self._get_poll_with_auth(poll_id, user_id)
+
+        if poll.archive and poll.archive.pruned:
+            raise HTTPException(
+                status_code=status.HTTP_410_GONE,
+                detail="Poll votes were archived and pruned",
+            )
+
+        batch_size = settings.vote_export_batch_size
+        return encode_votes(
+            self.poll_repository.iter_votes(poll_id, batch_size=batch_size),
+            [option.id for option in poll.options],
+            export_format,
+            anonymize=anonymize,
+            batch_size=batch_size,
+        )
+
+    async def get_results(
+        self,
+        poll_id: str,
+        user_id: str | None = None,
+        if_none_match: str | None = None,
+    ) -> tuple[PollResults, dict[str, str]]:
         """
         Calculate and return poll results using Borda count.
 
@@ -246,12 +444,15 @@ class PollService:
 
         Args:
             poll_id: The poll's ID.
+            user_id: The ID of the requesting user.
+            if_none_match: The request's If-None-Match header.
 
         Returns:
-            The poll results with ranked options.
+            The poll results with ranked options, and their caching headers.
 
         Raises:
-            HTTPException: If poll not found or not closed.
+            HTTPException: If poll not found or not closed, or 304 if the
+                client's copy is current.
         """
         poll = await self.poll_repository.get_by_id(poll_id)
 
@@ -268,10 +469,104 @@ class PollService:
                 detail="Results are only available after the poll is closed",
             )
 
-        votes = await self.poll_repository.get_votes_for_poll(poll_id)
+        # Checked before any tally: results only change with the revision
+        headers = _cache_headers(poll, "results", public=False)
+        _check_not_modified(if_none_match, headers)
+
+        return await self._results(poll), headers
+
+    async def get_poll_page(
+        self,
+        poll_id: str,
+        voter_id: str,
+        user_id: str | None = None,
+    ) -> PollPage:
+        """
+        Get everything the vote page shows for a poll, reading the poll once.
+
+        The vote count, the voter's vote and the results are then read
+        concurrently.
+
+        Args:
+            poll_id: The poll's ID.
+            voter_id: The voter identifier checked for an existing vote.
+            user_id: The ID of the requesting user, if authenticated.
+
+        Returns:
+            The poll, whether the voter has voted, and the results if the
+            requester may see them (the poll is closed, or they own it).
+
+        Raises:
+            HTTPException: If poll not found.
+        """
+        poll = await self.poll_repository.get_by_id(poll_id)
+
+        if not poll:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Poll not found",
+            )
+
+        # Same rule as get_results
+        show_results = poll.status == PollStatus.CLOSED or poll.owner_id == user_id
+        vote_count, has_voted, results = await asyncio.gather(
+            self._vote_count(poll),
+            self.has_user_voted(poll_id, voter_id),
+            self._results(poll) if show_results else _none(),
+        )
+        return PollPage(
+            poll=self._to_response(poll, vote_count),
+            has_voted=has_voted,
+            results=results,
+        )
+
+    async def precompute_results(self, poll: PollInDB) -> PollResults:
+        """
+        Calculate a closed poll's results and store them on the poll.
+
+        Closed polls accept no more votes, so stored results stay valid
+        and get_results serves them without tallying again.
+
+        Args:
+            poll: The closed poll.
+
+        Returns:
+            The stored results.
+        """
+        results = await self._calculate_results(poll)
+        await self.poll_repository.set_results(poll.id, results)
+        return results
+
+    async def _results(self, poll: PollInDB) -> PollResults:
+        """A poll's results: stored once closed, otherwise tallied and cached."""
+        if poll.status == PollStatus.CLOSED and poll.results:
+            return poll.results
+
+        cached = _TALLY_CACHE.get(poll.id)
+        if cached is not None and cached[0] == poll.revision:
+            return cached[1]
+        results = await self._calculate_results(poll)
+        _TALLY_CACHE.set(poll.id, (poll.revision, results))
+        return results
 
-        # Calculate Borda count scores
-        scores = self._calculate_borda_count(poll, votes)
+    async def _calculate_results(self, poll: PollInDB) -> PollResults:
+        """Tally a poll's votes using Borda count."""
+        poll_id = poll.id
+        if poll.archive:
+            # Archived polls are tallied from the archive file, which
+            # holds every ballot even once the stored votes are pruned
+            from services.archive_service import ArchiveService
+
+            archive_service = ArchiveService(self.poll_repository, settings.archive_dir)
+            scores = dict(await archive_service.tally(poll))
+            total_votes = poll.archive.vote_count
+        else:
+            # Borda count scores are summed by the repository
+            scores = await self.poll_repository.get_borda_scores(
+                poll_id,
+                [opt.id for opt in poll.options],
+            )
+            total_votes = await self.poll_repository.count_votes(poll_id)
 
         # Build sorted results
         option_labels = {opt.id: opt.label for opt in poll.options}
@@ -290,37 +585,11 @@ class PollService:
         return PollResults(
             poll_id=poll_id,
             title=poll.title,
-            total_votes=len(votes),
+            total_votes=total_votes,
             results=results,
             calculated_at=datetime.now(timezone.utc),
         )
 
-    def _calculate_borda_count(
-        self,
-        poll: PollInDB,
-        votes: list[VoteInDB],
-    ) -> dict[str, float]:
-        """
-        Calculate Borda count scores for poll options.
-
-        Args:
-            poll: The poll with options.
-            votes: List of votes with rankings.
-
-        Returns:
-            Dictionary mapping option IDs to their scores.
-        """
-        n_options = len(poll.options)
-        scores: dict[str, float] = {opt.id: 0.0 for opt in poll.options}
-
-        for vote in votes:
-            for ranking in vote.rankings:
-                # Borda count: n - rank + 1 points
-                points = n_options - ranking.rank + 1
-                scores[ranking.option_id] += points
-
-        return scores
-
     async def _get_poll_with_auth(
         self,
         poll_id: str,
@@ -343,6 +612,12 @@ class PollService:
 
         return poll
 
+    async def _vote_count(self, poll: PollInDB) -> int:
+        """Count a poll's votes, from its archive once they are pruned."""
+        if poll.archive and poll.archive.pruned:
+            return poll.archive.vote_count
+        return await self.poll_repository.count_votes(poll.id)
+
     def _to_response(self, poll: PollInDB, vote_count: int) -> PollResponse:
         """Convert a poll database model to a response model."""
         return PollResponse(
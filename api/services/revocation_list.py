@@ -0,0 +1,99 @@
+"""
+Revocation list - Deactivated users whose stateless tokens are refused.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import TYPE_CHECKING
+
+from core.cache import register_cache
+
+if TYPE_CHECKING:
+    from repositories.user_repository import UserRepository
+
+logger = logging.getLogger(__name__)
+
+
+class RevocationList:
+    """
+    In-memory set of user IDs whose access tokens must be refused.
+
+    Tokens checked by /auth/verify, and tokens issued with stateless
+    claims, are accepted without reading the user, so deactivated accounts
+    are found here instead. The set is
+    reloaded every ``interval`` seconds, and promptly after any user
+    change: it is registered for the users collection in ``core.cache``,
+    whose invalidation events trigger an early reload.
+    """
+
+    def __init__(self):
+        self.revoked: frozenset[str] = frozenset()
+        self.interval = 30.0
+        self.user_repository: UserRepository | None = None
+        self._changed = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def is_revoked(self, user_id: str) -> bool:
+        """Check whether a user's tokens are revoked."""
+        return user_id in self.revoked
+
+    async def refresh(self, user_repository: UserRepository) -> None:
+        """
+        Reload the revoked user IDs.
+
+        Args:
+            user_repository: Repository for user data access.
+        """
+        self.revoked = frozenset(await user_repository.get_inactive_ids())
+
+    def start(self, user_repository: UserRepository, interval: float) -> None:
+        """
+        Start reloading the list on the running event loop.
+
+        Args:
+            user_repository: Repository for user data access.
+            interval: Seconds between reloads.
+        """
+        self.user_repository = user_repository
+        self.interval = interval
+        self._changed = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop reloading the list."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            self._changed.clear()
+            try:
+                await self.refresh(self.user_repository)
+            except Exception:
+                logger.exception("Revocation list refresh failed")
+            try:
+                await asyncio.wait_for(self._changed.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    # Invalidation hooks, called by core.cache.publish_invalidation
+
+    def invalidate(self, key: str) -> None:
+        """A user changed: reload soon."""
+        self._changed.set()
+
+    def clear(self) -> None:
+        """Users may have changed: reload soon."""
+        self._changed.set()
+
+
+# Registered like a cache, so user changes trigger a reload
+revocation_list = RevocationList()
+register_cache("users", revocation_list)
@@ -0,0 +1,118 @@
+"""
+Tally engine - Results algorithms over ballot rank matrices.
+
+Ballots are given as a rank matrix: one row per ballot, one column per
+option, holding the rank given to that option or 0 if unranked (the layout
+of ``repositories.ballot_archive``). Matrices are processed in chunks, so
+memory-mapped archives of any size are tallied in bounded memory.
+"""
+
+from collections.abc import Callable, Iterable
+from enum import Enum
+
+import numpy as np
+
+# Chunks of the rank matrix; called again for every pass over the ballots
+ChunkSource = Callable[[], Iterable[np.ndarray]]
+
+# (column, score) pairs in finishing order, best first
+Standings = list[tuple[int, float]]
+
+
+class TallyAlgorithm(str, Enum):
+    """Supported results algorithms."""
+
+    BORDA = "borda"
+    PLURALITY = "plurality"
+    INSTANT_RUNOFF = "instant_runoff"
+
+
+def _by_score(totals: np.ndarray) -> Standings:
+    order = sorted(range(len(totals)), key=lambda column: totals[column], reverse=True)
+    return [(column, float(totals[column])) for column in order]
+
+
+def borda(chunks: ChunkSource, n_options: int) -> Standings:
+    """Borda count: each ranked option earns n - rank + 1 points."""
+    totals = np.zeros(n_options, dtype=np.int64)
+    for chunk in chunks():
+        # Summed per column as (n + 1) x times ranked - sum of ranks, so
+        # the chunk is reduced in its own dtype instead of copied wider
+        ranked = np.count_nonzero(chunk, axis=0)
+        totals += (n_options + 1) * ranked - chunk.sum(axis=0, dtype=np.int64)
+    return _by_score(totals)
+
+
+def plurality(chunks: ChunkSource, n_options: int) -> Standings:
+    """Plurality: count first-place rankings only."""
+    totals = np.zeros(n_options, dtype=np.int64)
+    for chunk in chunks():
+        totals += (chunk == 1).sum(axis=0)
+    return _by_score(totals)
+
+
+def instant_runoff(chunks: ChunkSource, n_options: int) -> Standings:
+    """
+    Instant runoff: eliminate the option with the fewest top preferences
+    among continuing options until one holds a majority.
+
+    Each pass over the ballots counts every ballot for its best-ranked
+    continuing option. Ties for elimination drop the lowest column.
+    Scores are the votes each option held in the last round it took
+    part in; eliminated options finish in reverse order of elimination.
+    """
+    continuing = np.ones(n_options, dtype=bool)
+    final_counts = np.zeros(n_options, dtype=np.int64)
+    eliminated: list[int] = []
+    unranked = np.iinfo(np.int64).max
+
+    while True:
+        counts = np.zeros(n_options, dtype=np.int64)
+        for chunk in chunks():
+            ranks = chunk.astype(np.int64)
+            ranks[ranks == 0] = unranked
+            ranks[:, ~continuing] = unranked
+            top = ranks.argmin(axis=1)
+            active = ranks[np.arange(len(ranks)), top] != unranked
+            counts += np.bincount(top[active], minlength=n_options)
+
+        final_counts[continuing] = counts[continuing]
+        if continuing.sum() <= 1 or counts.max() * 2 > counts.sum():
+            break
+
+        standing = np.flatnonzero(continuing)
+        loser = int(standing[counts[standing].argmin()])
+        continuing[loser] = False
+        eliminated.append(loser)
+
+    remaining = _by_score(np.where(continuing, final_counts, -1))[:n_options - len(eliminated)]
+    return remaining + [
+        (column, float(final_counts[column])) for column in reversed(eliminated)
+    ]
+
+
+ALGORITHMS: dict[TallyAlgorithm, Callable[[ChunkSource, int], Standings]] = {
+    TallyAlgorithm.BORDA: borda,
+    TallyAlgorithm.PLURALITY: plurality,
+    TallyAlgorithm.INSTANT_RUNOFF: instant_runoff,
+}
+
+
+def tally(
+    algorithm: TallyAlgorithm,
+    chunks: ChunkSource,
+    option_ids: list[str],
+) -> list[tuple[str, float]]:
+    """
+    Run a results algorithm over a rank matrix.
+
+    Args:
+        algorithm: The algorithm to run.
+        chunks: Callable returning the rank matrix chunks.
+        option_ids: Option ID for each column.
+
+    Returns:
+        (option ID, score) pairs in finishing order, winner first.
+    """
+    standings = ALGORITHMS[algorithm](chunks, len(option_ids))
+    return [(option_ids[column], score) for column, score in standings]
@@ -0,0 +1,118 @@
+"""
+Vote export - Encode a poll's ballots as NDJSON or CSV, batch by batch.
+"""
+
+import csv
+import hashlib
+import hmac
+import io
+import json
+import secrets
+from collections.abc import AsyncIterator
+from enum import Enum
+
+from models.polls import VoteInDB
+
+
+class VoteExportFormat(str, Enum):
+    """Supported ballot export formats."""
+
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+MEDIA_TYPES = {
+    VoteExportFormat.NDJSON: "application/x-ndjson",
+    VoteExportFormat.CSV: "text/csv; charset=utf-8",
+}
+
+# Voter IDs of anonymous votes, which embed the voter's IP address
+# (see routers/poll_router.py)
+ANONYMOUS_VOTER_PREFIX = "anon:"
+
+
+def voter_pseudonymizer(anonymize: bool = True):
+    """
+    Build a function replacing voter IDs with pseudonyms.
+
+    Pseudonyms are keyed with a random per-export secret: the same voter
+    gets the same pseudonym within one export, but exports can't be joined
+    with each other or reversed to user IDs or IP addresses.
+
+    Args:
+        anonymize: Replace every voter ID. Otherwise only anonymous
+            voters' IDs are replaced, keeping their ``anon:`` prefix,
+            so exports never reveal IP addresses.
+    """
+    key = secrets.token_bytes(32)
+
+    def digest(voter_id: str) -> str:
+        return hmac.new(key, voter_id.encode("utf-8"), hashlib.sha256).hexdigest()[:16]
+
+    def pseudonym(voter_id: str) -> str:
+        if voter_id.startswith(ANONYMOUS_VOTER_PREFIX):
+            return ANONYMOUS_VOTER_PREFIX + digest(voter_id)
+        return digest(voter_id) if anonymize else voter_id
+
+    return pseudonym
+
+
+async def encode_votes(
+    votes: AsyncIterator[VoteInDB],
+    option_ids: list[str],
+    export_format: VoteExportFormat,
+    anonymize: bool = False,
+    batch_size: int = 1000,
+) -> AsyncIterator[bytes]:
+    """
+    Encode votes for download, one chunk per batch of votes.
+
+    Only one batch is held in memory. The caller's consumer (e.g. a
+    StreamingResponse) pulls chunks as the client reads them, so a slow
+    client slows the database reads down rather than buffering the poll.
+
+    Args:
+        votes: The poll's votes, e.g. from ``PollRepository.iter_votes``.
+        option_ids: The poll's option IDs, the CSV rank columns.
+        export_format: NDJSON (one vote object per line) or CSV (one row
+            per vote, the rank of each option in its own column).
+        anonymize: Replace all voter IDs with per-export pseudonyms.
+            Anonymous voters' IDs are replaced either way.
+        batch_size: Votes encoded per chunk.
+
+    Yields:
+        Encoded chunks.
+    """
+    voter = voter_pseudonymizer(anonymize)
+    buffer = io.StringIO()
+    writer = None
+    if export_format == VoteExportFormat.CSV:
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(["voter_id", "submitted_at", *option_ids])
+
+    pending = 0
+    async for vote in votes:
+        ranks = {choice.option_id: choice.rank for choice in vote.rankings}
+        if writer is not None:
+            writer.writerow([
+                voter(vote.user_id),
+                vote.submitted_at.isoformat(),
+                *(ranks.get(option_id, "") for option_id in option_ids),
+            ])
+        else:
+            buffer.write(json.dumps({
+                "voter_id": voter(vote.user_id),
+                "submitted_at": vote.submitted_at.isoformat(),
+                "rankings": ranks,
+            }, separators=(",", ":")))
+            buffer.write("\n")
+
+        pending += 1
+        if pending >= batch_size:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
@@ -0,0 +1,446 @@
+"""
+Vote import - Load ballots from BLT or CSV election files into a poll.
+
+Files are parsed as they are read, validated and written in batches, so
+memory stays constant however many ballots a file holds. Every ballot an
+import writes gets the voter ID ``import:<import id>:<n>``, n counting the
+valid ballots of the file. Running the same import again after a crash
+counts the ballots already written and skips that many, so a partial
+import resumes without duplicating any.
+
+Formats:
+
+- BLT (OpenSTV, Droop and others): a ``<candidates> <seats>`` header,
+  then one ``<weight> <c1> <c2> ... 0`` line per ballot, candidates
+  numbered from 1 in the poll's option order, a ``0`` line, then the
+  candidate names. Tied preferences (``=``) aren't supported.
+- CSV with a header row and one row per ballot, in either layout: one
+  column per option (matched by ID or label) holding its rank, as
+  exported by GET /polls/{id}/votes/export; or ranked columns ("Rank 1",
+  "Rank 2", ...) holding option IDs or labels in preference order.
+  ``voter_id`` and ``submitted_at`` columns are ignored, and a ``weight``
+  or ``count`` column repeats the ballot.
+
+A ballot line's weight is at most VOTE_IMPORT_MAX_WEIGHT; heavier lines
+are rejected.
+"""
+
+from __future__ import annotations
+
+import codecs
+import csv
+import logging
+from collections.abc import AsyncIterator, Callable
+from enum import Enum
+from typing import TYPE_CHECKING, NamedTuple
+
+from fastapi import HTTPException, status
+
+from core.cache import publish_invalidation
+from core.config import settings
+from models.polls import (
+    PollInDB,
+    PollOption,
+    PollStatus,
+    RankedChoice,
+    VoteImportProgress,
+    VoteImportReport,
+    VoteInDB,
+)
+from repositories.base import DuplicateVoteError
+from services.poll_service import deadline_passed
+
+if TYPE_CHECKING:
+    from repositories.poll_repository import PollRepository
+
+logger = logging.getLogger(__name__)
+
+# Rejected ballots listed in an import report
+_MAX_REPORTED_ERRORS = 20
+
+_CSV_META_COLUMNS = {"voter_id", "submitted_at"}
+_CSV_WEIGHT_COLUMNS = {"weight", "count"}
+
+
+class VoteImportFormat(str, Enum):
+    """Supported ballot import formats."""
+
+    BLT = "blt"
+    CSV = "csv"
+
+
+class BallotFileError(ValueError):
+    """The file can't be read as the given format."""
+
+
+class ParsedBallot(NamedTuple):
+    """
+    A ballot line read from a file: option IDs in preference order and how
+    many ballots the line stands for, or why it's invalid.
+    """
+
+    line: int
+    option_ids: list[str] | None
+    error: str | None = None
+    weight: int = 1
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    Split a stream of UTF-8 bytes into lines, decoding incrementally.
+
+    A last line without a newline is only yielded once the stream ends
+    normally, so an interrupted upload never yields a truncated line.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    try:
+        async for chunk in chunks:
+            pending += decoder.decode(chunk)
+            *lines, pending = pending.split("\n")
+            for line in lines:
+                yield line.rstrip("\r")
+        pending += decoder.decode(b"", final=True)
+    except UnicodeDecodeError as exc:
+        raise BallotFileError(f"File is not valid UTF-8: {exc}") from exc
+    if pending:
+        yield pending.rstrip("\r")
+
+
+def _checked(line: int, option_ids: list[str], weight: int = 1) -> ParsedBallot:
+    """Validate a ballot's preferences and weight."""
+    if not 1 <= weight <= settings.vote_import_max_weight:
+        return ParsedBallot(
+            line,
+            None,
+            f"weight must be between 1 and {settings.vote_import_max_weight}",
+        )
+    if not option_ids:
+        return ParsedBallot(line, None, "ballot ranks no options")
+    if len(set(option_ids)) != len(option_ids):
+        return ParsedBallot(line, None, "ballot ranks an option twice")
+    return ParsedBallot(line, option_ids, weight=weight)
+
+
+async def parse_blt(
+    lines: AsyncIterator[str],
+    options: list[PollOption],
+    warnings: list[str],
+) -> AsyncIterator[ParsedBallot]:
+    """
+    Parse a BLT file, yielding one ParsedBallot per ballot line.
+
+    Args:
+        lines: The file's lines.
+        options: The poll's options; candidate k is options[k - 1].
+        warnings: Receives problems that don't invalidate any ballot.
+
+    Raises:
+        BallotFileError: If the header is missing or doesn't match the poll.
+    """
+    number = 0
+    section = "header"
+    names: list[str] = []
+    async for line in lines:
+        number += 1
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+
+        if section == "header":
+            try:
+                candidates, _ = (int(field) for field in line.split())
+            except ValueError:
+                raise BallotFileError(f"Line {number}: expected '<candidates> <seats>'") from None
+            if candidates != len(options):
+                raise BallotFileError(
+                    f"File has {candidates} candidates, the poll has {len(options)} options"
+                )
+            section = "ballots"
+        elif section == "names":
+            names.append(line.strip('"'))
+        elif line == "0":
+            section = "names"
+        elif line.startswith("-"):
+            # Withdrawn candidates; their preferences are kept
+            continue
+        else:
+            yield _parse_blt_ballot(number, line, options)
+
+    if section != "names":
+        warnings.append("File ended before the end of the ballots (a line with 0)")
+        return
+    for option, name in zip(options, names):
+        if name.lower() != option.label.lower():
+            warnings.append(f"Candidate {name!r} was imported as option {option.label!r}")
+
+
+def _parse_blt_ballot(number: int, line: str, options: list[PollOption]) -> ParsedBallot:
+    """Parse a '<weight> <c1> <c2> ... 0' ballot line, with an optional '(id)' first."""
+    tokens = line.split()
+    if tokens[0].startswith("("):
+        tokens = tokens[1:]
+    if len(tokens) < 2 or tokens[-1] != "0":
+        return ParsedBallot(number, None, "ballot doesn't end with 0")
+    try:
+        weight = int(tokens[0])
+    except ValueError:
+        return ParsedBallot(number, None, "expected an integer weight")
+    option_ids = []
+    for token in tokens[1:-1]:
+        if not token.isdigit() or not 1 <= int(token) <= len(options):
+            return ParsedBallot(number, None, f"unknown or tied candidate {token!r}")
+        option_ids.append(options[int(token) - 1].id)
+    return _checked(number, option_ids, weight)
+
+
+async def parse_csv(
+    lines: AsyncIterator[str],
+    options: list[PollOption],
+    warnings: list[str],
+) -> AsyncIterator[ParsedBallot]:
+    """
+    Parse a CSV ballot file, yielding one ParsedBallot per row.
+
+    Args:
+        lines: The file's lines. Quoted fields can't span lines.
+        options: The poll's options, matched by ID or label.
+        warnings: Receives problems that don't invalidate any ballot.
+
+    Raises:
+        BallotFileError: If the header row is missing.
+    """
+    by_key: dict[str, str] = {}
+    for option in options:
+        by_key[option.label.strip().lower()] = option.id
+    for option in options:
+        by_key[option.id.lower()] = option.id
+
+    number = 0
+    header: list[str] | None = None
+    async for line in lines:
+        number += 1
+        if not line.strip():
+            continue
+        row = next(csv.reader([line]))
+
+        if header is None:
+            header = [column.strip().lower() for column in row]
+            weight_column = next(
+                (i for i, column in enumerate(header) if column in _CSV_WEIGHT_COLUMNS),
+                None,
+            )
+            columns = [
+                i for i, column in enumerate(header)
+                if column not in _CSV_META_COLUMNS and i != weight_column
+            ]
+            if not columns:
+                raise BallotFileError("Header row has no ballot columns")
+            # One column per option holding ranks, or ranked columns holding options
+            rank_columns = {i: by_key[header[i]] for i in columns if header[i] in by_key}
+            by_rank = len(rank_columns) == len(columns)
+            continue
+
+        weight = 1
+        if weight_column is not None and weight_column < len(row) and row[weight_column].strip():
+            try:
+                weight = int(row[weight_column])
+            except ValueError:
+                yield ParsedBallot(number, None, "expected an integer weight")
+                continue
+
+        cells = [(i, row[i].strip()) for i in columns if i < len(row) and row[i].strip()]
+        if by_rank:
+            try:
+                ranked = sorted((int(cell), rank_columns[i]) for i, cell in cells)
+            except ValueError:
+                yield ParsedBallot(number, None, "ranks must be integers")
+                continue
+            ranks = [rank for rank, _ in ranked]
+            if len(set(ranks)) != len(ranks) or (ranks and ranks[0] < 1):
+                yield ParsedBallot(number, None, "ranks must be distinct and at least 1")
+                continue
+            yield _checked(number, [option_id for _, option_id in ranked], weight)
+        else:
+            unknown = [cell for _, cell in cells if cell.lower() not in by_key]
+            if unknown:
+                yield ParsedBallot(number, None, f"unknown option {unknown[0]!r}")
+                continue
+            yield _checked(number, [by_key[cell.lower()] for _, cell in cells], weight)
+
+    if header is None:
+        raise BallotFileError("File is empty")
+
+
+_PARSERS = {
+    VoteImportFormat.BLT: parse_blt,
+    VoteImportFormat.CSV: parse_csv,
+}
+
+
+class VoteImportService:
+    """Service importing ballots from election files into polls."""
+
+    def __init__(self, poll_repository: PollRepository):
+        """
+        Initialize the vote import service.
+
+        Args:
+            poll_repository: Repository for poll data access.
+        """
+        self.poll_repository = poll_repository
+
+    async def import_votes(
+        self,
+        poll_id: str,
+        chunks: AsyncIterator[bytes],
+        import_format: VoteImportFormat,
+        import_id: str,
+        owner_id: str | None = None,
+        on_progress: Callable[[VoteImportReport], None] | None = None,
+    ) -> VoteImportReport:
+        """
+        Import the ballots of an election file into a poll.
+
+        Args:
+            poll_id: The poll's ID.
+            chunks: The file's content, e.g. a request body stream.
+            import_format: BLT or CSV.
+            import_id: Identifies the file; run the same import again to
+                resume it after a failure.
+            owner_id: The requesting user, who must own the poll; None
+                skips the check (maintenance CLI).
+            on_progress: Called with the report so far after each batch.
+
+        Returns:
+            How many ballots were imported, skipped or rejected.
+
+        Raises:
+            HTTPException: If poll not found, user not authorized, the poll
+                is closed or past its deadline, the file can't be read before any ballot, or
+                an import with the same ID is writing concurrently.
+        """
+        poll = await self._get_poll(poll_id, owner_id)
+        # Drafts accept imports; like votes, none from the deadline on
+        if poll.status == PollStatus.CLOSED or deadline_passed(poll):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Poll is not open for voting",
+            )
+
+        prefix = _voter_prefix(import_id)
+        already_imported = await self.poll_repository.count_votes_by_voter_prefix(poll_id, prefix)
+        report = VoteImportReport(
+            import_id=import_id,
+            imported=0,
+            skipped=0,
+            rejected=0,
+            complete=False,
+        )
+        batch: list[VoteInDB] = []
+
+        async def flush() -> None:
+            # Taken out of the batch first, so a failed write isn't retried
+            # by the final flush: part of it may be stored already
+            votes = batch[:]
+            batch.clear()
+            try:
+                await self.poll_repository.create_votes(votes)
+            except DuplicateVoteError:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="This import is already running; resume it once it ends",
+                )
+            finally:
+                publish_invalidation("votes", poll_id)
+            report.imported += len(votes)
+            if on_progress is not None:
+                on_progress(report)
+
+        parser = _PARSERS[import_format]
+        sequence = 0
+        try:
+            async for ballot in parser(iter_lines(chunks), poll.options, report.warnings):
+                if ballot.error is not None:
+                    report.rejected += 1
+                    if len(report.errors) < _MAX_REPORTED_ERRORS:
+                        report.errors.append(f"Line {ballot.line}: {ballot.error}")
+                    continue
+
+                rankings = [
+                    RankedChoice(option_id=option_id, rank=rank)
+                    for rank, option_id in enumerate(ballot.option_ids, start=1)
+                ]
+                for _ in range(ballot.weight):
+                    sequence += 1
+                    if sequence <= already_imported:
+                        report.skipped += 1
+                        continue
+                    batch.append(VoteInDB(
+                        poll_id=poll_id,
+                        user_id=f"{prefix}{sequence}",
+                        rankings=rankings,
+                    ))
+                    if len(batch) >= settings.vote_import_batch_size:
+                        await flush()
+            report.complete = True
+        except BallotFileError as exc:
+            if not sequence:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=str(exc),
+                ) from exc
+            report.warnings.append(str(exc))
+        finally:
+            if batch:
+                await flush()
+
+        logger.info(
+            "Import %s into poll %s: %d imported, %d skipped, %d rejected",
+            import_id,
+            poll_id,
+            report.imported,
+            report.skipped,
+            report.rejected,
+        )
+        return report
+
+    async def get_progress(
+        self,
+        poll_id: str,
+        import_id: str,
+        owner_id: str,
+    ) -> VoteImportProgress:
+        """
+        Count the ballots an import has written so far.
+
+        Raises:
+            HTTPException: If poll not found or user not authorized.
+        """
+        await self._get_poll(poll_id, owner_id)
+        imported = await self.poll_repository.count_votes_by_voter_prefix(
+            poll_id,
+            _voter_prefix(import_id),
+        )
+        return VoteImportProgress(import_id=import_id, imported=imported)
+
+    async def _get_poll(self, poll_id: str, owner_id: str | None) -> PollInDB:
+        poll = await self.poll_repository.get_by_id(poll_id)
+
+        if not poll:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Poll not found",
+            )
+
+        if owner_id is not None and poll.owner_id != owner_id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="You do not have permission to modify this poll",
+            )
+
+        return poll
+
+
+def _voter_prefix(import_id: str) -> str:
+    return f"import:{import_id}:"
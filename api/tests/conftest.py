@@ -18,19 +18,29 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from core.compression import CompressionMiddleware
 from core.config import settings
 from core import database
+from dependencies import ServiceContainer
 from routers import auth_router, poll_router, chart_router
 
 
 @pytest.fixture
-async def client() -> AsyncGenerator[AsyncClient, None]:
+async def client(tmp_path: Path) -> AsyncGenerator[AsyncClient, None]:
     """Async HTTP client for testing endpoints."""
-    # Create a fresh MongoDB client for this test's event loop
-    mongo_client = AsyncIOMotorClient(settings.mongodb_url)
-
-    # Override the global client in the database module
-    database._client = mongo_client
+    mongo_client = None
+    if settings.repository_backend == "memory":
+        # Fresh in-memory store for every test
+        database._memory_database = database.MemoryDatabase()
+    elif settings.repository_backend == "sqlite":
+        # Fresh database file for every test
+        database._sqlite_database = database.SQLiteDatabase(str(tmp_path / "test.db"))
+    else:
+        # Create a fresh MongoDB client for this test's event loop
+        mongo_client = AsyncIOMotorClient(settings.mongodb_url)
+
+        # Override the global client in the database module
+        database._client = mongo_client
 
     @asynccontextmanager
     async def test_lifespan(app: FastAPI):
@@ -38,6 +48,7 @@ async def client() -> AsyncGenerator[AsyncClient, None]:
         yield
 
     app = FastAPI(lifespan=test_lifespan)
+    app.state.services = await ServiceContainer.create(database.current_database())
     app.add_middleware(
         CORSMiddleware,
         allow_origins=settings.cors_origins,
@@ -45,6 +56,7 @@ async def client() -> AsyncGenerator[AsyncClient, None]:
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    app.add_middleware(CompressionMiddleware, minimum_size=settings.compression_minimum_size)
     app.include_router(auth_router)
     app.include_router(poll_router)
     app.include_router(chart_router)
@@ -56,8 +68,13 @@ async def client() -> AsyncGenerator[AsyncClient, None]:
         yield ac
 
     # Cleanup
-    mongo_client.close()
+    if mongo_client is not None:
+        mongo_client.close()
+    if database._sqlite_database is not None:
+        database._sqlite_database.close()
     database._client = None
+    database._memory_database = None
+    database._sqlite_database = None
 
 
 @pytest.fixture
@@ -2,11 +2,20 @@
 Tests for authentication endpoints.
 """
 
+import logging
+import sqlite3
 import uuid
 
 import pytest
 from httpx import AsyncClient
 
+from core import security
+from core.config import settings
+from core.database import SQLITE_MIGRATIONS, SQLITE_SCHEMA, SQLiteDatabase, current_database
+from dependencies import get_user_repository
+from repositories.sqlite_repository import SQLiteUserRepository
+from services.revocation_list import revocation_list
+
 
 @pytest.mark.asyncio
 async def test_register_user(client: AsyncClient):
@@ -97,6 +106,62 @@ async def test_login_with_username(client: AsyncClient):
     assert "access_token" in response.json()
 
 
+@pytest.mark.asyncio
+async def test_login_keys_ignore_case(client: AsyncClient):
+    """Test login and duplicate checks ignore the case of email and username."""
+    unique = uuid.uuid4().hex[:8]
+
+    await client.post("/auth/register", json={
+        "email": f"Mixed_{unique}@example.com",
+        "username": f"Mixed_{unique}",
+        "password": "password123",
+    })
+
+    response = await client.post("/auth/login", json={
+        "identifier": f"mixed_{unique}@EXAMPLE.com",
+        "password": "password123",
+    })
+    assert response.status_code == 200
+
+    response = await client.post("/auth/register", json={
+        "email": f"other_{unique}@example.com",
+        "username": f"MIXED_{unique}",
+        "password": "password123",
+    })
+    assert response.status_code == 400
+    assert "Username already taken" in response.json()["detail"]
+
+
+@pytest.mark.asyncio
+async def test_login_rehashes_at_new_cost(client: AsyncClient, monkeypatch):
+    """Test a successful login re-hashes passwords made at another cost."""
+    monkeypatch.setattr(security, "password_rounds", 4)
+    unique = uuid.uuid4().hex[:8]
+
+    await client.post("/auth/register", json={
+        "email": f"rehash_{unique}@example.com",
+        "username": f"rehash_{unique}",
+        "password": "password123",
+    })
+
+    monkeypatch.setattr(security, "password_rounds", 5)
+    response = await client.post("/auth/login", json={
+        "identifier": f"rehash_{unique}",
+        "password": "password123",
+    })
+    assert response.status_code == 200
+
+    user_repository = await get_user_repository(current_database())
+    user = await user_repository.get_by_username(f"rehash_{unique}")
+    assert security.hash_rounds(user.hashed_password) == 5
+
+    response = await client.post("/auth/login", json={
+        "identifier": f"rehash_{unique}",
+        "password": "password123",
+    })
+    assert response.status_code == 200
+
+
 @pytest.mark.asyncio
 async def test_login_wrong_password(client: AsyncClient):
     """Test login with wrong password fails."""
@@ -128,3 +193,149 @@ async def test_get_current_user(client: AsyncClient, auth_headers: dict):
     assert "id" in data
     assert "email" in data
     assert "username" in data
+
+
+@pytest.mark.asyncio
+async def test_stateless_token_revoked(client: AsyncClient, monkeypatch):
+    """Test stateless tokens stop working once the user is deactivated."""
+    monkeypatch.setattr(settings, "jwt_stateless_claims", True)
+    monkeypatch.setattr(revocation_list, "revoked", frozenset())
+    unique = uuid.uuid4().hex[:8]
+
+    await client.post("/auth/register", json={
+        "email": f"stateless_{unique}@example.com",
+        "username": f"stateless_{unique}",
+        "password": "password123",
+    })
+    response = await client.post("/auth/login", json={
+        "identifier": f"stateless_{unique}",
+        "password": "password123",
+    })
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    response = await client.get("/auth/me", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["username"] == f"stateless_{unique}"
+
+    # Deactivate the user and reload the revocation list
+    user_repository = await get_user_repository(current_database())
+    user = await user_repository.get_by_username(f"stateless_{unique}")
+    user.is_active = False
+    await user_repository.update(user.id, user)
+    await revocation_list.refresh(user_repository)
+
+    response = await client.get("/auth/me", headers=headers)
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_stateless_refresh_reads_user(client: AsyncClient, monkeypatch):
+    """Test refreshed stateless tokens carry the current profile, and stop once deactivated."""
+    monkeypatch.setattr(settings, "jwt_stateless_claims", True)
+    monkeypatch.setattr(revocation_list, "revoked", frozenset())
+    unique = uuid.uuid4().hex[:8]
+
+    await client.post("/auth/register", json={
+        "email": f"refresh_{unique}@example.com",
+        "username": f"refresh_{unique}",
+        "password": "password123",
+    })
+    response = await client.post("/auth/login", json={
+        "identifier": f"refresh_{unique}",
+        "password": "password123",
+    })
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    user_repository = await get_user_repository(current_database())
+    user = await user_repository.get_by_username(f"refresh_{unique}")
+    user.username = f"renamed_{unique}"
+    await user_repository.update(user.id, user)
+
+    response = await client.post("/auth/refresh", headers=headers)
+    assert response.status_code == 200
+    claims = security.verify_token(response.json()["access_token"])
+    assert claims["username"] == f"renamed_{unique}"
+
+    # Deactivated, before the revocation list has reloaded
+    user.is_active = False
+    await user_repository.update(user.id, user)
+    response = await client.post("/auth/refresh", headers=headers)
+    assert response.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_verify_token(client: AsyncClient, auth_headers: dict):
+    """Test the auth_request endpoint accepts valid tokens only."""
+    response = await client.get("/auth/verify", headers=auth_headers)
+    assert response.status_code == 204
+    me = await client.get("/auth/me", headers=auth_headers)
+    assert response.headers["X-User-Id"] == me.json()["id"]
+
+    response = await client.get("/auth/verify")
+    assert response.status_code == 401
+
+    response = await client.get("/auth/verify", headers={"Authorization": "Bearer invalid"})
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_verify_token_revoked(client: AsyncClient, auth_headers: dict, monkeypatch):
+    """Test the auth_request endpoint refuses deactivated users without stateless claims."""
+    assert not settings.jwt_stateless_claims
+    monkeypatch.setattr(revocation_list, "revoked", frozenset())
+    me = (await client.get("/auth/me", headers=auth_headers)).json()
+
+    user_repository = await get_user_repository(current_database())
+    user = await user_repository.get_by_id(me["id"])
+    user.is_active = False
+    await user_repository.update(user.id, user)
+    await revocation_list.refresh(user_repository)
+
+    response = await client.get("/auth/verify", headers=auth_headers)
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_login_keys_migration_keeps_case_conflicts(tmp_path, caplog):
+    """Test users whose logins differ only by case survive the login keys migration."""
+    path = str(tmp_path / "old.db")
+    # A database from before login keys, with two such users
+    first_migration = SQLITE_MIGRATIONS.index(
+        "INSERT OR IGNORE INTO login_keys SELECT lower(email), id FROM users"
+    )
+    connection = sqlite3.connect(path)
+    connection.executescript(SQLITE_SCHEMA)
+    for statement in SQLITE_MIGRATIONS[:first_migration]:
+        connection.execute(statement)
+    connection.executemany(
+        "INSERT INTO users VALUES (?, ?, ?, 'hash', '2024-01-01T00:00:00', 1)",
+        [
+            ("older", "Bob@example.com", "Bob"),
+            ("newer", "bob@example.com", "bobby"),
+        ],
+    )
+    connection.execute(f"PRAGMA user_version = {first_migration}")
+    connection.commit()
+    connection.close()
+
+    database = SQLiteDatabase(path)
+    try:
+        repository = SQLiteUserRepository(database)
+        with caplog.at_level(logging.WARNING):
+            await repository.ensure_indexes()
+        assert "older, newer" in caplog.text
+        assert await repository.get_login_conflicts() == {"bob@example.com": ["older", "newer"]}
+
+        assert (await repository.get_by_login("Bob@example.com")).id == "older"
+        assert (await repository.get_by_login("BOB@example.com")).id == "older"
+        assert (await repository.get_by_login("bob@example.com")).id == "newer"
+        assert (await repository.get_by_login("BOBBY")).id == "newer"
+
+        # Resolved once the newer user changes email
+        newer = await repository.get_by_id("newer")
+        newer.email = "robert@example.com"
+        await repository.update("newer", newer)
+        assert await repository.get_login_conflicts() == {}
+        assert (await repository.get_by_login("Robert@example.com")).id == "newer"
+    finally:
+        database.close()
@@ -0,0 +1,96 @@
+"""
+Tests for the packed ballot encoding.
+"""
+
+import pytest
+
+from repositories.ballots import decode_ballot, encode_ballot, iter_ballot
+
+
+def options(count: int) -> tuple[list[str], dict[str, int]]:
+    """An option_index of count options and its positions."""
+    option_index = [f"option-{index}" for index in range(count)]
+    return option_index, {option_id: index for index, option_id in enumerate(option_index)}
+
+
+def rankings(option_ids: list[str]) -> list[dict]:
+    return [{"option_id": option_id, "rank": rank} for rank, option_id in enumerate(option_ids, start=1)]
+
+
+def test_round_trip_one_byte_indices():
+    """Test a ballot over few options packs one byte per rank."""
+    option_index, positions = options(3)
+    ballot = rankings(["option-2", "option-0", "option-1"])
+
+    data = encode_ballot(ballot, positions)
+    assert data == bytes([1, 2, 0, 1])
+    assert decode_ballot(data, option_index) == ballot
+
+
+def test_round_trip_two_byte_indices():
+    """Test a ballot ranking an option past index 255 packs two bytes per rank."""
+    option_index, positions = options(300)
+    ballot = rankings(["option-299", "option-0"])
+
+    data = encode_ballot(ballot, positions)
+    assert data[0] == 2
+    assert len(data) == 1 + 2 * 2
+    assert list(iter_ballot(data)) == [299, 0]
+    assert decode_ballot(data, option_index) == ballot
+
+
+def test_rank_order_independent_of_input_order():
+    """Test rankings are packed by rank, whatever order they are listed in."""
+    option_index, positions = options(3)
+    ballot = [
+        {"option_id": "option-1", "rank": 2},
+        {"option_id": "option-0", "rank": 1},
+    ]
+    assert decode_ballot(encode_ballot(ballot, positions), option_index) == sorted(
+        ballot, key=lambda ranking: ranking["rank"]
+    )
+
+
+def test_empty_ballot():
+    """Test a ballot ranking nothing round-trips."""
+    option_index, positions = options(3)
+    data = encode_ballot([], positions)
+    assert data == b"\x01"
+    assert decode_ballot(data, option_index) == []
+
+
+@pytest.mark.parametrize("ballot", [
+    # Gap: no rank 2
+    [{"option_id": "option-0", "rank": 1}, {"option_id": "option-1", "rank": 3}],
+    # Tie: two options at rank 1
+    [{"option_id": "option-0", "rank": 1}, {"option_id": "option-1", "rank": 1}],
+    # Ranks not starting at 1
+    [{"option_id": "option-0", "rank": 2}],
+    # Option not in the option_index
+    [{"option_id": "unknown", "rank": 1}],
+])
+def test_unpackable_rankings(ballot: list[dict]):
+    """Test rankings that aren't exactly ranks 1..k of known options aren't packed."""
+    _, positions = options(3)
+    assert encode_ballot(ballot, positions) is None
+
+
+@pytest.mark.parametrize("count, width", [
+    (256, 1),
+    (257, 2),
+    (65536, 2),
+])
+def test_index_width_boundaries(count: int, width: int):
+    """Test the index width switches at 256 options."""
+    option_index, positions = options(count)
+    ballot = rankings([option_index[-1], option_index[0]])
+
+    data = encode_ballot(ballot, positions)
+    assert data[0] == width
+    assert decode_ballot(data, option_index) == ballot
+
+
+def test_too_many_options():
+    """Test an index past 65535 can't be packed."""
+    _, positions = options(65537)
+    assert encode_ballot(rankings(["option-65536"]), positions) is None
@@ -2,9 +2,20 @@
 Tests for poll endpoints.
 """
 
+import json
+import sqlite3
+
 import pytest
 from httpx import AsyncClient
 
+from core.config import settings
+from core.database import SQLITE_MIGRATIONS, SQLiteDatabase, current_database
+from dependencies import get_poll_repository
+from models.polls import RankedChoice, VoteInDB
+from repositories.base import DuplicateVoteError
+from services.poll_scheduler import PollScheduler
+from services.vote_import import VoteImportFormat, VoteImportService
+
 
 @pytest.mark.asyncio
 async def test_create_poll(client: AsyncClient, auth_headers: dict):
@@ -179,3 +190,473 @@ async def test_get_poll(client: AsyncClient, auth_headers: dict):
 
     assert response.status_code == 200
     assert response.json()["title"] == "Get test"
+
+
+@pytest.mark.asyncio
+async def test_scheduler_closes_expired_poll(client: AsyncClient, auth_headers: dict):
+    """Test that polls past closes_at refuse votes and are closed by the scheduler."""
+    create_response = await client.post("/polls", headers=auth_headers, json={
+        "title": "Deadline test",
+        "options": [
+            {"id": "1", "label": "A"},
+            {"id": "2", "label": "B"},
+        ],
+        "closes_at": "2000-01-01T00:00:00Z",
+    })
+    poll_id = create_response.json()["id"]
+    await client.post(f"/polls/{poll_id}/open", headers=auth_headers)
+
+    # Votes are refused from the deadline on
+    response = await client.post(f"/polls/{poll_id}/vote", headers=auth_headers, json={
+        "poll_id": poll_id,
+        "rankings": [{"option_id": "1", "rank": 1}],
+    })
+    assert response.status_code == 400
+
+    repository = await get_poll_repository(current_database())
+    assert await PollScheduler(repository, interval=0).run_once() == 1
+    assert await PollScheduler(repository, interval=0).run_once() == 0
+
+    response = await client.get(f"/polls/{poll_id}")
+    assert response.json()["status"] == "closed"
+
+    response = await client.get(f"/polls/{poll_id}/results", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["total_votes"] == 0
+
+
+@pytest.mark.asyncio
+async def test_get_poll_not_modified(client: AsyncClient, auth_headers: dict):
+    """Test conditional GETs answer 304 until the poll changes."""
+    create_response = await client.post("/polls", headers=auth_headers, json={
+        "title": "ETag test",
+        "options": [
+            {"id": "1", "label": "A"},
+            {"id": "2", "label": "B"},
+        ],
+    })
+    poll_id = create_response.json()["id"]
+    await client.post(f"/polls/{poll_id}/open", headers=auth_headers)
+
+    response = await client.get(f"/polls/{poll_id}")
+    etag = response.headers["ETag"]
+    assert response.headers["Cache-Control"] == "no-cache"
+
+    response = await client.get(f"/polls/{poll_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+    # A vote changes the poll's revision
+    await client.post(f"/polls/{poll_id}/vote", headers=auth_headers, json={
+        "poll_id": poll_id,
+        "rankings": [
+            {"option_id": "1", "rank": 1},
+            {"option_id": "2", "rank": 2},
+        ],
+    })
+    response = await client.get(f"/polls/{poll_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json()["vote_count"] == 1
+
+    await client.post(f"/polls/{poll_id}/close", headers=auth_headers)
+    response = await client.get(f"/polls/{poll_id}/results", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"].startswith("private, max-age=")
+
+    response = await client.get(
+        f"/polls/{poll_id}/results",
+        headers={**auth_headers, "If-None-Match": response.headers["ETag"]},
+    )
+    assert response.status_code == 304
+
+
+@pytest.mark.asyncio
+async def test_large_responses_compressed(client: AsyncClient, auth_headers: dict):
+    """Test responses above the size threshold are gzipped, small ones aren't."""
+    options = [{"id": str(i), "label": f"Option number {i}"} for i in range(100)]
+    create_response = await client.post("/polls", headers=auth_headers, json={
+        "title": "Compression test",
+        "options": options,
+    })
+    poll_id = create_response.json()["id"]
+    await client.post(f"/polls/{poll_id}/open", headers=auth_headers)
+    await client.post(f"/polls/{poll_id}/close", headers=auth_headers)
+
+    response = await client.get(f"/polls/{poll_id}", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert response.headers["ETag"].startswith('W/"')
+    assert len(response.json()["options"]) == 100
+
+    # The cached variant is served again, and still matches conditionally
+    again = await client.get(f"/polls/{poll_id}", headers={"Accept-Encoding": "gzip"})
+    assert again.content == response.content
+    response = await client.get(
+        f"/polls/{poll_id}",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["ETag"]},
+    )
+    assert response.status_code == 304
+    # The same validator as the compressed copy being revalidated
+    assert response.headers["ETag"] == again.headers["ETag"]
+
+    response = await client.get(f"/polls/{poll_id}", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in response.headers
+
+    response = await client.get("/auth/me", headers={**auth_headers, "Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+
+
+@pytest.mark.asyncio
+async def test_get_polls_batch(client: AsyncClient, auth_headers: dict):
+    """Test batch lookups return polls in order and report missing IDs."""
+    poll_ids = []
+    for title in ("First", "Second"):
+        create_response = await client.post("/polls", headers=auth_headers, json={
+            "title": title,
+            "options": [
+                {"id": "1", "label": "A"},
+                {"id": "2", "label": "B"},
+            ],
+        })
+        poll_ids.append(create_response.json()["id"])
+    await client.post(f"/polls/{poll_ids[1]}/open", headers=auth_headers)
+    await client.post(f"/polls/{poll_ids[1]}/vote", headers=auth_headers, json={
+        "poll_id": poll_ids[1],
+        "rankings": [
+            {"option_id": "1", "rank": 1},
+            {"option_id": "2", "rank": 2},
+        ],
+    })
+
+    missing_id = "0" * 24
+    response = await client.get(
+        "/polls:batch",
+        params={"ids": f"{poll_ids[1]},{missing_id},{poll_ids[0]}"},
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert [poll["id"] for poll in data["polls"]] == [poll_ids[1], poll_ids[0]]
+    assert [poll["vote_count"] for poll in data["polls"]] == [1, 0]
+    assert data["missing"] == [missing_id]
+
+    response = await client.get(
+        "/polls:batch",
+        params={"ids": [str(i) for i in range(101)]},
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_get_poll_page(client: AsyncClient, auth_headers: dict):
+    """Test the vote page payload combines poll, voted flag and results."""
+    create_response = await client.post("/polls", headers=auth_headers, json={
+        "title": "Page test",
+        "options": [
+            {"id": "1", "label": "A"},
+            {"id": "2", "label": "B"},
+        ],
+    })
+    poll_id = create_response.json()["id"]
+    await client.post(f"/polls/{poll_id}/open", headers=auth_headers)
+
+    response = await client.get(f"/polls/{poll_id}/page")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["poll"]["id"] == poll_id
+    assert data["has_voted"] is False
+    assert data["results"] is None
+
+    await client.post(f"/polls/{poll_id}/vote", headers=auth_headers, json={
+        "poll_id": poll_id,
+        "rankings": [
+            {"option_id": "2", "rank": 1},
+            {"option_id": "1", "rank": 2},
+        ],
+    })
+    response = await client.get(f"/polls/{poll_id}/page", headers=auth_headers)
+    data = response.json()
+    assert data["poll"]["vote_count"] == 1
+    assert data["has_voted"] is True
+    assert data["results"]["results"][0]["option_id"] == "2"
+
+    response = await client.get("/polls/" + "0" * 24 + "/page")
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_export_votes(client: AsyncClient, auth_headers: dict):
+    """Test the poll owner can stream ballots as NDJSON or CSV."""
+    create_response = await client.post("/polls", headers=auth_headers, json={
+        "title": "Export test",
+        "options": [
+            {"id": "1", "label": "A"},
+            {"id": "2", "label": "B"},
+        ],
+    })
+    poll_id = create_response.json()["id"]
+    await client.post(f"/polls/{poll_id}/open", headers=auth_headers)
+    await client.post(f"/polls/{poll_id}/vote", headers=auth_headers, json={
+        "poll_id": poll_id,
+        "rankings": [
+            {"option_id": "2", "rank": 1},
+            {"option_id": "1", "rank": 2},
+        ],
+    })
+    await client.post(f"/polls/{poll_id}/vote", json={
+        "poll_id": poll_id,
+        "rankings": [{"option_id": "1", "rank": 1}],
+    })
+    me = (await client.get("/auth/me", headers=auth_headers)).json()
+
+    response = await client.get(f"/polls/{poll_id}/votes/export", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.headers["Content-Type"] == "application/x-ndjson"
+    votes = [json.loads(line) for line in response.text.splitlines()]
+    assert len(votes) == 2
+    vote = next(vote for vote in votes if vote["voter_id"] == me["id"])
+    assert vote["rankings"] == {"1": 2, "2": 1}
+    # Anonymous voters' IDs hold their IP address, and are never exported
+    anonymous = next(vote for vote in votes if vote["voter_id"] != me["id"])
+    assert anonymous["voter_id"].startswith("anon:")
+    assert "127.0.0.1" not in response.text
+
+    response = await client.get(
+        f"/polls/{poll_id}/votes/export",
+        headers=auth_headers,
+        params={"format": "csv", "anonymize": "true"},
+    )
+    header, *rows = response.text.splitlines()
+    assert header == "voter_id,submitted_at,1,2"
+    ranks = sorted((first, second) for _, _, first, second in (row.split(",") for row in rows))
+    assert ranks == [("1", ""), ("2", "1")]
+    assert me["id"] not in response.text
+    assert "127.0.0.1" not in response.text
+
+    response = await client.get(f"/polls/{poll_id}/votes/export")
+    assert response.status_code in (401, 403)
+
+
+@pytest.mark.asyncio
+async def test_import_votes(client: AsyncClient, auth_headers: dict):
+    """Test the poll owner can import BLT and CSV ballots, resumably."""
+    create_response = await client.post("/polls", headers=auth_headers, json={
+        "title": "Import test",
+        "options": [
+            {"id": "1", "label": "A"},
+            {"id": "2", "label": "B"},
+            {"id": "3", "label": "C"},
+        ],
+    })
+    poll_id = create_response.json()["id"]
+    blt = "3 1\n2 1 2 0\n1 3 0\n1 3 3 0\n0\n\"A\"\n\"B\"\n\"C\"\n\"Import test\"\n"
+
+    # An upload cut off mid-file imports the ballots read so far
+    response = await client.post(
+        f"/polls/{poll_id}/votes/import",
+        headers=auth_headers,
+        params={"format": "blt", "import_id": "ballots.blt"},
+        content=blt[:blt.index("1 3 3")],
+    )
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["imported"], report["complete"]) == (3, True)
+    assert report["warnings"]
+
+    # Sending the whole file again imports only the rest
+    response = await client.post(
+        f"/polls/{poll_id}/votes/import",
+        headers=auth_headers,
+        params={"format": "blt", "import_id": "ballots.blt"},
+        content=blt,
+    )
+    report = response.json()
+    assert (report["imported"], report["skipped"], report["rejected"]) == (0, 3, 1)
+    assert report["errors"] == ["Line 4: ballot ranks an option twice"]
+    assert report["warnings"] == []
+
+    response = await client.get(
+        f"/polls/{poll_id}/votes/import/ballots.blt",
+        headers=auth_headers,
+    )
+    assert response.json() == {"import_id": "ballots.blt", "imported": 3}
+
+    response = await client.post(
+        f"/polls/{poll_id}/votes/import",
+        headers=auth_headers,
+        params={"format": "csv", "import_id": "ballots.csv"},
+        content="Rank 1,Rank 2\nB,a\nC,\n",
+    )
+    assert response.json()["imported"] == 2
+
+    export = await client.get(f"/polls/{poll_id}/votes/export", headers=auth_headers)
+    rankings = sorted(json.dumps(json.loads(line)["rankings"]) for line in export.text.splitlines())
+    assert rankings == sorted([
+        '{"1": 1, "2": 2}', '{"1": 1, "2": 2}', '{"3": 1}', '{"2": 1, "1": 2}', '{"3": 1}',
+    ])
+
+    response = await client.post(
+        f"/polls/{poll_id}/votes/import",
+        headers=auth_headers,
+        params={"format": "blt", "import_id": "wrong.blt"},
+        content="2 1\n1 1 0\n0\n",
+    )
+    assert response.status_code == 400
+
+    response = await client.post(
+        f"/polls/{poll_id}/votes/import",
+        params={"format": "blt", "import_id": "ballots.blt"},
+        content=blt,
+    )
+    assert response.status_code in (401, 403)
+
+
+@pytest.mark.asyncio
+async def test_one_vote_per_voter(client: AsyncClient, auth_headers: dict):
+    """Test the repository rejects a second vote by the same voter."""
+    create_response = await client.post("/polls", headers=auth_headers, json={
+        "title": "Unique voter test",
+        "options": [
+            {"id": "1", "label": "A"},
+            {"id": "2", "label": "B"},
+        ],
+    })
+    poll_id = create_response.json()["id"]
+    repository = await get_poll_repository(current_database())
+    rankings = [RankedChoice(option_id="1", rank=1)]
+
+    await repository.create_votes([])
+    assert await repository.count_votes_by_voter_prefix(poll_id, "") == 0
+
+    await repository.create_vote(VoteInDB(poll_id=poll_id, user_id="a", rankings=rankings))
+    with pytest.raises(DuplicateVoteError):
+        await repository.create_vote(VoteInDB(poll_id=poll_id, user_id="a", rankings=rankings))
+    with pytest.raises(DuplicateVoteError):
+        await repository.create_votes([
+            VoteInDB(poll_id=poll_id, user_id="b", rankings=rankings),
+            VoteInDB(poll_id=poll_id, user_id="a", rankings=rankings),
+        ])
+    assert await repository.count_votes_by_voter_prefix(poll_id, "") >= 1
+    assert await repository.get_vote(poll_id, "a") is not None
+
+
+def test_sqlite_migration_drops_repeat_votes(tmp_path):
+    """Test upgrading a SQLite database keeps each voter's first vote."""
+    path = str(tmp_path / "old.db")
+    SQLiteDatabase(path).close()
+    connection = sqlite3.connect(path)
+    connection.executescript("""
+        DROP INDEX votes_poll_user;
+        CREATE INDEX votes_poll_user ON votes (poll_id, user_id);
+        INSERT INTO votes VALUES ('v1', 'p', 'a', '[]', '2024-01-01T00:00:00');
+        INSERT INTO votes VALUES ('v2', 'p', 'a', '[]', '2024-01-02T00:00:00');
+        INSERT INTO votes VALUES ('v3', 'p', 'b', '[]', '2024-01-02T00:00:00');
+    """)
+    # As before the migration deleting repeat votes
+    version = SQLITE_MIGRATIONS.index("DROP INDEX IF EXISTS votes_poll_user") - 1
+    connection.execute(f"PRAGMA user_version = {version}")
+    connection.commit()
+    connection.close()
+
+    SQLiteDatabase(path).close()
+    connection = sqlite3.connect(path)
+    assert [row[0] for row in connection.execute("SELECT id FROM votes ORDER BY id")] == ["v1", "v3"]
+    with pytest.raises(sqlite3.IntegrityError):
+        connection.execute("INSERT INTO votes VALUES ('v4', 'p', 'b', '[]', '2024-01-03T00:00:00')")
+    connection.close()
+
+
+@pytest.mark.asyncio
+async def test_import_votes_failed_batch(client: AsyncClient, auth_headers: dict, monkeypatch):
+    """Test a failed batch write isn't retried, and heavy ballot lines are rejected."""
+    monkeypatch.setattr(settings, "vote_import_batch_size", 2)
+    create_response = await client.post("/polls", headers=auth_headers, json={
+        "title": "Import failure test",
+        "options": [
+            {"id": "1", "label": "A"},
+            {"id": "2", "label": "B"},
+        ],
+    })
+    poll_id = create_response.json()["id"]
+    repository = await get_poll_repository(current_database())
+    vote_import_service = VoteImportService(repository)
+    create_votes = repository.create_votes
+    writes = []
+
+    async def failing_create_votes(votes):
+        writes.append(len(votes))
+        if len(writes) == 2:
+            # Cut short after storing the first vote of the batch
+            await create_votes(votes[:1])
+            raise ConnectionError("connection lost")
+        await create_votes(votes)
+
+    async def upload(text: str):
+        yield text.encode()
+
+    blt = "2 1\n5 1 2 0\n999999999 2 0\n0\n"
+    monkeypatch.setattr(repository, "create_votes", failing_create_votes)
+    with pytest.raises(ConnectionError):
+        await vote_import_service.import_votes(poll_id, upload(blt), VoteImportFormat.BLT, "f")
+    assert writes == [2, 2]
+    assert await repository.count_votes(poll_id) == 3
+
+    # Resuming writes the two ballots left, and rejects the heavy line
+    monkeypatch.setattr(repository, "create_votes", create_votes)
+    report = await vote_import_service.import_votes(poll_id, upload(blt), VoteImportFormat.BLT, "f")
+    assert (report.imported, report.skipped, report.rejected) == (2, 3, 1)
+    assert report.errors == ["Line 3: weight must be between 1 and 10000"]
+    assert await repository.count_votes(poll_id) == 5
+
+
+@pytest.mark.asyncio
+async def test_results_follow_revision(client: AsyncClient, auth_headers: dict):
+    """Test a tally cached before a vote isn't served under the new ETag."""
+    create_response = await client.post("/polls", headers=auth_headers, json={
+        "title": "Tally cache test",
+        "options": [
+            {"id": "1", "label": "A"},
+            {"id": "2", "label": "B"},
+        ],
+    })
+    poll_id = create_response.json()["id"]
+    await client.post(f"/polls/{poll_id}/open", headers=auth_headers)
+
+    response = await client.get(f"/polls/{poll_id}/results", headers=auth_headers)
+    assert response.json()["total_votes"] == 0
+
+    # A vote whose invalidation hasn't reached this worker yet
+    repository = await get_poll_repository(current_database())
+    await repository.create_vote(VoteInDB(
+        poll_id=poll_id,
+        user_id="other-worker",
+        rankings=[RankedChoice(option_id="1", rank=1)],
+    ))
+
+    fresh = await client.get(f"/polls/{poll_id}/results", headers=auth_headers)
+    assert fresh.headers["ETag"] != response.headers["ETag"]
+    assert fresh.json()["total_votes"] == 1
+
+
+@pytest.mark.asyncio
+async def test_import_votes_after_deadline(client: AsyncClient, auth_headers: dict):
+    """Test ballots can't be imported into a poll past its closes_at."""
+    create_response = await client.post("/polls", headers=auth_headers, json={
+        "title": "Import deadline test",
+        "options": [
+            {"id": "1", "label": "A"},
+            {"id": "2", "label": "B"},
+        ],
+        "closes_at": "2000-01-01T00:00:00Z",
+    })
+    poll_id = create_response.json()["id"]
+    await client.post(f"/polls/{poll_id}/open", headers=auth_headers)
+
+    response = await client.post(
+        f"/polls/{poll_id}/votes/import",
+        headers=auth_headers,
+        params={"format": "blt", "import_id": "late.blt"},
+        content="2 1\n1 1 2 0\n0\n",
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Poll is not open for voting"
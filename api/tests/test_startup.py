@@ -0,0 +1,56 @@
+"""
+Tests for worker cold start: what importing the application costs.
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+API_DIR = Path(__file__).parent.parent
+
+# Cumulative import time allowed for main, in milliseconds
+IMPORT_TIME_BUDGET_MS = float(os.environ.get("IMPORT_TIME_BUDGET_MS", "2000"))
+
+# Only needed by the mongodb backend, or once a token is issued or verified
+DEFERRED_MODULES = ("motor", "pymongo", "jose", "cryptography")
+
+
+def import_main() -> dict[str, int]:
+    """Import main in a fresh interpreter; cumulative microseconds per module."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=API_DIR,
+        env={**os.environ, "REPOSITORY_BACKEND": "memory"},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        modules[name.strip()] = int(cumulative)
+    return modules
+
+
+def test_import_defers_backend_and_crypto_modules():
+    """Test importing the app doesn't load modules it doesn't need yet."""
+    modules = import_main()
+    assert "main" in modules
+    loaded = sorted(
+        name for name in modules
+        if name.split(".")[0] in DEFERRED_MODULES
+    )
+    assert loaded == []
+
+
+def test_import_time_budget():
+    """Test importing the app stays within the import time budget."""
+    # Best of three, to ignore a slow run on a busy machine
+    elapsed_ms = min(import_main()["main"] for _ in range(3)) / 1000
+    assert elapsed_ms < IMPORT_TIME_BUDGET_MS, (
+        f"importing main took {elapsed_ms:.0f} ms "
+        f"(budget {IMPORT_TIME_BUDGET_MS:.0f} ms, see python -X importtime)"
+    )
@@ -0,0 +1,136 @@
+"""
+Tests for ballot archives and the tally engine.
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from models.polls import RankedChoice, VoteInDB  # noqa: E402
+from repositories import ballot_archive  # noqa: E402
+from repositories.ballot_archive import BallotArchive, write_archive  # noqa: E402
+from services.tally import TallyAlgorithm, tally  # noqa: E402
+
+OPTION_IDS = ["a", "b", "c"]
+
+# Preference orders of the ballots below, best first
+BALLOTS = [
+    ["a", "b", "c"],
+    ["a", "c", "b"],
+    ["b", "c", "a"],
+    ["c", "b"],
+    ["c", "b", "a"],
+]
+
+
+async def votes(ballots: list[list[str]]):
+    for number, ballot in enumerate(ballots):
+        yield VoteInDB(
+            poll_id="poll",
+            user_id=f"voter-{number}",
+            rankings=[
+                RankedChoice(option_id=option_id, rank=rank)
+                for rank, option_id in enumerate(ballot, start=1)
+            ],
+        )
+
+
+def rank_matrix(ballots: list[list[str]], option_ids: list[str] = OPTION_IDS) -> np.ndarray:
+    ranks = np.zeros((len(ballots), len(option_ids)), dtype=np.uint8)
+    for row, ballot in enumerate(ballots):
+        for rank, option_id in enumerate(ballot, start=1):
+            ranks[row, option_ids.index(option_id)] = rank
+    return ranks
+
+
+def in_chunks(ranks: np.ndarray, rows: int):
+    return lambda: (ranks[start:start + rows] for start in range(0, len(ranks), rows))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("chunk_size", [None, 2])
+async def test_archive_round_trip(tmp_path, chunk_size):
+    """Test an archive reads back every ballot as a rank matrix."""
+    path = tmp_path / "poll.rsba"
+    written = await write_archive(path, OPTION_IDS, votes(BALLOTS), chunk_size=chunk_size)
+
+    archive = BallotArchive(path)
+    assert written == archive.ballot_count == len(BALLOTS)
+    assert archive.option_ids == OPTION_IDS
+    assert archive.rank_width == 1
+    assert np.array_equal(archive.ranks, rank_matrix(BALLOTS))
+    assert np.array_equal(np.concatenate(list(archive.chunks(rows=2))), rank_matrix(BALLOTS))
+    assert not (tmp_path / "poll.rsba.tmp").exists()
+
+
+@pytest.mark.asyncio
+async def test_archive_wide_ranks_and_empty(tmp_path):
+    """Test polls of 255+ options use 2-byte ranks, and empty archives open."""
+    option_ids = [str(index) for index in range(300)]
+    path = tmp_path / "wide.rsba"
+    await write_archive(path, option_ids, votes([["299", "0"]]))
+    archive = BallotArchive(path)
+    assert archive.rank_width == 2
+    assert archive.ranks[0, 299] == 1 and archive.ranks[0, 0] == 2
+
+    path = tmp_path / "empty.rsba"
+    assert await write_archive(path, OPTION_IDS, votes([])) == 0
+    archive = BallotArchive(path)
+    assert archive.ranks.shape == (0, 3)
+    assert list(archive.chunks()) == []
+
+
+def test_archive_rejects_other_files(tmp_path):
+    """Test opening a file that isn't an archive raises ValueError."""
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"\0" * 64)
+    with pytest.raises(ValueError):
+        BallotArchive(path)
+
+
+@pytest.mark.asyncio
+async def test_archive_chunks_stay_within_budget(tmp_path, monkeypatch):
+    """Test default chunks hold at most CHUNK_BYTES of 8-byte ranks."""
+    monkeypatch.setattr(ballot_archive, "CHUNK_BYTES", 3 * 8 * 2)
+    path = tmp_path / "poll.rsba"
+    await write_archive(path, OPTION_IDS, votes(BALLOTS))
+    chunks = list(BallotArchive(path).chunks())
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+
+
+@pytest.mark.parametrize("rows", [1, 2, 100])
+def test_borda(rows):
+    """Test Borda points, whatever the chunk size."""
+    standings = tally(TallyAlgorithm.BORDA, in_chunks(rank_matrix(BALLOTS), rows), OPTION_IDS)
+    # a: 3 + 3 + 1 + 0 + 1, b: 2 + 1 + 3 + 2 + 2, c: 1 + 2 + 2 + 3 + 3
+    assert standings == [("c", 11.0), ("b", 10.0), ("a", 8.0)]
+
+
+def test_plurality():
+    """Test plurality counts first preferences only."""
+    standings = tally(TallyAlgorithm.PLURALITY, in_chunks(rank_matrix(BALLOTS), 2), OPTION_IDS)
+    assert standings == [("a", 2.0), ("c", 2.0), ("b", 1.0)]
+
+
+def test_instant_runoff():
+    """Test instant runoff transfers eliminated options' ballots."""
+    standings = tally(TallyAlgorithm.INSTANT_RUNOFF, in_chunks(rank_matrix(BALLOTS), 2), OPTION_IDS)
+    # b is eliminated first and its ballot moves to c, which then has 3 of 5
+    assert standings == [("c", 3.0), ("a", 2.0), ("b", 1.0)]
+
+
+def test_instant_runoff_exhausted_ballots():
+    """Test ballots with no continuing option left drop out of the count."""
+    ballots = [["a"], ["a"], ["b", "a"], ["c"], ["c"]]
+    standings = tally(TallyAlgorithm.INSTANT_RUNOFF, in_chunks(rank_matrix(ballots), 2), OPTION_IDS)
+    # b's ballot moves to a; with 3 of 5, a wins
+    assert standings == [("a", 3.0), ("c", 2.0), ("b", 1.0)]
+
+
+def test_tally_empty():
+    """Test every algorithm handles a poll without ballots."""
+    empty = in_chunks(rank_matrix([]), 2)
+    for algorithm in TallyAlgorithm:
+        standings = tally(algorithm, empty, OPTION_IDS)
+        assert sorted(option_id for option_id, _ in standings) == OPTION_IDS
+        assert all(score == 0 for _, score in standings)
@@ -0,0 +1,50 @@
+"""
+Per-worker warmup, run from the application lifespan.
+
+uvicorn completes the lifespan startup before it accepts connections, so
+everything here happens before a worker serves its first request.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from typing import TYPE_CHECKING
+
+from fastapi import FastAPI
+
+from core.config import settings
+from core.database import current_database
+
+if TYPE_CHECKING:
+    from repositories.poll_repository import PollRepository
+
+logger = logging.getLogger(__name__)
+
+
+async def warm_up(app: FastAPI, poll_repository: PollRepository) -> None:
+    """
+    Prepare a worker before it accepts traffic.
+
+    - Connects to MongoDB (the pool then fills to MONGODB_MIN_POOL_SIZE)
+    - Preloads the metadata of open polls into process caches
+    - Builds the OpenAPI schema, which FastAPI otherwise generates on
+      the first /docs or /openapi.json request
+
+    Args:
+        app: The application being started.
+        poll_repository: Repository for poll data access.
+    """
+    started = time.perf_counter()
+
+    if settings.repository_backend == "mongodb":
+        await current_database().command("ping")
+
+    preloaded = await poll_repository.preload_open_polls(settings.warmup_open_polls)
+    app.openapi()
+
+    logger.info(
+        "Worker warmed up in %.0f ms (%d open polls preloaded)",
+        (time.perf_counter() - started) * 1000,
+        preloaded,
+    )
@@ -1,5 +1,249 @@
-def main():
-    print("Hello from rankstuff!")
+"""
+Multi-process launcher for the rankstuff.io API.
+
+Pre-forks one uvicorn worker per CPU on a shared listening socket:
+
+    python main.py --host 127.0.0.1 --port 3000 --workers 8
+
+Each worker imports the app after forking and runs its lifespan startup,
+including the warmup in api/warmup.py, before it accepts connections.
+
+Signals (to the launcher process):
+    SIGHUP           rolling restart: workers are replaced one at a time,
+                     each only after its replacement is ready, so new code
+                     is deployed without dropping requests
+    SIGTERM, SIGINT  graceful shutdown
+"""
+
+import argparse
+import os
+import select
+import signal
+import socket
+import sys
+import time
+import traceback
+from dataclasses import dataclass
+from pathlib import Path
+
+API_DIR = Path(__file__).resolve().parent / "api"
+
+
+@dataclass
+class Worker:
+    """A forked worker and the pipe it reports readiness on."""
+
+    pid: int
+    ready_fd: int
+    ready: bool = False
+    # Closed its ready pipe without finishing startup
+    failed: bool = False
+
+
+def run_worker(sock: socket.socket, ready_fd: int, args: argparse.Namespace) -> None:
+    """Serve the app on the shared socket (runs in the forked child)."""
+    # The launcher's handlers don't apply here; uvicorn installs its own
+    # for SIGINT/SIGTERM and shuts down gracefully on them
+    for signum in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, signal.SIG_DFL)
+
+    # Same working directory and import path as `cd api && uvicorn main:app`,
+    # so .env and the api modules resolve as they do there
+    os.chdir(args.app_dir)
+    sys.path.insert(0, str(args.app_dir))
+
+    import asyncio
+
+    import uvicorn
+
+    class ReadyServer(uvicorn.Server):
+        """Tells the launcher once startup (lifespan and warmup) is done."""
+
+        async def startup(self, sockets: list[socket.socket] | None = None) -> None:
+            await super().startup(sockets=sockets)
+            if not self.should_exit:
+                os.write(ready_fd, b"1")
+            os.close(ready_fd)
+
+    config = uvicorn.Config(
+        args.app,
+        log_level=args.log_level,
+        proxy_headers=True,
+        timeout_graceful_shutdown=args.graceful_timeout,
+    )
+    asyncio.run(ReadyServer(config).serve(sockets=[sock]))
+
+
+class Launcher:
+    """Master process that forks, supervises and restarts the workers."""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.workers: dict[int, Worker] = {}
+        self.sock = socket.create_server((args.host, args.port), backlog=args.backlog)
+        self.sock.set_inheritable(True)
+        self._stopping = False
+        self._restart_requested = False
+
+    def spawn(self) -> Worker:
+        """Fork a worker."""
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            for other in self.workers.values():
+                os.close(other.ready_fd)
+            code = 0
+            try:
+                run_worker(self.sock, write_fd, self.args)
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            finally:
+                os._exit(code)
+
+        os.close(write_fd)
+        worker = Worker(pid, read_fd)
+        self.workers[pid] = worker
+        return worker
+
+    def wait_ready(self, worker: Worker, timeout: float) -> bool:
+        """Wait for a worker to finish startup; False if it failed or timed out."""
+        readable, _, _ = select.select([worker.ready_fd], [], [], timeout)
+        worker.ready = bool(readable) and os.read(worker.ready_fd, 1) == b"1"
+        worker.failed = not worker.ready
+        return worker.ready
+
+    def stop_worker(self, worker: Worker) -> None:
+        """Stop a worker gracefully, killing it after the graceful timeout."""
+        self._signal(worker.pid, signal.SIGTERM)
+        deadline = time.monotonic() + self.args.graceful_timeout + 5
+        while time.monotonic() < deadline:
+            pid, _ = os.waitpid(worker.pid, os.WNOHANG)
+            if pid:
+                break
+            time.sleep(0.1)
+        else:
+            self._signal(worker.pid, signal.SIGKILL)
+            os.waitpid(worker.pid, 0)
+        self._forget(worker.pid)
+
+    def rolling_restart(self) -> None:
+        """Replace every worker, one at a time, each after its successor is ready."""
+        for old in list(self.workers.values()):
+            if self._stopping or old.pid not in self.workers:
+                continue
+            new = self.spawn()
+            if not self.wait_ready(new, self.args.ready_timeout):
+                print(f"[launcher] worker {new.pid} failed to start; restart aborted", file=sys.stderr)
+                self.stop_worker(new)
+                return
+            self.stop_worker(old)
+        print(f"[launcher] rolling restart complete ({len(self.workers)} workers)", file=sys.stderr)
+
+    def run(self) -> None:
+        """Start the workers and supervise them until shut down."""
+        signal.signal(signal.SIGHUP, self._on_restart)
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+
+        print(
+            f"[launcher] serving on http://{self.args.host}:{self.args.port} "
+            f"with {self.args.workers} workers",
+            file=sys.stderr,
+        )
+        for _ in range(self.args.workers):
+            self.spawn()
+
+        while not self._stopping:
+            if self._restart_requested:
+                self._restart_requested = False
+                self.rolling_restart()
+            self._reap()
+            self._watch_ready(0.5)
+
+        for worker in list(self.workers.values()):
+            self._signal(worker.pid, signal.SIGTERM)
+        for worker in list(self.workers.values()):
+            self.stop_worker(worker)
+        self.sock.close()
+
+    def _reap(self) -> None:
+        """Replace workers that exited on their own."""
+        exited = []
+        while self.workers:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if not pid:
+                break
+            worker = self.workers.get(pid)
+            if worker is not None:
+                self._forget(pid)
+                exited.append((worker, os.waitstatus_to_exitcode(status)))
+
+        for worker, code in exited:
+            if self._stopping:
+                return
+            print(f"[launcher] worker {worker.pid} exited ({code}), respawning", file=sys.stderr)
+            if not worker.ready:
+                # Crashed during startup: don't respawn in a tight loop
+                time.sleep(1.0)
+            self.spawn()
+
+    def _watch_ready(self, timeout: float) -> None:
+        """Wait up to timeout, recording workers that finish startup meanwhile."""
+        starting = {
+            worker.ready_fd: worker
+            for worker in self.workers.values()
+            if not worker.ready and not worker.failed
+        }
+        if not starting:
+            time.sleep(timeout)
+            return
+        readable, _, _ = select.select(list(starting), [], [], timeout)
+        for fd in readable:
+            worker = starting[fd]
+            worker.ready = os.read(fd, 1) == b"1"
+            worker.failed = not worker.ready
+
+    def _forget(self, pid: int) -> None:
+        worker = self.workers.pop(pid, None)
+        if worker is not None:
+            os.close(worker.ready_fd)
+
+    @staticmethod
+    def _signal(pid: int, signum: int) -> None:
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def _on_restart(self, signum, frame) -> None:
+        self._restart_requested = True
+
+    def _on_stop(self, signum, frame) -> None:
+        self._stopping = True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the rankstuff.io API with pre-forked workers")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3000)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.environ.get("WEB_CONCURRENCY", 0)) or os.cpu_count() or 1,
+        help="Worker processes (default: $WEB_CONCURRENCY or the CPU count)",
+    )
+    parser.add_argument("--app", default="main:app", help="ASGI app, relative to --app-dir")
+    parser.add_argument("--app-dir", type=Path, default=API_DIR)
+    parser.add_argument("--backlog", type=int, default=2048)
+    parser.add_argument("--graceful-timeout", type=int, default=30)
+    parser.add_argument("--ready-timeout", type=float, default=60.0)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+    args.app_dir = args.app_dir.resolve()
+
+    Launcher(args).run()
 
 
 if __name__ == "__main__":